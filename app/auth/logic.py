@@ -1,24 +1,29 @@
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Optional
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 
 from app.schemas.token import TokenData
 from app.schemas.user import UserInfo, User
 from app.data_access.queries import *
-from app.auth.password import oauth2_scheme, verify_password
+from app.data_access.async_queries import *
+from app.auth.password import oauth2_scheme, verify_password_async
+from app.auth.principal_cache import principal_cache
 
 from dotenv import load_dotenv
 import os
+import secrets
 
 # Load environment variables from .env file
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+# Shared secret for the admin endpoints; they are disabled when empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 
-def get_user(username: str) -> Optional[User]:
+async def get_user(username: str) -> Optional[User]:
     """
     Retrieve a user entity based on the username.
 
@@ -28,12 +33,12 @@ def get_user(username: str) -> Optional[User]:
     Returns:
         Optional[User]: The user object if found, None otherwise.
     """
-    user = read_user_by_username(username)
+    user = await read_user_by_username_async(username)
     if "error" in user:
         return None
     return User(**user)
 
-def get_user_by_id(user_id: int) -> Optional[User]:
+async def get_user_by_id(user_id: int) -> Optional[User]:
     """
     Retrieve a user entity based on the username.
 
@@ -43,12 +48,12 @@ def get_user_by_id(user_id: int) -> Optional[User]:
     Returns:
         Optional[User]: The user object if found, None otherwise.
     """
-    user = read_user_by_id(user_id)
+    user = await read_user_by_id_async(user_id)
     if "error" in user:
         return None
     return User(**user)
 
-def authenticate_user(username: str, password: str) -> Optional[UserInfo]:
+async def authenticate_user(username: str, password: str) -> Optional[UserInfo]:
     """
     Authenticate a user by verifying their username and password.
 
@@ -59,13 +64,13 @@ def authenticate_user(username: str, password: str) -> Optional[UserInfo]:
     Returns:
         Optional[UserInfo]: The authenticated user object if authentication is successful, False otherwise.
     """
-    user = get_user(username)
+    user = await get_user(username)
 
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
-def authenticate_guest_user(guest_id) -> Optional[UserInfo]:
+async def authenticate_guest_user(guest_id) -> Optional[UserInfo]:
     """
     Authenticate a guest user by verifying their guest_id.
 
@@ -75,7 +80,7 @@ def authenticate_guest_user(guest_id) -> Optional[UserInfo]:
     Returns:
         Optional[UserInfo]: The authenticated user object if authentication is successful, False otherwise.
     """
-    user = get_user_by_id(guest_id)
+    user = await get_user_by_id(guest_id)
     if not user:
         return False
     return user
@@ -121,6 +126,7 @@ def create_reset_password_token(data: dict, expires_delta: Optional[timedelta] =
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> UserInfo:
     """
     Validate an access token and retrieve the user associated with the token.
+    Users are served from a short-lived principal cache when possible.
 
     Args:
         token (Annotated[str, Depends(oauth2_scheme)]): The JWT token to validate.
@@ -149,18 +155,25 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
         print("JWT Error",error)
         raise credentials_exception
 
+    claims = (token_data.id, token_data.username, token_data.is_guest)
+    user = principal_cache.get(claims)
+    if user is not None:
+        return user
+
     if token_data.is_guest:
-        user = read_user_by_id(token_data.id)
+        user = await read_user_by_id_async(token_data.id)
     else:
-        user = read_user_by_username(token_data.username)
+        user = await read_user_by_username_async(token_data.username)
 
     if user is None:
         raise credentials_exception
+
+    principal_cache.set(claims, user)
     return user
 
 
 
-def update_user(user_id: int, email: str, username: str, password: str, is_guest:bool) -> Optional[str]:
+async def update_user(user_id: int, email: str, username: str, password: str, is_guest:bool) -> Optional[str]:
     """
     Update a user's information in the database.
 
@@ -180,7 +193,7 @@ def update_user(user_id: int, email: str, username: str, password: str, is_guest
         if not password:
             return False
 
-    success = update_user_info(user_id, email, username, password)
+    success = await update_user_info_async(user_id, email, username, password)
     if not success:
         return None
 
@@ -190,3 +203,19 @@ def update_user(user_id: int, email: str, username: str, password: str, is_guest
     )
 
     return access_token
+
+
+async def require_admin_token(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    """
+    Guards the admin endpoints with the ADMIN_TOKEN shared secret, sent in the X-Admin-Token header.
+
+    Args:
+        x_admin_token (str | None): The value of the X-Admin-Token header.
+
+    Raises:
+        HTTPException: 404 if no ADMIN_TOKEN is configured, 403 if the header does not match it.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
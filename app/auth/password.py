@@ -1,6 +1,16 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 
+load_dotenv()
+
+# bcrypt releases the GIL while hashing, so a thread pool runs hashes in parallel
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 2))
+PASSWORD_HASHING_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASHING_QUEUE_LIMIT", 16))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -8,6 +18,46 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # The tokenUrl parameter is the endpoint that the client will use to send the username and password to get the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the password hashing pool and its queue are full.
+    """
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASHING_WORKERS, queue_limit: int = PASSWORD_HASHING_QUEUE_LIMIT) -> None:
+        """
+        Runs password hashing and verification on a dedicated thread pool, so that bcrypt's deliberate
+        slowness never blocks the event loop.
+
+        Parameters:
+        - workers (int): Number of hashes computed in parallel.
+        - queue_limit (int): Number of hashes allowed to wait for a worker. Further requests are rejected
+                             with PasswordHasherBusy instead of queueing without bound.
+        """
+        self.capacity = workers + queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self._in_flight += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+password_hasher = PasswordHasher()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a plain text password against the provided hashed password.
@@ -32,3 +82,21 @@ def get_password_hash(password: str) -> str:
         str: The hashed password.
     """
     return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Awaitable `verify_password`, computed on the password hashing pool.
+
+    Raises:
+        PasswordHasherBusy: If the pool and its queue are full.
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Awaitable `get_password_hash`, computed on the password hashing pool.
+
+    Raises:
+        PasswordHasherBusy: If the pool and its queue are full.
+    """
+    return await password_hasher.run(get_password_hash, password)
@@ -0,0 +1,55 @@
+import os
+import threading
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+from app.utils.metrics import Counter
+
+load_dotenv()
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL) -> None:
+        """
+        Short-lived cache of the users resolved from access tokens, so that protected endpoints do not
+        query the users table on every request.
+
+        Entries are keyed by the token claims (user id, username, guest flag), so a token issued after a
+        username change never hits an entry created for the old one. Entries are per worker process and
+        expire after `ttl` seconds, which bounds how long another worker can serve a changed or deleted user.
+
+        Parameters:
+        - maxsize (int): Maximum number of cached principals.
+        - ttl (float): Seconds after which an entry expires.
+        """
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = Counter("principal_cache_hits_total", "Authenticated requests whose user was served from the principal cache.")
+        self.misses = Counter("principal_cache_misses_total", "Authenticated requests whose user was read from the database.")
+
+    def get(self, claims: tuple):
+        """
+        Returns the cached user for a set of token claims, or None if there is none.
+        """
+        with self._lock:
+            user = self._users.get(claims)
+        (self.misses if user is None else self.hits).inc()
+        return user
+
+    def set(self, claims: tuple, user: dict) -> None:
+        with self._lock:
+            self._users[claims] = user
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Drops every entry of a user, whatever the token claims they were cached under.
+        """
+        with self._lock:
+            for claims in [claims for claims in self._users.keys() if claims[0] == user_id]:
+                self._users.pop(claims, None)
+
+
+principal_cache = PrincipalCache()
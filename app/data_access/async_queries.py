@@ -0,0 +1,73 @@
+import asyncio
+import functools
+
+from app.data_access.db_connection import Database
+from app.data_access import queries
+from app.auth.password import get_password_hash_async
+
+
+def awaitable(func):
+    """
+    Wraps a blocking query function so it can be awaited from the event loop.
+
+    The call runs on the database executor, which has one worker per pooled connection. Calls are admitted
+    only while the executor queue has room, and the acquire timeout covers both the wait for a worker and
+    the wait for a connection, so a saturated pool fails fast with PoolTimeout instead of queueing
+    requests indefinitely.
+
+    Parameters:
+    - func (Callable): A function from `app.data_access.queries`.
+
+    Returns:
+    - Callable: A coroutine function with the same signature as `func`.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        future = Database.submit(functools.partial(func, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    return wrapper
+
+
+execute_query_async = awaitable(queries.execute_query)
+search_movie_by_title_async = awaitable(queries.search_movie_by_title)
+get_movies_details_by_ids_async = awaitable(queries.get_movies_details_by_ids)
+get_favorite_movie_ids_by_user_async = awaitable(queries.get_favorite_movie_ids_by_user)
+add_favorite_movie_async = awaitable(queries.add_favorite_movie)
+delete_favorite_movie_async = awaitable(queries.delete_favorite_movie)
+get_all_favorites_movies_by_user_async = awaitable(queries.get_all_favorites_movies_by_user)
+delete_all_favorite_movies_async = awaitable(queries.delete_all_favorite_movies)
+get_preprocessed_movies_by_ids_async = awaitable(queries.get_preprocessed_movies_by_ids)
+get_all_users_interests_async = awaitable(queries.get_all_users_interests)
+get_good_rated_movies_by_each_user_id_async = awaitable(queries.get_good_rated_movies_by_each_user_id)
+get_all_movies_recommendation_async = awaitable(queries.get_all_movies_recommendation)
+write_movies_recommendations_async = awaitable(queries.write_movies_recommendations)
+reset_movies_recommendations_async = awaitable(queries.reset_movies_recommendations)
+update_movies_recommendations_async = awaitable(queries.update_movies_recommendations)
+get_random_movies_recommendations_from_user_async = awaitable(queries.get_random_movies_recommendations_from_user)
+delete_all_movies_recommendations_async = awaitable(queries.delete_all_movies_recommendations)
+read_all_users_async = awaitable(queries.read_all_users)
+read_user_by_id_async = awaitable(queries.read_user_by_id)
+delete_user_async = awaitable(queries.delete_user)
+read_user_by_username_async = awaitable(queries.read_user_by_username)
+read_user_by_email_async = awaitable(queries.read_user_by_email)
+get_songs_from_favorite_movies_async = awaitable(queries.get_songs_from_favorite_movies)
+
+
+# Functions that hash passwords do it on the password hashing pool before taking a database connection
+
+async def create_guest_user_async(username: str = 'guest', password: str = 'secret', email: str = 'guest@example.com'):
+    hashed_password = await get_password_hash_async(password)
+    return await awaitable(queries.create_guest_user)(username, password, email, hashed_password=hashed_password)
+
+
+async def create_user_async(email: str, username: str, password: str):
+    hashed_password = await get_password_hash_async(password)
+    return await awaitable(queries.create_user)(email, username, password, hashed_password=hashed_password)
+
+
+async def update_user_info_async(user_id: int, new_email: str = None, new_username: str = None, new_password: str = None):
+    new_hashed_password = await get_password_hash_async(new_password) if new_password else None
+    return await awaitable(queries.update_user_info)(user_id, new_email, new_username, new_password, new_hashed_password=new_hashed_password)
+
@@ -1,7 +1,12 @@
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import pool, extensions
 import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from app.utils.metrics import Counter, Histogram
 
 load_dotenv()
 
@@ -11,26 +16,253 @@ DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_PORT = os.getenv('DB_PORT')
 
+# Pool sizing and behaviour
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', 5))
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTHCHECK_INTERVAL', 30))
+# Queries allowed to wait for a free executor worker; beyond that, awaitable queries fail with PoolTimeout at once
+DB_POOL_MAX_QUEUED = int(os.getenv('DB_POOL_MAX_QUEUED', DB_POOL_MAX_SIZE))
+
+# Attempts and first backoff delay, in seconds, when opening the pool (the delay doubles after each failure)
+DB_CONNECT_RETRIES = int(os.getenv('DB_CONNECT_RETRIES', 5))
+DB_CONNECT_BACKOFF = float(os.getenv('DB_CONNECT_BACKOFF', 0.5))
+
+
+class PoolTimeout(pool.PoolError):
+    """
+    Raised when no database connection could be acquired within the configured timeout.
+    """
+
+
+pool_wait_seconds = Histogram("db_pool_wait_seconds", "Time spent waiting to check out a database connection, health check included.")
+pool_timeouts = Counter("db_pool_timeouts_total", "Connection checkouts that gave up after the acquire timeout.")
+pool_rejections = Counter("db_pool_rejections_total", "Queries rejected because the executor queue was full.")
+
 
 class Database:
     _connection_pool = None
+    _semaphore = None
+    _executor = None
+    _executor_size = None
+    _admission = None
+    _deadline = threading.local()
+    _initialise_lock = threading.Lock()
+    _executor_lock = threading.Lock()
+    _last_used = {}
+    _acquire_timeout = DB_POOL_ACQUIRE_TIMEOUT
+    _healthcheck_interval = DB_POOL_HEALTHCHECK_INTERVAL
 
     @staticmethod
-    def initialise(**kwargs):
-        Database._connection_pool = psycopg2.pool.SimpleConnectionPool(minconn=1, maxconn=10, **kwargs)
+    def initialise(minconn: int = DB_POOL_MIN_SIZE, maxconn: int = DB_POOL_MAX_SIZE,
+                   acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+                   healthcheck_interval: float = DB_POOL_HEALTHCHECK_INTERVAL, **kwargs):
+        """
+        Creates the thread-safe connection pool and the executor used to run queries off the event loop.
+
+        Parameters:
+        - minconn (int): Number of connections opened up front.
+        - maxconn (int): Upper bound of simultaneously checked out connections.
+        - acquire_timeout (float): Seconds to wait for a free connection before raising PoolTimeout.
+        - healthcheck_interval (float): Connections idle for longer than this many seconds are pinged before reuse.
+        - kwargs: Connection arguments forwarded to psycopg2.
+        """
+        Database._connection_pool = psycopg2.pool.ThreadedConnectionPool(minconn=minconn, maxconn=maxconn, **kwargs)
+        Database._semaphore = threading.BoundedSemaphore(maxconn)
+        # One worker per connection, so work submitted to the executor never queues on the pool itself
+        with Database._executor_lock:
+            if Database._executor_size != maxconn:
+                Database._create_executor(maxconn)
+        Database._last_used = {}
+        Database._acquire_timeout = acquire_timeout
+        Database._healthcheck_interval = healthcheck_interval
 
     @staticmethod
-    def get_connection():
-        return Database._connection_pool.getconn()
+    def connect(retries: int = DB_CONNECT_RETRIES, backoff: float = DB_CONNECT_BACKOFF) -> int:
+        """
+        Opens the pool to the database configured in the environment, unless it is already open, retrying
+        with exponential backoff so that a database that is briefly unavailable does not fail the caller.
+
+        Parameters:
+        - retries (int): Number of attempts. Default is DB_CONNECT_RETRIES.
+        - backoff (float): Seconds to wait after the first failed attempt, doubled after each one. Default is DB_CONNECT_BACKOFF.
+
+        Returns:
+        - int: The number of attempts made, 0 if the pool was already open.
+
+        Raises:
+        - psycopg2.OperationalError: The last connection error, once every attempt failed.
+        """
+        with Database._initialise_lock:
+            if Database._connection_pool is not None:
+                return 0
+            for attempt in range(1, max(retries, 1) + 1):
+                try:
+                    Database.initialise(database=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+                    return attempt
+                except psycopg2.OperationalError as e:
+                    if attempt >= retries:
+                        raise
+                    print(f"Could not connect to the database (attempt {attempt}/{retries}): {e}")
+                    time.sleep(backoff * 2 ** (attempt - 1))
+
+    @staticmethod
+    def is_connected() -> bool:
+        return Database._connection_pool is not None
+
+    @staticmethod
+    def get_connection(timeout: float | None = None):
+        """
+        Checks out a connection, waiting at most `timeout` seconds for one to become available.
+        Connections that have been idle longer than the health check interval are validated first
+        and transparently replaced if the server dropped them.
+
+        Raises:
+        - PoolTimeout: If no connection became available in time.
+        """
+        if Database._connection_pool is None:
+            # Scripts and worker processes open the pool on first use; the API opens it at startup
+            Database.connect()
+        timeout = Database._acquire_timeout if timeout is None else timeout
+        deadline = getattr(Database._deadline, "value", None)
+        if deadline is not None:
+            # Time already spent queueing for an executor worker counts towards the acquire timeout
+            timeout = min(timeout, deadline - time.monotonic())
+        start = time.perf_counter()
+        if not Database._semaphore.acquire(timeout=max(timeout, 0)):
+            pool_wait_seconds.observe(time.perf_counter() - start)
+            pool_timeouts.inc()
+            raise PoolTimeout(f"Could not acquire a database connection within {timeout}s")
+
+        try:
+            connection = Database._connection_pool.getconn()
+            if not Database._is_healthy(connection):
+                Database._connection_pool.putconn(connection, close=True)
+                Database._last_used.pop(id(connection), None)
+                connection = Database._connection_pool.getconn()
+        except Exception:
+            Database._semaphore.release()
+            raise
+
+        pool_wait_seconds.observe(time.perf_counter() - start)
+        return connection
 
     @staticmethod
     def return_connection(connection):
-        Database._connection_pool.putconn(connection)
+        """
+        Returns a connection to the pool, rolling back any transaction left open by a failed query.
+        """
+        try:
+            if not connection.closed and connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            Database._last_used[id(connection)] = time.monotonic()
+            Database._connection_pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            Database._semaphore.release()
 
     @staticmethod
-    def close_all_connections():
-        Database._connection_pool.closeall()
+    def _is_healthy(connection) -> bool:
+        if connection.closed:
+            return False
+
+        last_used = Database._last_used.get(id(connection))
+        if last_used is None or time.monotonic() - last_used < Database._healthcheck_interval:
+            return True
 
-# Initialize the connection pool
-Database.initialise(database=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
 
+    @staticmethod
+    def _create_executor(size: int) -> None:
+        # Callers hold _executor_lock. Queries already submitted to a replaced executor still complete
+        if Database._executor is not None:
+            Database._executor.shutdown(wait=False)
+        Database._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db")
+        Database._executor_size = size
+        Database._admission = threading.BoundedSemaphore(size + DB_POOL_MAX_QUEUED)
+
+    @staticmethod
+    def executor() -> ThreadPoolExecutor:
+        # Created before the pool if needed, so queries can be submitted while the database is still connecting
+        if Database._executor is None:
+            with Database._executor_lock:
+                if Database._executor is None:
+                    Database._create_executor(DB_POOL_MAX_SIZE)
+        return Database._executor
+
+    @staticmethod
+    def submit(func, timeout: float | None = None):
+        """
+        Submits a blocking query function to the executor, unless too many queries are already running or
+        waiting, so that a saturated pool sheds load instead of queueing requests indefinitely.
+
+        The whole call, queueing for a worker included, is bounded by `timeout`: `get_connection` only waits
+        for what is left of it.
+
+        Parameters:
+        - func (Callable): Called without arguments on an executor worker.
+        - timeout (float|None): Seconds the call may wait for a connection. Default is the acquire timeout.
+
+        Returns:
+        - concurrent.futures.Future: The future of the call.
+
+        Raises:
+        - PoolTimeout: If the executor queue is full.
+        """
+        executor = Database.executor()
+        timeout = Database._acquire_timeout if timeout is None else timeout
+        admission = Database._admission
+        if not admission.acquire(blocking=False):
+            pool_rejections.inc()
+            raise PoolTimeout("Too many queries waiting for a database connection")
+
+        deadline = time.monotonic() + timeout
+
+        def call():
+            if deadline - time.monotonic() <= 0:
+                pool_timeouts.inc()
+                raise PoolTimeout(f"Could not acquire a database connection within {timeout}s")
+            with Database.acquire_deadline(deadline):
+                return func()
+
+        try:
+            future = executor.submit(call)
+        except Exception:
+            admission.release()
+            raise
+        # Runs once the call finished, failed, or was cancelled before starting
+        future.add_done_callback(lambda _: admission.release())
+        return future
+
+    @staticmethod
+    @contextmanager
+    def acquire_deadline(deadline: float):
+        """
+        Caps the connection checkouts of the current thread to `deadline` (a `time.monotonic()` value).
+        """
+        previous = getattr(Database._deadline, "value", None)
+        Database._deadline.value = deadline
+        try:
+            yield
+        finally:
+            Database._deadline.value = previous
+
+    @staticmethod
+    def acquire_timeout() -> float:
+        return Database._acquire_timeout
+
+    @staticmethod
+    def close_all_connections():
+        if Database._connection_pool is not None:
+            Database._connection_pool.closeall()
+            Database._connection_pool = None
+        with Database._executor_lock:
+            if Database._executor is not None:
+                Database._executor.shutdown(wait=False)
+                Database._executor = None
+                Database._executor_size = None
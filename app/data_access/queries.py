@@ -1,16 +1,59 @@
 from app.auth.password import get_password_hash
 from app.data_access.db_connection import Database
+from app.recommendations.cache import recommendation_cache
+from app.auth.principal_cache import principal_cache
+from app.data_access.search_index import TitleSearchIndex
+from app.utils.metrics import Counter, Histogram
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+import os
 import pytz
-import pandas as pd
+import random
+import time
+import uuid
 
+load_dotenv()
 
+# Title search implementation: "trigram", "memory" or "like"
+MOVIES_SEARCH_MODE = os.getenv("MOVIES_SEARCH_MODE", "trigram")
 
-def execute_query(query, params=None, fetch="all", commit=False):
+# How update_movies_recommendations writes a user's list: "diff" or "replace"
+RECOMMENDATIONS_WRITE_MODE = os.getenv("RECOMMENDATIONS_WRITE_MODE", "diff")
+RECOMMENDATIONS_WRITE_PAGE_SIZE = int(os.getenv("RECOMMENDATIONS_WRITE_PAGE_SIZE", 1000))
+
+# How recommendation reads sample a user's list: "shuffle_key" (index range scan, needs migration 003) or "random"
+RECOMMENDATIONS_SAMPLING = os.getenv("RECOMMENDATIONS_SAMPLING", "shuffle_key")
+
+# Seconds an NDJSON stream may spend on one fetch, or leave its transaction idle while the client is not reading
+NDJSON_STREAM_TIMEOUT = float(os.getenv("NDJSON_STREAM_TIMEOUT", 30))
+
+_title_search_index = None
+
+query_seconds = Histogram("db_query_duration_seconds", "Time spent executing and fetching queries, by query function.", ("function",))
+query_errors = Counter("db_query_errors_total", "Queries that raised an error, by query function.", ("function",))
+
+
+def rows_to_dicts(cursor, rows: list) -> list:
+    """
+    Builds one dictionary per row, keyed by the column names in `cursor.description`.
+
+    Parameters:
+    - cursor: The cursor that produced the rows.
+    - rows (list): Row tuples as returned by `fetchall()`/`fetchmany()`.
+
+    Returns:
+    - list: A list of dictionaries, one per row.
+    """
+    col_names = [desc[0] for desc in cursor.description]
+    return [dict(zip(col_names, row)) for row in rows]
+
+
+def execute_query(query, params=None, fetch="all", commit=False, as_dict=True, name: str = "query"):
     """
     Executes a given SQL query with optional parameters and manages the database connection.
-    Returns the results as a list of dictionaries after transforming them into a pandas DataFrame,
-    with column names corresponding to the SQL table columns.
+    Returns the results as a list of dictionaries, with keys corresponding to the SQL table columns.
 
     Parameters:
     - query (str): The SQL query to execute.
@@ -22,13 +65,17 @@ def execute_query(query, params=None, fetch="all", commit=False):
                    - "one": Fetches the first row of a query result, returns a list containing a single dictionary.
     - commit (bool): Specifies whether to commit the transaction. Default is False.
                      If True, the changes made by the query will be committed to the database.
+    - as_dict (bool): If False, rows are returned as the plain tuples produced by the driver. Default is True.
+    - name (str): Label of the query in the metrics and error messages, by convention the name of the query
+                  function, e.g. "get_all_favorites_movies_by_user". Default is "query".
 
     Returns:
-    - On successful execution and fetch="all" or fetch="one", returns a list of dictionaries representing the fetched rows.
+    - On successful execution and fetch="all" or fetch="one", returns a list of dictionaries (or tuples) representing the fetched rows.
     - On successful execution with commit=True, returns True.
     - If an exception occurs during query execution, prints the error and returns None.
     """
     connection = Database.get_connection()
+    start = time.perf_counter()
     try:
         with connection.cursor() as cursor:
             cursor.execute(query, params)
@@ -37,9 +84,7 @@ def execute_query(query, params=None, fetch="all", commit=False):
                 rows = [cursor.fetchone()]
                 if not rows or rows[0] is None:  # Check if no data was fetched or fetchone() found no rows
                     return []  # Return an empty list
-                col_names = [desc[0] for desc in cursor.description]
-                df = pd.DataFrame(rows, columns=col_names)
-                return df.to_dict('records')
+                return rows_to_dicts(cursor, rows) if as_dict else rows
             if commit:
                 connection.commit()
                 return True
@@ -47,21 +92,198 @@ def execute_query(query, params=None, fetch="all", commit=False):
                 rows = cursor.fetchall() if fetch == "all" else [cursor.fetchone()]
                 if not rows or rows[0] is None:  # Check if no data was fetched or fetchone() found no rows
                     return []  # Return an empty list
-                col_names = [desc[0] for desc in cursor.description]
-                df = pd.DataFrame(rows, columns=col_names)
-                return df.to_dict('records')  # Convert DataFrame to list of dicts
+                return rows_to_dicts(cursor, rows) if as_dict else rows
     except Exception as e:
-        print(f"An error occurred: {e}")
+        query_errors.inc(function=name)
+        print(f"An error occurred in {name}: {e}")
         return None
     finally:
+        query_seconds.observe(time.perf_counter() - start, function=name)
         Database.return_connection(connection)
 
 
-def search_movie_by_title(user_id: int | None = None, title: str = "", page_size: int = 20, offset: int = 0) -> list:
+def stream_query(query, params=None, batch_size: int = 2000, as_dict=True, timeout: float | None = None, name: str = "query"):
+    """
+    Executes a read-only query through a server-side cursor and yields rows as they arrive,
+    so large result sets are never fully materialised in memory.
+
+    The connection stays checked out until the generator is exhausted or closed.
+
+    Parameters:
+    - query (str): The SQL query to execute.
+    - params (tuple|dict|None): Optional parameters to bind to the query. Default is None.
+    - batch_size (int): Number of rows fetched from the server per round trip. Default is 2000.
+    - as_dict (bool): If False, rows are yielded as plain tuples. Default is True.
+    - timeout (float|None): Seconds after which the server cancels a fetch, or closes the connection when the
+                            consumer leaves it idle between fetches, so a stalled consumer cannot hold a connection
+                            and its snapshot indefinitely. Default is no limit.
+    - name (str): Label of the query in the metrics, as for `execute_query`. Default is "query".
+
+    Returns:
+    - Iterator[dict|tuple]: The rows, one at a time.
+    """
+    connection = Database.get_connection()
+    elapsed = 0.0
+    try:
+        if timeout is not None:
+            milliseconds = str(max(int(timeout * 1000), 1))
+            with connection.cursor() as cursor:
+                # Local to the stream's transaction, so the connection is back to the server defaults once returned
+                cursor.execute("SELECT set_config('statement_timeout', %s, true), set_config('idle_in_transaction_session_timeout', %s, true);",
+                               (milliseconds, milliseconds))
+        with connection.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            start = time.perf_counter()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                # Only time spent on the server and the wire, not in the consumer between batches
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                yield from (rows_to_dicts(cursor, rows) if as_dict else rows)
+                start = time.perf_counter()
+    except Exception:
+        query_errors.inc(function=name)
+        raise
+    finally:
+        query_seconds.observe(elapsed, function=name)
+        Database.return_connection(connection)
+
+
+@contextmanager
+def transaction(name: str = "query"):
+    """
+    Checks out a connection and yields a cursor whose statements are committed together when the block
+    exits, or rolled back if it raises.
+
+    Parameters:
+    - name (str): Label of the transaction in the metrics, as for `execute_query`. Default is "query".
+
+    Yields:
+    - cursor: A cursor on the checked out connection.
+    """
+    connection = Database.get_connection()
+    start = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            yield cursor
+        connection.commit()
+    except Exception:
+        query_errors.inc(function=name)
+        connection.rollback()
+        raise
+    finally:
+        query_seconds.observe(time.perf_counter() - start, function=name)
+        Database.return_connection(connection)
+
+
+def title_search_clauses(alias: str, title: str, after: dict | None = None) -> dict:
+    """
+    Builds the SQL fragments shared by title searches: the relevance column, the title match with its
+    optional keyset condition, and the ordering.
+
+    Results are ordered by `search_rank DESC, movie_id ASC`. In the "trigram" mode with a non-empty term,
+    `search_rank` is the trigram similarity to the term; otherwise it is constant and the order is by movie id.
+
+    Parameters:
+    - alias (str): Alias of the `movies_details` table in the query.
+    - title (str): The search term.
+    - after (dict|None): Keyset position to resume from, with the "rank" and "movie_id" of the last row seen.
+
+    Returns:
+    - dict: "rank" and "where" SQL fragments with their "rank_params" and "where_params", and "order_by".
+
+    Raises:
+    - ValueError: If `after` has no rank but the results are ordered by relevance.
+    """
+    ranked = MOVIES_SEARCH_MODE == "trigram" and bool(title)
+    rank_sql, rank_params = (f"similarity({alias}.title, %s)", [title]) if ranked else ("0::real", [])
+
+    if MOVIES_SEARCH_MODE == "trigram":
+        where, where_params = [f"{alias}.title ILIKE %s"], [f'%{title}%']
+    else:
+        where, where_params = [f"LOWER({alias}.title) LIKE LOWER(%s)"], [f'%{title}%']
+
+    if after is not None and ranked:
+        if after.get("rank") is None:
+            raise ValueError("The cursor does not belong to a relevance-ordered search.")
+        where.append(f"({rank_sql} < %s::real OR ({rank_sql} = %s::real AND {alias}.movie_id > %s))")
+        where_params += [*rank_params, after["rank"], *rank_params, after["rank"], after["movie_id"]]
+    elif after is not None:
+        where.append(f"{alias}.movie_id > %s")
+        where_params.append(after["movie_id"])
+
+    return {
+        "rank": f"{rank_sql} AS search_rank",
+        "rank_params": rank_params,
+        "where": " AND ".join(where),
+        "where_params": where_params,
+        "order_by": f"search_rank DESC, {alias}.movie_id ASC" if ranked else f"{alias}.movie_id ASC",
+    }
+
+
+def recommendations_sample(user_id: int, limit: int) -> tuple:
+    """
+    Builds a subquery returning a random-looking sample of a user's recommended movie ids, as `movie_id`
+    with its position in the sample as `sample_position`.
+
+    In the "shuffle_key" mode, every recommendation row holds a random key written with it, so the rows of a
+    user form a fixed shuffled sequence. A read starts at a random pivot in that sequence and wraps around:
+    two range scans of the (user_id, shuffle_key) index, with no sort of the user's rows, whose at most
+    2 × `limit` rows are cut back to `limit` in sequence order. In the "random"
+    mode, the rows are shuffled with `ORDER BY RANDOM()` on every read. Neither mode needs DISTINCT, as the
+    unique (user_id, movie_id) index of migration 002 keeps a movie from being recommended twice to a user.
+
+    Parameters:
+    - user_id (int): The user whose recommendations are sampled.
+    - limit (int): The maximum number of movie ids to return.
+
+    Returns:
+    - tuple[str, list]: The subquery SQL and its parameters.
+    """
+    if RECOMMENDATIONS_SAMPLING == "random":
+        return """
+        SELECT movie_id, RANDOM() AS sample_position
+        FROM movies_recommendations
+        WHERE user_id = %s
+        ORDER BY sample_position
+        LIMIT %s
+        """, [user_id, limit]
+
+    pivot = random.random()
+    return """
+        SELECT * FROM (
+            SELECT movie_id, shuffle_key AS sample_position
+            FROM movies_recommendations
+            WHERE user_id = %s AND shuffle_key >= %s
+            ORDER BY shuffle_key
+            LIMIT %s
+        ) AS from_pivot
+        UNION ALL
+        SELECT * FROM (
+            SELECT movie_id, shuffle_key + 1 AS sample_position
+            FROM movies_recommendations
+            WHERE user_id = %s AND shuffle_key < %s
+            ORDER BY shuffle_key
+            LIMIT %s
+        ) AS wrapped
+        ORDER BY sample_position
+        LIMIT %s
+        """, [user_id, pivot, limit, user_id, pivot, limit, limit]
+
+
+def search_movie_by_title(user_id: int | None = None, title: str = "", page_size: int = 20, offset: int = 0, after: dict | None = None) -> list:
     """
     Searches for movies by title in the database, using a case-insensitive search pattern, excluding movies
     that are already marked as favorites by the specified user.
 
+    How matches are found and ordered depends on MOVIES_SEARCH_MODE:
+    - "trigram": `ILIKE` served by the pg_trgm GIN index, ordered by trigram similarity to the search term
+                 (requires migrations/001_movies_details_title_trgm.sql).
+    - "memory": the same matching and ordering computed by an in-process TitleSearchIndex.
+    - "like": the original `LOWER(title) LIKE` scan, ordered by movie id.
+
     Parameters:
     - user_id (int): The user ID for whom to exclude favorite movies.
     - title (str): The search term for the movie title. The function searches for any titles that contain this term,
@@ -70,28 +292,106 @@ def search_movie_by_title(user_id: int | None = None, title: str = "", page_size
                        This parameter controls the 'LIMIT' clause in the SQL query.
     - offset (int): The offset from the start of the result set to begin returning records. Default is 0.
                     This parameter controls the 'OFFSET' clause in the SQL query and is used for pagination.
+    - after (dict|None): Keyset position ({"rank", "movie_id"} of the last row of the previous page) to resume from.
+                         Unlike `offset`, the cost of a page does not grow with its depth. Default is None.
 
     Returns:
-    - list: A list of tuples representing the movie records that match the search criteria. Each tuple contains
-            the complete details of a movie as stored in the `movies_details` table.
-            The function returns an empty list if no matches are found or in case of an error.
+    - list: A list of dictionaries representing the movie records that match the search criteria, most relevant first.
+            Each dictionary contains the complete details of a movie as stored in the `movies_details` table,
+            plus its `search_rank`. The function returns an empty list if no matches are found or None in case of an error.
     """
 
+    if MOVIES_SEARCH_MODE == "memory":
+        favorites = set(get_favorite_movie_ids_by_user(user_id) or []) if user_id is not None else set()
+        matches = get_title_search_index().ranked(title, exclude=favorites)
+        if after is not None:
+            if after.get("rank") is None:
+                raise ValueError("The cursor does not belong to a relevance-ordered search.")
+            matches = [(rank, movie_id) for rank, movie_id in matches
+                       if rank < after["rank"] or (rank == after["rank"] and movie_id > after["movie_id"])]
+        matches = matches[offset:offset + page_size]
+
+        movies = get_movies_details_by_ids([movie_id for _, movie_id in matches])
+        ranks = {movie_id: rank for rank, movie_id in matches}
+        return movies and [{**movie, "search_rank": ranks[movie["movie_id"]]} for movie in movies]
+
+    clauses = title_search_clauses("md", title, after)
+
     if user_id is None:
-        query = "SELECT DISTINCT * FROM movies_details WHERE LOWER(title) LIKE LOWER(%s) LIMIT %s OFFSET %s;"
-        params = (f'%{title}%', page_size, offset)
+        query = f"""
+        SELECT md.*, {clauses['rank']} FROM movies_details md
+        WHERE {clauses['where']}
+        ORDER BY {clauses['order_by']}
+        LIMIT %s OFFSET %s;
+        """
+        params = (*clauses["rank_params"], *clauses["where_params"], page_size, offset)
     else:
-        query = """
-        SELECT DISTINCT md.* FROM movies_details md
-        LEFT JOIN movies_favorites mf ON md.movie_id = mf.movie_id AND mf.user_id = %s
-        WHERE LOWER(md.title) LIKE LOWER(%s) AND mf.movie_id IS NULL
-        ORDER BY md.movie_id ASC
+        query = f"""
+        SELECT md.*, {clauses['rank']} FROM movies_details md
+        WHERE {clauses['where']}
+        AND NOT EXISTS (SELECT 1 FROM movies_favorites mf WHERE mf.movie_id = md.movie_id AND mf.user_id = %s)
+        ORDER BY {clauses['order_by']}
         LIMIT %s OFFSET %s;
         """
-        params = (user_id, f'%{title}%', page_size, offset)
+        params = (*clauses["rank_params"], *clauses["where_params"], user_id, page_size, offset)
+
+    return execute_query(query, params=params, name="search_movie_by_title")
+
+
+def get_title_search_index() -> TitleSearchIndex:
+    """
+    Returns the in-process title search index used by the "memory" search mode, building it from
+    `movies_details` on first use.
+    """
+    global _title_search_index
+    if _title_search_index is None:
+        movies = execute_query("SELECT movie_id, title FROM movies_details;", as_dict=False, name="get_title_search_index")
+        if movies is None:
+            raise RuntimeError("Could not load movie titles to build the search index.")
+        _title_search_index = TitleSearchIndex(movies)
+    return _title_search_index
+
+
+def get_movies_details_by_ids(ids: list[int]) -> list:
+    """
+    Retrieves the details of a list of movies, keeping the order of the given ids.
+
+    Parameters:
+    - ids (list[int]): The movie ids to retrieve.
+
+    Returns:
+    - list: A list of dictionaries, one per movie found, in the order of `ids`.
+            Returns an empty list if no movies are found or None in case of an error.
+    """
+    if not ids:
+        return []
+
+    query = "SELECT * FROM movies_details WHERE movie_id = ANY(%s);"
+    params = (list(ids),)
 
-    return execute_query(query, params=params)
+    movies = execute_query(query, params=params, name="get_movies_details_by_ids")
+    if not movies:
+        return movies
 
+    by_id = {movie["movie_id"]: movie for movie in movies}
+    return [by_id[movie_id] for movie_id in ids if movie_id in by_id]
+
+
+def get_favorite_movie_ids_by_user(user_id: int) -> list:
+    """
+    Retrieves the ids of all favorite movies of a user.
+
+    Parameters:
+    - user_id (int): The id of the user, used to identify their list of favorite movies.
+
+    Returns:
+    - list: A list of movie ids. Returns an empty list if the user has no favorites or None in case of an error.
+    """
+    query = "SELECT movie_id FROM movies_favorites WHERE user_id = %s;"
+    params = (user_id,)
+
+    rows = execute_query(query, params=params, as_dict=False, name="get_favorite_movie_ids_by_user")
+    return rows if rows is None else [row[0] for row in rows]
 
 
 def add_favorite_movie(movie_id: int, user_id: int):
@@ -117,7 +417,11 @@ def add_favorite_movie(movie_id: int, user_id: int):
 
     params = (movie_id, user_id, movie_id, user_id)
 
-    return execute_query(query, params=params, commit=True)
+    result = execute_query(query, params=params, commit=True, name="add_favorite_movie")
+    # Invalidate after the write so a concurrent read cannot re-cache the previous state
+    recommendation_cache.invalidate(user_id)
+
+    return result
 
 
 def delete_favorite_movie(movie_id: int, user_id: int):
@@ -141,16 +445,23 @@ def delete_favorite_movie(movie_id: int, user_id: int):
 
     params = (movie_id, user_id)
 
-    return execute_query(query, params=params, commit=True)
+    result = execute_query(query, params=params, commit=True, name="delete_favorite_movie")
+    recommendation_cache.invalidate(user_id)
+
+    return result
 
 
-def get_all_favorites_movies_by_user(user_id:int, title: str = "", page_size: int = 10, offset: int = 0):
+def get_all_favorites_movies_by_user(user_id:int, title: str = "", page_size: int = 10, offset: int = 0, after: dict | None = None):
     """
     Retrieves detailed information about all favorite movies for a specified user by id.
+    In the "trigram" search mode, results matching a title are ordered by relevance.
 
     Parameters:
     - user_id (int): The id of the user, used to identify their list of favorite movies.
-
+    - title (str): Only favorites whose title contains this term, regardless of case, are returned. Default is "".
+    - page_size (int): The maximum number of movies to return. Default is 10.
+    - offset (int): The number of movies to skip, for pagination. Default is 0.
+    - after (dict|None): Keyset position ({"rank", "movie_id"} of the last row of the previous page) to resume from. Default is None.
 
     Returns:
     - list: A list of tuples representing the detailed information of each favorite movie. Each tuple corresponds
@@ -159,18 +470,20 @@ def get_all_favorites_movies_by_user(user_id:int, title: str = "", page_size: in
 
     """
 
-    query = """
-    SELECT m.*
+    clauses = title_search_clauses("m", title, after)
+
+    query = f"""
+    SELECT m.*, {clauses['rank']}
     FROM movies_favorites as f
     INNER JOIN movies_details as m ON m.movie_id = f.movie_id
-    WHERE f.user_id = %s AND LOWER(title) LIKE LOWER(%s)
+    WHERE f.user_id = %s AND {clauses['where']}
+    ORDER BY {clauses['order_by']}
     LIMIT %s OFFSET %s;
     """
 
-    title = f'%{title}%'
-    params = (user_id, title, page_size, offset)
+    params = (*clauses["rank_params"], user_id, *clauses["where_params"], page_size, offset)
 
-    return execute_query(query, params, commit=False)
+    return execute_query(query, params, commit=False, name="get_all_favorites_movies_by_user")
 
 
 def delete_all_favorite_movies(user_id: int):
@@ -190,7 +503,10 @@ def delete_all_favorite_movies(user_id: int):
 
     params = (user_id,)
 
-    return execute_query(query, params=params, commit=True)
+    result = execute_query(query, params=params, commit=True, name="delete_all_favorite_movies")
+    recommendation_cache.forget(user_id)
+
+    return result
 
 
 def get_preprocessed_movies_by_ids(ids: list[int]) -> list:
@@ -212,7 +528,7 @@ def get_preprocessed_movies_by_ids(ids: list[int]) -> list:
 
     params = tuple(ids)
 
-    return execute_query(query, params=params, commit=False)
+    return execute_query(query, params=params, commit=False, name="get_preprocessed_movies_by_ids")
 
 
 def get_all_users_interests() -> list:
@@ -226,7 +542,7 @@ def get_all_users_interests() -> list:
 
     query = f"SELECT * from movies_users_interests;"
 
-    return execute_query(query, commit=False)
+    return execute_query(query, commit=False, name="get_all_users_interests")
 
 
 def get_good_rated_movies_by_user_ids(ids: list[int]) -> list:
@@ -249,33 +565,46 @@ def get_good_rated_movies_by_user_ids(ids: list[int]) -> list:
     # Execute the query with the list of user IDs
     params = tuple(ids)
 
-    return execute_query(query, params=params, commit=False)
+    return execute_query(query, params=params, commit=False, name="get_good_rated_movies_by_user_ids")
+
+def get_good_rated_movies_by_each_user_id(ids: list[int]) -> list:
+    """
+    Retrieves the movies rated 4.0 or higher by a list of users, keeping track of which user rated each one.
+    Lets callers evaluate several neighbourhood sizes from a single round trip.
+
+    Parameters:
+    - ids (list[int]): A list of user IDs to filter the movies by their ratings.
+
+    Returns:
+    - list: A list of (user_id, movie_id) tuples.
+            Returns an empty list if no movies meet the criteria or None in case of an error.
+    """
+    query = "SELECT DISTINCT user_id, movie_id FROM movies_ratings WHERE user_id = ANY(%s) AND rating >= 4.0"
+    params = (list(ids),)
+
+    return execute_query(query, params=params, commit=False, as_dict=False, name="get_good_rated_movies_by_each_user_id")
 
 def get_all_movies_recommendation(user_id: int) -> list:
     """
     Get all movies recommendations for a user.
 
+    Up to 50 recommendations are sampled with `recommendations_sample` and returned by title.
+
     Parameters:
     - user_id (int): The user ID for whom to exclude favorite movies.
 
     Returns:
     - list: A list of tuples representing the movie records.
     """
-
-    query = """
-    SELECT DISTINCT * FROM (
-        SELECT m.*
-        FROM movies_recommendations AS r
-        INNER JOIN movies_details AS m ON r.movie_id = m.movie_id
-        WHERE r.user_id = %s
-        ORDER BY RANDOM()
-        LIMIT 50
-    ) AS subquery
-    ORDER BY title ASC;
+    sample, params = recommendations_sample(user_id, 50)
+    query = f"""
+    SELECT m.*
+    FROM ({sample}) AS r
+    INNER JOIN movies_details AS m ON r.movie_id = m.movie_id
+    ORDER BY m.title ASC;
     """
-    params = (user_id,)
 
-    return execute_query(query, params=params)
+    return execute_query(query, params=params, name="get_all_movies_recommendation")
 
 def reset_movies_recommendations(user_id: int):
     """
@@ -294,56 +623,104 @@ def reset_movies_recommendations(user_id: int):
 
     params = (user_id,)
 
-    return execute_query(query, params=params, commit=True)
+    return execute_query(query, params=params, commit=True, name="reset_movies_recommendations")
 
 
-def update_movies_recommendations(ids: list[int], user_id: int) -> bool:
+def write_movies_recommendations(recommendations: dict, mode: str = "diff", page_size: int = RECOMMENDATIONS_WRITE_PAGE_SIZE) -> dict | None:
     """
-    Updates the movie recommendations for a user, identified by id, if the last update was more than a specified time ago.
+    Writes the recommendation lists of many users in a single transaction, so readers never see a user
+    with a partially written or empty list.
 
-    The function clears the user's current movie recommendations and sets new ones based on the provided movie IDs.
-    It first checks if the last recommendation update was more than 1 minute ago to prevent too frequent updates.
+    Modes:
+    - "replace": deletes every stored recommendation of the given users and bulk inserts the new lists.
+    - "diff": bulk loads the new lists into a temporary table, then deletes only the stored rows that are no
+              longer recommended and inserts only the new ones. Unchanged rows keep their `created_at`.
+
+    Each inserted row gets a random `shuffle_key`, used by `recommendations_sample`. Inserts skip rows that
+    already exist (ON CONFLICT on the unique index of migration 002), so concurrent writes for the same user
+    never duplicate a recommendation.
 
     Parameters:
-    - ids (list[int]): A list of movie IDs to be set as the new recommendations for the user.
-    - user_id (int): The id of the user, used to identify their list of favorite movies.
+    - recommendations (dict): Maps each user id to the list of movie ids recommended to them.
+                              An empty list clears the user's recommendations.
+    - mode (str): "diff" or "replace". Default is "diff".
+    - page_size (int): Number of rows sent per INSERT statement. Default is RECOMMENDATIONS_WRITE_PAGE_SIZE.
 
     Returns:
-    - bool: True if the recommendations were successfully updated, False otherwise (e.g., if the update was attempted too soon after the last one).
+    - dict: The number of "deleted" and "inserted" rows, or None if an error occurred.
+
+    Raises:
+    - ValueError: If `mode` is unknown.
     """
+    if mode not in ("diff", "replace"):
+        raise ValueError(f"Unknown recommendations write mode: {mode}")
+
+    user_ids = list(recommendations)
+    rows = [(user_id, movie_id) for user_id, ids in recommendations.items() for movie_id in dict.fromkeys(ids)]
+    if not user_ids:
+        return {"deleted": 0, "inserted": 0}
+
+    try:
+        with transaction(name="write_movies_recommendations") as cursor:
+            if mode == "replace":
+                cursor.execute("DELETE FROM movies_recommendations WHERE user_id = ANY(%s);", (user_ids,))
+                deleted = cursor.rowcount
+                execute_values(
+                    cursor,
+                    "INSERT INTO movies_recommendations (user_id, movie_id, created_at, shuffle_key) VALUES %s ON CONFLICT (user_id, movie_id) DO NOTHING;",
+                    rows,
+                    template="(%s, %s, CURRENT_TIMESTAMP, RANDOM())",
+                    page_size=page_size,
+                )
+                return {"deleted": deleted, "inserted": len(rows)}
+
+            cursor.execute("CREATE TEMPORARY TABLE recommendations_staging (user_id INT, movie_id INT) ON COMMIT DROP;")
+            execute_values(cursor, "INSERT INTO recommendations_staging (user_id, movie_id) VALUES %s;", rows, page_size=page_size)
+            cursor.execute("""
+            DELETE FROM movies_recommendations AS r
+            WHERE r.user_id = ANY(%s)
+              AND NOT EXISTS (
+                SELECT 1 FROM recommendations_staging AS s
+                WHERE s.user_id = r.user_id AND s.movie_id = r.movie_id
+              );
+            """, (user_ids,))
+            deleted = cursor.rowcount
+            cursor.execute("""
+            INSERT INTO movies_recommendations (user_id, movie_id, created_at, shuffle_key)
+            SELECT s.user_id, s.movie_id, CURRENT_TIMESTAMP, RANDOM()
+            FROM recommendations_staging AS s
+            ON CONFLICT (user_id, movie_id) DO NOTHING;
+            """)
+            return {"deleted": deleted, "inserted": cursor.rowcount}
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return None
 
-    # Check for the last recommendation time
-    # last_recommended_query = """
-    # SELECT MAX(created_at) as last_timestamp
-    # FROM movies_recommendations
-    # WHERE user_id = %s;
-    # """
-    # params = (user_id,)
-    # last_timestamp_result = execute_query(last_recommended_query, params=params, fetch="one")
-    # last_timestamp = last_timestamp_result[0]["last_timestamp"]
-    # minimum_time_to_refresh = timedelta(minutes=1)
-    # if last_timestamp:
-    #     now = datetime.now(pytz.utc)
-    #     last_timestamp = last_timestamp.replace(tzinfo=pytz.UTC)
-    #     diff = (now - last_timestamp)
-    #     if  diff <= minimum_time_to_refresh:
-    #         print("Last recommendation was made less than 1 minute ago.")
-    #         return False
 
-    # Reset current recommendations
-    reset_movies_recommendations(user_id)
-    values_placeholders = ", ".join(["(%s, %s, CURRENT_TIMESTAMP)"] * len(ids))
-    add_query = f"INSERT INTO movies_recommendations (movie_id, user_id, created_at) VALUES {values_placeholders};"
-    params = tuple(val for pair in zip(ids, [user_id] * len(ids)) for val in pair)
+def update_movies_recommendations(ids: list[int], user_id: int) -> bool:
+    """
+    Sets the movie recommendations of a user, identified by id, to the provided movie IDs.
+
+    The previous list is replaced atomically with `write_movies_recommendations`, in RECOMMENDATIONS_WRITE_MODE.
 
+    Parameters:
+    - ids (list[int]): A list of movie IDs to be set as the new recommendations for the user.
+    - user_id (int): The id of the user, used to identify their list of favorite movies.
 
-    return execute_query(add_query, params=params, commit=True)
+    Returns:
+    - bool: True if the recommendations were successfully updated, None if an error occurred.
+    """
+    if write_movies_recommendations({user_id: ids}, mode=RECOMMENDATIONS_WRITE_MODE) is None:
+        return None
+    return True
 
 
 def get_random_movies_recommendations_from_user(user_id: int):
     """
     Fetches a random list of 10 movie recommendations for a specific user by their id.
 
+    The recommendations are sampled with `recommendations_sample`.
+
     Parameters:
     - user_id (int): The id of the user, used to identify their list of favorite movies.
 
@@ -352,21 +729,16 @@ def get_random_movies_recommendations_from_user(user_id: int):
     - list: A list of tuples, where each tuple represents the detailed information of a recommended movie.
             Returns an empty list if no recommendations are found or in case of an error.
     """
-
-    query = """
-    SELECT * FROM (
-        SELECT DISTINCT m.*
-        FROM movies_recommendations AS r
-        INNER JOIN movies_details AS m ON r.movie_id = m.movie_id
-        WHERE r.user_id = %s
-    ) AS subquery
-    ORDER BY RANDOM()
+    sample, params = recommendations_sample(user_id, 10)
+    query = f"""
+    SELECT m.*
+    FROM ({sample}) AS r
+    INNER JOIN movies_details AS m ON r.movie_id = m.movie_id
+    ORDER BY r.sample_position
     LIMIT 10;
     """
 
-    params = (user_id,)
-
-    return execute_query(query, params=params, commit=False)
+    return execute_query(query, params=params, commit=False, name="get_random_movies_recommendations_from_user")
 
 
 def delete_all_movies_recommendations(user_id: int):
@@ -386,24 +758,25 @@ def delete_all_movies_recommendations(user_id: int):
 
     params = (user_id,)
 
-    return execute_query(query, params=params, commit=True)
+    return execute_query(query, params=params, commit=True, name="delete_all_movies_recommendations")
 
-def create_guest_user(username:str = 'guest', password:str = 'secret', email:str = 'guest@example.com'):
+def create_guest_user(username:str = 'guest', password:str = 'secret', email:str = 'guest@example.com', hashed_password: str | None = None):
     """
     Adds a new guest user to the database.
+    `hashed_password`, if given, is stored as is instead of hashing `password`.
 
     Returns:
         Union[dict, None]: The newly created user's data, or None if an error occurred.
     """
-    hashed_password = get_password_hash(password)
+    hashed_password = hashed_password or get_password_hash(password)
     query = """
     INSERT INTO users (username, hashed_password, email, is_guest) VALUES (%s, %s, %s, true) RETURNING user_id, username, email, is_guest;
     """
 
     params = (username, hashed_password, email)
-    return execute_query(query, params=params, fetch='one', commit=True)[0]
+    return execute_query(query, params=params, fetch='one', commit=True, name="create_guest_user")[0]
 
-def create_user(email: str, username: str, password: str):
+def create_user(email: str, username: str, password: str, hashed_password: str | None = None):
     """
     Adds a new user to the database with a hashed password.
 
@@ -411,16 +784,17 @@ def create_user(email: str, username: str, password: str):
         username (str): The user's username.
         password (str): The user's plain text password, which will be hashed before storage.
         email (str): The user's email address.
+        hashed_password (str | None): An already computed hash of `password`, stored as is when given.
 
     Returns:
         Union[dict, None]: The newly created user's data, or None if an error occurred.
     """
-    hashed_password = get_password_hash(password)
+    hashed_password = hashed_password or get_password_hash(password)
     query = """
     INSERT INTO users (email, username, hashed_password) VALUES (%s, %s, %s)
     """
     params = (email, username, hashed_password)
-    return execute_query(query, params=params, commit=True)
+    return execute_query(query, params=params, commit=True, name="create_user")
 
 
 def read_all_users():
@@ -431,7 +805,7 @@ def read_all_users():
     - The result of the `execute_query` function, which is a list of dictionaries where each dictionary represents a user without their hashed password.
     """
     query = "SELECT user_id, email, username FROM users"
-    return execute_query(query, fetch="all")
+    return execute_query(query, fetch="all", name="read_all_users")
 
 
 def read_user_by_id(user_id: int):
@@ -446,10 +820,10 @@ def read_user_by_id(user_id: int):
     """
     query = "SELECT user_id, email, username, is_guest FROM users WHERE user_id = %s"
     params = (user_id,)
-    return execute_query(query, params=params, fetch="one")[0]
+    return execute_query(query, params=params, fetch="one", name="read_user_by_id")[0]
 
 
-def update_user_info(user_id: int, new_email: str = None, new_username: str = None, new_password: str = None):
+def update_user_info(user_id: int, new_email: str = None, new_username: str = None, new_password: str = None, new_hashed_password: str = None):
     """
     Updates the information of an existing user in the users table based on their ID.
 
@@ -458,6 +832,7 @@ def update_user_info(user_id: int, new_email: str = None, new_username: str = No
     - new_email (str, optional): The new email address to update.
     - new_username (str, optional): The new username to update.
     - new_passowrd (str, optional): The new password to update.
+    - new_hashed_password (str, optional): An already computed hash of `new_password`, stored as is when given.
     Returns:
     - The result of the `execute_query` function, which could be True if the operation was successful and the transaction was committed, or None if an error occurred.
     """
@@ -471,7 +846,7 @@ def update_user_info(user_id: int, new_email: str = None, new_username: str = No
         updates.append("username = %s")
         params.append(new_username)
     if new_password:
-        new_hashed_password = get_password_hash(new_password)
+        new_hashed_password = new_hashed_password or get_password_hash(new_password)
         updates.append("hashed_password = %s")
         params.append(new_hashed_password)
 
@@ -485,7 +860,10 @@ def update_user_info(user_id: int, new_email: str = None, new_username: str = No
     params.append(user_id)  # For the WHERE clause
     query = "UPDATE users SET " + ", ".join(updates) + " WHERE user_id = %s"
 
-    return execute_query(query, params=params, commit=True)
+    result = execute_query(query, params=params, commit=True, name="update_user_info")
+    principal_cache.invalidate_user(user_id)
+
+    return result
 
 
 def delete_user(user_id: int):
@@ -500,7 +878,10 @@ def delete_user(user_id: int):
     """
     query = "DELETE FROM users WHERE user_id = %s"
     params = (user_id,)
-    return execute_query(query, params=params, commit=True)
+    result = execute_query(query, params=params, commit=True, name="delete_user")
+    principal_cache.invalidate_user(user_id)
+
+    return result
 
 
 def read_user_by_username(username: str):
@@ -515,7 +896,7 @@ def read_user_by_username(username: str):
     """
     query = "SELECT user_id, email, username, hashed_password, is_guest FROM users WHERE username = %s"
     params = (username,)
-    return execute_query(query, params=params, fetch="one")[0]
+    return execute_query(query, params=params, fetch="one", name="read_user_by_username")[0]
 
 def read_user_by_email(email: str):
     """
@@ -529,18 +910,79 @@ def read_user_by_email(email: str):
     """
     query = "SELECT user_id, email, username, hashed_password, is_guest FROM users WHERE email = %s"
     params = (email,)
-    return execute_query(query, params=params, fetch="one")[0]
+    return execute_query(query, params=params, fetch="one", name="read_user_by_email")[0]
 
-# get_songs_from_favorite_movies
-def get_songs_from_favorite_movies(user_id: int):
+def favorite_songs_query(user_id: int, after: dict | None = None, page_size: int | None = None) -> tuple:
+    """
+    Builds the query of the soundtrack songs of a user's favorite movies, in a stable (movie_id, song_id)
+    order so that pages can resume after the last song returned instead of skipping rows with OFFSET.
 
-    query = """
+    Parameters:
+    - user_id (int): The id of the user.
+    - after (dict|None): Keyset position ({"movie_id", "song_id"} of the last song of the previous page). Default is None.
+    - page_size (int|None): The maximum number of songs. Default is no limit.
+
+    Returns:
+    - tuple[str, tuple]: The SQL query and its parameters.
+
+    Raises:
+    - ValueError: If `after` has no integer "song_id".
+    """
+    where, params = "favorites.user_id = %s", [user_id]
+    if after is not None:
+        if not isinstance(after.get("song_id"), int):
+            raise ValueError("Invalid cursor.")
+        where += " AND (songs.movie_id, songs.song_id) > (%s, %s)"
+        params += [after["movie_id"], after["song_id"]]
+
+    limit = ""
+    if page_size is not None:
+        limit = "LIMIT %s"
+        params.append(page_size)
+
+    query = f"""
         SELECT songs.*, md.title, md.image_path as movie_image_path
         FROM movies_soundtracks as songs
         INNER JOIN movies_details md on songs.movie_id = md.movie_id
         INNER JOIN movies_favorites as favorites ON favorites.movie_id = songs.movie_id
-        WHERE favorites.user_id = %s;
+        WHERE {where}
+        ORDER BY songs.movie_id, songs.song_id
+        {limit};
     """
-    params = (user_id,)
+    return query, tuple(params)
+
+
+def get_songs_from_favorite_movies(user_id: int, page_size: int | None = None, after: dict | None = None):
+    """
+    Retrieves the soundtrack songs of a user's favorite movies, ordered by movie and song.
+
+    Parameters:
+    - user_id (int): The id of the user.
+    - page_size (int|None): The maximum number of songs to return. Default is all of them.
+    - after (dict|None): Keyset position of the last song of the previous page. Default is None.
 
-    return execute_query(query, params, commit=False)
+    Returns:
+    - list: A list of dictionaries, one per song, or None in case of an error.
+    """
+    query, params = favorite_songs_query(user_id, after, page_size)
+    return execute_query(query, params, commit=False, name="get_songs_from_favorite_movies")
+
+
+def stream_songs_from_favorite_movies(user_id: int, after: dict | None = None, page_size: int | None = None, batch_size: int = 500,
+                                      timeout: float | None = NDJSON_STREAM_TIMEOUT):
+    """
+    Yields the soundtrack songs of a user's favorite movies through a server-side cursor, in the order of
+    `get_songs_from_favorite_movies`, so that memory stays flat however many songs there are.
+
+    Parameters:
+    - user_id (int): The id of the user.
+    - after (dict|None): Keyset position to resume from. Default is None.
+    - page_size (int|None): The maximum number of songs. Default is all of them.
+    - batch_size (int): Songs fetched from the server per round trip. Default is 500.
+    - timeout (float|None): Forwarded to `stream_query`. Default is NDJSON_STREAM_TIMEOUT.
+
+    Returns:
+    - Iterator[dict]: The songs. The connection is held until the iterator is exhausted or closed.
+    """
+    query, params = favorite_songs_query(user_id, after, page_size)
+    return stream_query(query, params, batch_size=batch_size, timeout=timeout, name="stream_songs_from_favorite_movies")
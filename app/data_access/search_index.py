@@ -0,0 +1,85 @@
+import re
+from collections import defaultdict
+
+
+def trigrams(text: str) -> set:
+    """
+    Extracts the trigrams of a string the way pg_trgm does: lower-cased, split on non-alphanumeric
+    characters, with each word padded by two spaces in front and one behind.
+
+    Parameters:
+    - text (str): The string to split.
+
+    Returns:
+    - set: The distinct trigrams of the string.
+    """
+    grams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: set, b: set) -> float:
+    """
+    Trigram similarity of two trigram sets, matching pg_trgm's `similarity()`.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TitleSearchIndex:
+    def __init__(self, movies: list) -> None:
+        """
+        In-process stand-in for the pg_trgm title search, for tests and databases without the extension.
+
+        Parameters:
+        - movies (list): (movie_id, title) pairs to index.
+        """
+        self.titles = {movie_id: title or "" for movie_id, title in movies}
+        self._lowered = {movie_id: title.lower() for movie_id, title in self.titles.items()}
+        self._trigrams = {movie_id: trigrams(title) for movie_id, title in self.titles.items()}
+        self._postings = defaultdict(set)
+        for movie_id, title in self._lowered.items():
+            for i in range(len(title) - 2):
+                self._postings[title[i:i + 3]].add(movie_id)
+
+    def search(self, term: str, limit: int = 20, offset: int = 0, exclude: set = frozenset()) -> list:
+        """
+        Finds the movies whose title contains `term`, case-insensitively, ordered by trigram similarity
+        to the term and then by movie id, like the "trigram" search mode.
+
+        Parameters:
+        - term (str): The search term.
+        - limit (int): Maximum number of ids to return. Default is 20.
+        - offset (int): Number of matching ids to skip. Default is 0.
+        - exclude (set): Movie ids to leave out of the results, e.g. the user's favorites.
+
+        Returns:
+        - list: Matching movie ids, most relevant first.
+        """
+        return [movie_id for _, movie_id in self.ranked(term, exclude)][offset:offset + limit]
+
+    def ranked(self, term: str, exclude: set = frozenset()) -> list:
+        """
+        Returns every match as a (rank, movie_id) pair, most relevant first.
+        """
+        lowered = term.lower()
+        if not lowered:
+            return [(0.0, movie_id) for movie_id in sorted(self.titles) if movie_id not in exclude]
+
+        # Any title containing the term contains every raw trigram of the term
+        candidates = self.titles.keys()
+        if len(lowered) >= 3:
+            postings = [self._postings.get(lowered[i:i + 3], set()) for i in range(len(lowered) - 2)]
+            candidates = set.intersection(*sorted(postings, key=len))
+
+        term_trigrams = trigrams(term)
+        matches = [
+            (similarity(term_trigrams, self._trigrams[movie_id]), movie_id)
+            for movie_id in candidates
+            if movie_id not in exclude and lowered in self._lowered[movie_id]
+        ]
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches
@@ -1,12 +1,30 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import time
+
+# Taken before the application modules are imported, so the startup report includes their import
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from app.data_access.queries import *
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 from app.routers.v1 import movies as v1_movies_routes
 from app.routers.v1 import users as v1_users_routes
+from app.routers.v1 import admin as v1_admin_routes
 from app.routers import token as token_routes
+from app.data_access.db_connection import Database, PoolTimeout
+from app.auth.password import PasswordHasherBusy
+from app.utils.metrics import render_metrics
+from app.utils.request_metrics import RequestMetricsMiddleware
+from app.recommendations.worker import recommendation_refresher
+from app.recommendations.pipeline import get_movie_features, movies_model_registry
+from app.recommendations.liked_movies import get_liked_movies_index
+from app.recommendations.ranking import get_movie_popularity
+from app.recommendations.similar_movies import get_similar_movies_table
+from app.startup import Startup
+from contextlib import asynccontextmanager
+import asyncio
 
 
 # Load environment variables from .env file
@@ -14,8 +32,50 @@ load_dotenv()
 
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+startup = Startup(started_at=_import_started)
+startup.record("imports", time.perf_counter() - _import_started)
+
+
+async def initialise(startup: Startup) -> None:
+    """
+    Connects the database pool and loads the active model concurrently, then preloads the data the
+    recommendation pipeline reads on every request. Failed phases are reported by /health/startup;
+    the pool and the model are created again on first use, so the API recovers once the database is up.
+    """
+    database_ready, model_ready = await asyncio.gather(
+        # Startup retries the connection itself, so it can report every attempt
+        startup.run_phase("database", lambda: Database.connect(retries=1)),
+        startup.run_phase("model", movies_model_registry.ensure_loaded),
+    )
+    # Also retries the load if it failed, as no version is active yet
+    await movies_model_registry.start()
+
+    phases = []
+    for name, func in (("features", get_movie_features), ("liked_movies", get_liked_movies_index), ("popularity", get_movie_popularity)):
+        if not database_ready:
+            startup.skip(name, "database unavailable")
+        elif name == "features" and not model_ready:
+            startup.skip(name, "model unavailable")
+        else:
+            phases.append(startup.run_phase(name, func))
+    phases.append(startup.run_phase("similar_movies", get_similar_movies_table))
+    await asyncio.gather(*phases)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serving starts right away: /health/live answers while the pool and the model are initialised
+    await recommendation_refresher.start()
+    startup.start(initialise)
+    yield
+    await startup.stop()
+    await recommendation_refresher.stop()
+    await movies_model_registry.stop()
+    Database.close_all_connections()
+
+
 # Application Initialization
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 version = "v0.9"
 
@@ -29,6 +89,50 @@ async def main():
     """
     return RedirectResponse(url="/docs")
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Exposes application metrics in the Prometheus text format.
+    """
+    return render_metrics()
+
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests, whatever the state of its dependencies.
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    """
+    Readiness probe: 200 once the database pool is open and a model is active, 503 with the startup report otherwise.
+    """
+    if movies_model_registry.active is not None and Database.is_connected():
+        return {"status": "ready"}
+    return JSONResponse(status_code=503, content={"status": "starting", "startup": startup.report()}, headers={"Retry-After": "1"})
+
+@app.get("/health/startup", include_in_schema=False)
+async def startup_report():
+    """
+    Reports the time spent in each startup phase, with its status and number of attempts.
+    """
+    return startup.report()
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    """
+    Turns database pool exhaustion into a retryable 503 instead of a generic server error.
+    """
+    return JSONResponse(status_code=503, content={"detail": "Database is busy, please retry."}, headers={"Retry-After": "1"})
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """
+    Sheds load when the password hashing pool is saturated.
+    """
+    return JSONResponse(status_code=429, content={"detail": "Too many authentication requests, please retry."}, headers={"Retry-After": "1"})
+
 # CORS Configuration
 origins = ["*"]
 app.add_middleware(
@@ -37,7 +141,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["DELETE", "GET", "POST", "PUT"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(
     token_routes.router,
@@ -57,3 +163,9 @@ app.include_router(
     prefix="/api/v1/movies",
     tags=[version, "movies"]
 )
+
+app.include_router(
+    v1_admin_routes.router,
+    prefix="/api/v1/admin",
+    tags=[version, "admin"]
+)
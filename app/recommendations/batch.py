@@ -0,0 +1,212 @@
+"""
+Batch scoring: recomputes the recommendations of every user with favorites, e.g. as a nightly job.
+
+Users are streamed from `movies_favorites` in chunks. For each chunk, interest vectors and one vectorised
+neighbour search run on a process pool, the good-rated movies of all neighbours are read from the liked
+movies index or fetched with a single query, then ranked, and the chunk's recommendations are written in
+one transaction. Worker processes memory-map the model artifact and the feature store, so they share their pages.
+
+Usage:
+    python -m app.recommendations.batch --chunk-size 500 --workers 4
+"""
+import os
+import tempfile
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from multiprocessing import get_context
+from operator import itemgetter
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.data_access.queries import get_good_rated_movies_by_each_user_id, stream_query, write_movies_recommendations
+from app.recommendations.cache import favorites_fingerprint, recommendation_cache
+from app.recommendations.features import FEATURE_STORE_PATH, feature_store_exists
+from app.recommendations.liked_movies import get_liked_movies_index
+from app.recommendations.pipeline import KS_ATTEMPTS, get_movie_features, movies_model_registry, select_recommendations
+from app.recommendations.ranking import get_movie_popularity, neighbour_similarities
+from app.recommendations.scoring import init_worker, nearest_users, worker_nearest_users
+from models.artifacts import MANIFEST_FILENAME
+
+load_dotenv()
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def stream_user_favorites(chunk_size: int = BATCH_CHUNK_SIZE, user_ids: list | None = None):
+    """
+    Streams the favorites of every user (or of the given users) through a server-side cursor.
+
+    Parameters:
+    - chunk_size (int): Number of users per chunk. Default is BATCH_CHUNK_SIZE.
+    - user_ids (list[int]|None): Restricts the stream to these users. Default is every user with favorites.
+
+    Yields:
+    - dict: Chunks mapping user ids to their favorite movie ids, in user id order.
+    """
+    if user_ids is None:
+        query, params = "SELECT user_id, movie_id FROM movies_favorites ORDER BY user_id, movie_id;", None
+    else:
+        query, params = "SELECT user_id, movie_id FROM movies_favorites WHERE user_id = ANY(%s) ORDER BY user_id, movie_id;", (list(user_ids),)
+
+    chunk = {}
+    for user_id, rows in groupby(stream_query(query, params, as_dict=False, name="stream_user_favorites"), key=itemgetter(0)):
+        chunk[user_id] = [movie_id for _, movie_id in rows]
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = {}
+    if chunk:
+        yield chunk
+
+
+def recommend_chunk(favorites: dict, found, neighbors, distances) -> dict:
+    """
+    Turns the similar users of a chunk into recommendations, from the liked movies index if one was built,
+    otherwise with one query for all their good-rated movies.
+
+    Parameters:
+    - favorites (dict): Maps user ids to their favorite movie ids.
+    - found (np.ndarray): Users with at least one known favorite, as returned by `nearest_users`.
+    - neighbors (np.ndarray): Similar user ids per user, as returned by `nearest_users`.
+    - distances (np.ndarray): Distances of the similar users, as returned by `nearest_users`.
+
+    Returns:
+    - dict: Maps user ids to their recommended movie ids, empty when there are not enough.
+
+    Raises:
+    - RuntimeError: If the good-rated movies or the popularity prior could not be read.
+    """
+    liked_movies = get_liked_movies_index()
+    popularity = get_movie_popularity()
+    movies_by_user = defaultdict(list)
+    if liked_movies is None:
+        similar_users = sorted({user_id for user_id in neighbors[found].ravel().tolist() if user_id >= 0})
+        rated_movies = get_good_rated_movies_by_each_user_id(similar_users) if similar_users else []
+        if rated_movies is None:
+            raise RuntimeError("Could not read the good-rated movies of similar users.")
+        for user_id, movie_id in rated_movies:
+            movies_by_user[user_id].append(movie_id)
+
+    recommendations = {}
+    for (user_id, favorite_ids), user_found, user_neighbors, user_distances in zip(favorites.items(), found, neighbors, distances):
+        if not user_found:
+            recommendations[user_id] = []
+            continue
+        similar = user_neighbors.tolist()
+        pairs = None if liked_movies is not None else [(similar_user, movie_id) for similar_user in similar for movie_id in movies_by_user.get(similar_user, ())]
+        _, recommendations[user_id] = select_recommendations([similar[:k] for k in KS_ATTEMPTS], pairs, favorite_ids, liked_movies,
+                                                            neighbour_similarities(user_distances), popularity)
+    return recommendations
+
+
+def active_model_path() -> Path:
+    """
+    Path of the artifact version (or pickle) served by the registry, for worker processes to load.
+    """
+    version_dir = movies_model_registry.path / str(movies_model_registry.version)
+    return version_dir if (version_dir / MANIFEST_FILENAME).exists() else movies_model_registry.path
+
+
+def run_batch(chunk_size: int = BATCH_CHUNK_SIZE, workers: int = BATCH_WORKERS, mode: str = "diff",
+              user_ids: list | None = None, progress: bool = False, update_cache: bool = False) -> dict:
+    """
+    Recomputes and stores the recommendations of every user with favorites, or of the given users.
+
+    Parameters:
+    - chunk_size (int): Number of users scored and written together. Default is BATCH_CHUNK_SIZE.
+    - workers (int): Number of scoring processes. 0 scores in the calling process. Default is BATCH_WORKERS.
+    - mode (str): Write mode of `write_movies_recommendations`, "diff" or "replace". Default is "diff".
+    - user_ids (list[int]|None): Restricts the run to these users. Default is every user with favorites.
+    - progress (bool): If True, prints the throughput after each chunk. Default is False.
+    - update_cache (bool): If True, drops the cached lists of the scored users and marks their recommendations
+                           as materialised for their favorites, so the online pipeline skips them. Only meaningful
+                           in the API process (the admin endpoint), as the cache is per process. Default is False.
+
+    Returns:
+    - dict: The number of "users" scored and of users "with_recommendations", the "seconds" taken,
+            "users_per_second", and the seconds spent waiting on "neighbors", "ratings" and "writes".
+
+    Raises:
+    - RuntimeError: If the good-rated movies could not be read or recommendations could not be written.
+    """
+    model = movies_model_registry.ensure_loaded()
+    store = get_movie_features(model)
+    k = max(KS_ATTEMPTS)
+    report = {"users": 0, "with_recommendations": 0, "neighbors": 0.0, "ratings": 0.0, "writes": 0.0}
+    start = time.perf_counter()
+
+    def finish_chunk(favorites, found, neighbors, distances):
+        stage = time.perf_counter()
+        recommendations = recommend_chunk(favorites, found, neighbors, distances)
+        report["ratings"] += time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        if write_movies_recommendations(recommendations, mode=mode) is None:
+            raise RuntimeError("Could not write recommendations.")
+        report["writes"] += time.perf_counter() - stage
+
+        if update_cache:
+            # Every favorite of the user, fingerprinted like the online pipeline does
+            for user_id, favorite_ids in favorites.items():
+                recommendation_cache.invalidate(user_id)
+                recommendation_cache.mark_materialised(user_id, favorites_fingerprint(favorite_ids))
+        report["users"] += len(recommendations)
+        report["with_recommendations"] += sum(1 for ids in recommendations.values() if ids)
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"{report['users']} users in {elapsed:.1f}s ({report['users'] / elapsed:.0f} users/s)", flush=True)
+
+    def finish_next(pending):
+        favorites, future = pending.popleft()
+        stage = time.perf_counter()
+        found, neighbors, distances = future.result()
+        report["neighbors"] += time.perf_counter() - stage
+        finish_chunk(favorites, found, neighbors, distances)
+
+    chunks = stream_user_favorites(chunk_size, user_ids)
+    if workers <= 0:
+        for favorites in chunks:
+            stage = time.perf_counter()
+            found, neighbors, distances = nearest_users(model, store, list(favorites.values()), k)
+            report["neighbors"] += time.perf_counter() - stage
+            finish_chunk(favorites, found, neighbors, distances)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Workers memory-map the features, from the configured store or from a copy of the loaded one
+            features_path = FEATURE_STORE_PATH if feature_store_exists(FEATURE_STORE_PATH) else tmp
+            if features_path == tmp:
+                store.save(tmp)
+
+            with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=init_worker,
+                                     initargs=(str(active_model_path()), features_path)) as pool:
+                # Keep every worker busy while the parent queries and writes finished chunks
+                pending = deque()
+                for favorites in chunks:
+                    pending.append((favorites, pool.submit(worker_nearest_users, list(favorites.values()), k)))
+                    while len(pending) > 2 * workers:
+                        finish_next(pending)
+                while pending:
+                    finish_next(pending)
+
+    report["seconds"] = time.perf_counter() - start
+    report["users_per_second"] = report["users"] / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Scoring processes, 0 to score in this process.")
+    parser.add_argument("--mode", choices=("diff", "replace"), default="diff")
+    parser.add_argument("--users", type=int, nargs="+", default=None, help="Only score these user ids.")
+    args = parser.parse_args()
+
+    report = run_batch(args.chunk_size, args.workers, args.mode, args.users, progress=True)
+    print(f"Scored {report['users']} users ({report['with_recommendations']} with recommendations) in {report['seconds']:.1f}s: "
+          f"{report['users_per_second']:.0f} users/s. Waiting on neighbours {report['neighbors']:.1f}s, "
+          f"ratings {report['ratings']:.1f}s, writes {report['writes']:.1f}s.")
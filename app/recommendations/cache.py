@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+from cachetools import LRUCache, TTLCache
+from dotenv import load_dotenv
+
+from app.utils.metrics import Counter
+
+load_dotenv()
+
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 10000))
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", 600))
+
+
+def favorites_fingerprint(movie_ids) -> str:
+    """
+    Computes an order-independent fingerprint of a set of favorite movie ids.
+
+    Parameters:
+    - movie_ids (Iterable[int]): The user's favorite movie ids.
+
+    Returns:
+    - str: A hex digest that only changes when the set of ids changes.
+    """
+    payload = ",".join(str(movie_id) for movie_id in sorted(set(movie_ids)))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class RecommendationCache:
+    def __init__(self, maxsize: int = RECOMMENDATION_CACHE_SIZE, ttl: float = RECOMMENDATION_CACHE_TTL) -> None:
+        """
+        In-process cache of served recommendations and of the favorites they were computed from.
+
+        Two stores are kept per user:
+        - the recommendations last served, with a TTL, dropped whenever the user's favorites change;
+        - the fingerprint of the favorites behind the recommendations currently materialised in
+          `movies_recommendations`, which survives invalidation so that a recomputation can be
+          skipped when the favorites end up unchanged (e.g. a movie added and removed again).
+
+        Entries are per worker process; the TTL bounds how stale another worker's view can get.
+
+        Parameters:
+        - maxsize (int): Maximum number of users kept in each store.
+        - ttl (float): Seconds after which served recommendations expire.
+        """
+        self._recommendations = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._fingerprints = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.hits = Counter("recommendation_cache_hits_total", "Recommendation requests served from the in-process cache.")
+        self.misses = Counter("recommendation_cache_misses_total", "Recommendation requests that ran the recommendation pipeline.")
+
+    def get(self, user_id: int):
+        """
+        Returns the cached recommendations for a user, or None if there are none.
+        """
+        with self._lock:
+            recommendations = self._recommendations.get(user_id)
+        (self.misses if recommendations is None else self.hits).inc()
+        return recommendations
+
+    def set(self, user_id: int, recommendations: list) -> None:
+        with self._lock:
+            self._recommendations[user_id] = recommendations
+
+    def is_materialised(self, user_id: int, fingerprint: str) -> bool:
+        """
+        Tells whether the stored recommendations of a user were computed from the favorites identified by `fingerprint`.
+        """
+        with self._lock:
+            return self._fingerprints.get(user_id) == fingerprint
+
+    def mark_materialised(self, user_id: int, fingerprint: str) -> None:
+        with self._lock:
+            self._fingerprints[user_id] = fingerprint
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drops the served recommendations of a user after their favorites changed.
+        """
+        with self._lock:
+            self._recommendations.pop(user_id, None)
+
+    def forget(self, user_id: int) -> None:
+        """
+        Drops everything known about a user, e.g. after their favorites and recommendations were deleted.
+        """
+        with self._lock:
+            self._recommendations.pop(user_id, None)
+            self._fingerprints.pop(user_id, None)
+
+    def clear_materialised(self) -> None:
+        """
+        Forgets which favorites every stored recommendation was computed from, e.g. after the model changed,
+        so the next refresh of each user recomputes instead of being skipped.
+        """
+        with self._lock:
+            self._fingerprints.clear()
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+from models.versions import find_version, load_arrays, save_arrays
+
+load_dotenv()
+
+# Directory written by `python -m app.recommendations.features`; when unset or missing the store is read from the database
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "")
+FEATURE_STORE_MMAP = os.getenv("FEATURE_STORE_MMAP", "true").lower() == "true"
+
+NON_FEATURE_COLUMNS = ("movie_id", "title")
+STORE_FORMAT = 1
+
+_feature_store = None
+_feature_store_lock = threading.Lock()
+
+
+class FeatureStore:
+    def __init__(self, movie_ids, features, columns: list) -> None:
+        """
+        Preprocessed movie features as one float32 matrix, with a movie_id -> row lookup.
+
+        Parameters:
+        - movie_ids (array-like): The movie id of each row of `features`.
+        - features (np.ndarray): One row of features per movie. May be a read-only memory map.
+        - columns (list): Feature names, in the order of the matrix columns.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        order = np.argsort(movie_ids, kind="stable")
+        self.columns = list(columns)
+        self.features = features
+        # Sorted ids and the row each one points to, so lookups are a single searchsorted
+        self._sorted_ids = movie_ids[order]
+        self._sorted_rows = order
+
+    @classmethod
+    def from_rows(cls, rows) -> "FeatureStore":
+        """
+        Builds a store from `movies_preprocessed` rows, with the feature columns in alphabetical order
+        like `get_user_interest_df`.
+
+        Parameters:
+        - rows (Iterable[dict]): Rows with "movie_id", "title" and one key per feature.
+        """
+        movie_ids, vectors, columns = [], [], None
+        for row in rows:
+            if columns is None:
+                columns = sorted(column for column in row if column not in NON_FEATURE_COLUMNS)
+            movie_ids.append(row["movie_id"])
+            vectors.append([row[column] for column in columns])
+        features = np.asarray(vectors, dtype=np.float32).reshape(len(movie_ids), len(columns or []))
+        return cls(movie_ids, features, columns or [])
+
+    @classmethod
+    def open(cls, path, mmap: bool = True) -> "FeatureStore":
+        """
+        Opens the latest store written by `save`, or a store written before it was versioned.
+
+        Parameters:
+        - path (str|Path): The store directory.
+        - mmap (bool): If True the feature matrix is memory-mapped read-only instead of read into memory. Default is True.
+
+        Raises:
+        - FileNotFoundError: If no store was saved at `path`.
+        - ValueError: If the store has an unsupported format.
+        """
+        path = Path(path)
+        mmap_mode = "r" if mmap else None
+        if find_version(path) is None and (path / "columns.json").exists():
+            columns = json.loads((path / "columns.json").read_text())
+            return cls(np.load(path / "movie_ids.npy"), np.load(path / "features.npy", mmap_mode=mmap_mode), columns)
+
+        manifest, arrays = load_arrays(path, mmap=mmap)
+        if manifest.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported feature store format {manifest.get('format')} in {find_version(path)}")
+        return cls(arrays["movie_ids"], arrays["features"], manifest["columns"])
+
+    def save(self, path) -> None:
+        """
+        Writes the store as a new version of `path` (see models/versions.py), so that `open` can memory-map it
+        and processes that already mapped the previous version keep reading intact files.
+
+        Parameters:
+        - path (str|Path): The directory to write, created if needed.
+        """
+        arrays = {"features": np.asarray(self.features, dtype=np.float32), "movie_ids": self.movie_ids}
+        save_arrays(path, arrays, {"format": STORE_FORMAT, "columns": self.columns})
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        """
+        The movie id of each row, in row order.
+        """
+        movie_ids = np.empty_like(self._sorted_ids)
+        movie_ids[self._sorted_rows] = self._sorted_ids
+        return movie_ids
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def rows(self, movie_ids) -> np.ndarray:
+        """
+        Looks up the rows of the given movies. Unknown movie ids are skipped.
+
+        Parameters:
+        - movie_ids (array-like): The movie ids to look up.
+
+        Returns:
+        - np.ndarray: The row numbers of the known movies, in the order given.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).ravel()
+        positions = np.searchsorted(self._sorted_ids, movie_ids)
+        positions[positions == len(self._sorted_ids)] = 0
+        found = self._sorted_ids[positions] == movie_ids if len(self._sorted_ids) else np.zeros(len(movie_ids), dtype=bool)
+        return self._sorted_rows[positions[found]]
+
+    def select(self, columns: list) -> "FeatureStore":
+        """
+        Returns a store with the features reordered to `columns`, e.g. the feature order a model was trained with.
+
+        Raises:
+        - ValueError: If a column is not in the store.
+        """
+        if list(columns) == self.columns:
+            return self
+        positions = [self.columns.index(column) for column in columns]
+        return FeatureStore(self.movie_ids, np.ascontiguousarray(self.features[:, positions]), columns)
+
+    def interest_vector(self, movie_ids) -> np.ndarray | None:
+        """
+        Summarises a user's interests as the mean feature vector of their favorite movies.
+
+        Parameters:
+        - movie_ids (list[int]): The user's favorite movie ids.
+
+        Returns:
+        - np.ndarray: A (1, n_features) float32 array, or None if none of the movies has features.
+        """
+        rows = np.unique(self.rows(movie_ids))
+        if not len(rows):
+            return None
+        return self.features[rows].mean(axis=0, keepdims=True, dtype=np.float64).astype(np.float32)
+
+    def interest_vectors(self, favorites: list) -> tuple:
+        """
+        Batch version of `interest_vector` for many users.
+
+        Parameters:
+        - favorites (list[list[int]]): The favorite movie ids of each user.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: A (n_users, n_features) float32 array of interest vectors and a
+                                         boolean mask of the users with at least one known movie. Rows of
+                                         users without one are zero.
+        """
+        rows = [np.unique(self.rows(movie_ids)) for movie_ids in favorites]
+        counts = np.array([len(user_rows) for user_rows in rows], dtype=np.int64)
+        vectors = np.zeros((len(favorites), self.features.shape[1]), dtype=np.float32)
+        found = counts > 0
+        if found.any():
+            all_rows = np.concatenate([user_rows for user_rows in rows if len(user_rows)])
+            starts = np.concatenate(([0], np.cumsum(counts[found])[:-1]))
+            sums = np.add.reduceat(self.features[all_rows].astype(np.float64), starts, axis=0)
+            vectors[found] = sums / counts[found, None]
+        return vectors, found
+
+    def memory_usage(self) -> int:
+        """
+        Bytes held by the store, counting a memory-mapped matrix at its full size.
+        """
+        return self.features.nbytes + self._sorted_ids.nbytes + self._sorted_rows.nbytes
+
+
+def feature_store_exists(path) -> bool:
+    """
+    Tells whether a feature store was saved at `path`.
+    """
+    return bool(path) and (find_version(path) is not None or Path(path, "columns.json").exists())
+
+
+def load_feature_store() -> FeatureStore:
+    """
+    Loads the feature store from FEATURE_STORE_PATH if it exists, memory-mapped when FEATURE_STORE_MMAP is
+    true, otherwise from the `movies_preprocessed` table.
+
+    Raises:
+    - RuntimeError: If the table could not be read.
+    """
+    if feature_store_exists(FEATURE_STORE_PATH):
+        return FeatureStore.open(FEATURE_STORE_PATH, mmap=FEATURE_STORE_MMAP)
+
+    # Imported here so that FeatureStore can be used without a configured database
+    from app.data_access.queries import stream_query
+    try:
+        return FeatureStore.from_rows(stream_query("SELECT * FROM movies_preprocessed;", name="load_feature_store"))
+    except Exception as e:
+        raise RuntimeError(f"Could not load movie features: {e}") from e
+
+
+def get_feature_store(load: bool = True) -> FeatureStore | None:
+    """
+    Returns the process-wide feature store, loading it on first use.
+
+    Parameters:
+    - load (bool): If False, returns None instead of loading a store that is not loaded yet. Default is True.
+    """
+    global _feature_store
+    if _feature_store is None and load:
+        with _feature_store_lock:
+            if _feature_store is None:
+                _feature_store = load_feature_store()
+    return _feature_store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exports `movies_preprocessed` as a memory-mappable feature store.")
+    parser.add_argument("--output", default=FEATURE_STORE_PATH or "models/movies_features")
+    args = parser.parse_args()
+
+    from app.data_access.queries import stream_query
+    store = FeatureStore.from_rows(stream_query("SELECT * FROM movies_preprocessed;", name="build_feature_store"))
+    store.save(args.output)
+    print(f"Saved {len(store)} movies x {len(store.columns)} features ({store.memory_usage() / 2**20:.1f} MiB) to {args.output}")
@@ -0,0 +1,96 @@
+"""
+In-process index of the movies each user rated well, replacing per-request `movies_ratings` queries.
+
+Usage:
+    python -m app.recommendations.liked_movies refresh
+    python -m app.recommendations.liked_movies report
+"""
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+from models.liked_movies_index import LikedMoviesIndex
+from models.versions import find_version
+
+load_dotenv()
+
+# Directory written by the refresh command; when missing, good-rated movies are queried from the database
+LIKED_MOVIES_INDEX_PATH = os.getenv("LIKED_MOVIES_INDEX_PATH", "models/liked_movies_index")
+GOOD_RATING = 4.0
+
+_liked_movies_index = None
+_liked_movies_index_lock = threading.Lock()
+
+
+def build_liked_movies_index(min_rating: float = GOOD_RATING, batch_size: int = 100_000) -> LikedMoviesIndex:
+    """
+    Builds the index from the `movies_ratings` table, streaming the ratings in batches.
+
+    Parameters:
+    - min_rating (float): Ratings at or above this value count as liked. Default is GOOD_RATING.
+    - batch_size (int): Rows converted to arrays at a time. Default is 100000.
+    """
+    # Imported here so that the index can be loaded without a configured database
+    from app.data_access.queries import stream_query
+
+    rows = stream_query("SELECT user_id, movie_id FROM movies_ratings WHERE rating >= %s;", (min_rating,), batch_size=batch_size, as_dict=False, name="build_liked_movies_index")
+    batches, batch = [], []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            batches.append(np.array(batch, dtype=np.int64))
+            batch = []
+    if batch:
+        batches.append(np.array(batch, dtype=np.int64))
+
+    pairs = np.concatenate(batches) if batches else np.empty((0, 2), dtype=np.int64)
+    return LikedMoviesIndex.from_pairs(pairs[:, 0], pairs[:, 1], min_rating)
+
+
+def refresh_liked_movies_index(path=LIKED_MOVIES_INDEX_PATH, min_rating: float = GOOD_RATING) -> LikedMoviesIndex:
+    """
+    Rebuilds the index from the database and atomically replaces the one stored at `path`.
+    Running servers pick it up on their next model swap or restart.
+    """
+    index = build_liked_movies_index(min_rating)
+    index.save(path)
+    return index
+
+
+def get_liked_movies_index() -> LikedMoviesIndex | None:
+    """
+    Returns the process-wide index, memory-mapping it on first use, or None if none was built.
+    """
+    global _liked_movies_index
+    if _liked_movies_index is None and find_version(LIKED_MOVIES_INDEX_PATH) is not None:
+        with _liked_movies_index_lock:
+            if _liked_movies_index is None:
+                _liked_movies_index = LikedMoviesIndex.open(LIKED_MOVIES_INDEX_PATH)
+    return _liked_movies_index
+
+
+def reload_liked_movies_index() -> LikedMoviesIndex | None:
+    """
+    Drops the loaded index so the next use maps the files currently on disk.
+    """
+    global _liked_movies_index
+    with _liked_movies_index_lock:
+        _liked_movies_index = None
+    return get_liked_movies_index()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("refresh", "report"))
+    parser.add_argument("--path", default=LIKED_MOVIES_INDEX_PATH)
+    parser.add_argument("--min-rating", type=float, default=GOOD_RATING)
+    args = parser.parse_args()
+
+    index = refresh_liked_movies_index(args.path, args.min_rating) if args.command == "refresh" else LikedMoviesIndex.open(args.path)
+    report = index.memory_report()
+    print(f"{report['users']} users, {report['pairs']} liked movies (rating >= {index.min_rating}): "
+          f"{report['bytes'] / 2**20:.1f} MiB as arrays, ~{report['python_bytes'] / 2**20:.1f} MiB as Python lists")
@@ -0,0 +1,259 @@
+from fastapi import HTTPException
+from app.data_access.async_queries import *
+from app.data_access.db_connection import Database, PoolTimeout
+from app.utils.utils import smallest_sufficient_neighbourhood
+from app.utils.metrics import Counter, Histogram
+from app.recommendations.cache import recommendation_cache, favorites_fingerprint
+from app.recommendations.features import FeatureStore, get_feature_store
+from app.recommendations.registry import ModelRegistry, smoke_query
+from app.recommendations.liked_movies import get_liked_movies_index, reload_liked_movies_index
+from app.recommendations.similar_movies import reload_similar_movies_table
+from app.recommendations.ranking import MoviePopularity, get_movie_popularity_nowait, neighbour_similarities, rank_candidates
+from dotenv import load_dotenv
+import asyncio
+import functools
+import numpy as np
+import os
+
+load_dotenv()
+
+knn_rounds_saved = Counter("recommendation_knn_rounds_saved_total", "kNN searches avoided by evaluating every neighbourhood size from a single search.")
+rating_queries_saved = Counter("recommendation_rating_queries_saved_total", "Good-rated movies queries avoided by resolving every neighbourhood size from a single query.")
+stage_seconds = Histogram("recommendation_stage_duration_seconds", "Time spent in each stage of the recommendation pipeline.", ("stage",))
+pipeline_errors = Counter("recommendation_pipeline_errors_total", "Recommendation pipeline runs that failed, by the stage that raised.", ("stage",))
+
+# Neighbourhood sizes tried in turn until one has liked enough movies
+KS_ATTEMPTS = [5,10,15,20,25,30,35,40,45,50]
+MINIMUM_RECOMMENDATIONS = 20
+MAX_RECS = 30
+
+_movie_features = None
+# Future of the load started by the first request that found no feature store, shared by the requests waiting on it
+_movie_features_load = None
+
+
+def _aligned_movie_features(model) -> FeatureStore | None:
+    store = _movie_features
+    if store is None or (model.feature_columns and store.columns != model.feature_columns):
+        return None
+    return store
+
+
+def get_movie_features(model=None) -> FeatureStore:
+    """
+    Returns the movie feature store with its columns in the order a model was trained with, loading it on first use.
+
+    Parameters:
+    - model (SimilarUsersRecommenders|None): The model to align with. Default is the active model.
+    """
+    global _movie_features
+    model = model or movies_model_registry.ensure_loaded()
+    store = _aligned_movie_features(model)
+    if store is None:
+        store = get_feature_store()
+        store = store.select(model.feature_columns) if model.feature_columns else store
+        _movie_features = store
+    return store
+
+
+async def get_movie_features_async(model) -> FeatureStore:
+    """
+    `get_movie_features` for the event loop. When the store was not preloaded at startup, it is loaded on the
+    database executor, once for all the requests that need it meanwhile, instead of streaming
+    `movies_preprocessed` on the event loop.
+
+    Raises:
+    - HTTPException: 503 if the store could not be loaded.
+    - PoolTimeout: If the load could not be queued on the database executor.
+    """
+    global _movie_features_load
+    store = _aligned_movie_features(model)
+    if store is not None:
+        return store
+    load = _movie_features_load
+    if load is None or load.done():
+        load = _movie_features_load = Database.submit(functools.partial(get_movie_features, model))
+    try:
+        return await asyncio.wrap_future(load)
+    except RuntimeError as e:
+        print(f"Movie features are not available: {e}")
+        raise HTTPException(status_code=503, detail="Recommendations are not available yet, please retry.", headers={"Retry-After": "1"})
+
+
+def select_recommendations(neighbourhoods: list, rated_movies: list | None, favorite_ids: list, liked_movies=None, similarities=None,
+                           popularity: MoviePopularity | None = None) -> tuple:
+    """
+    Picks a user's recommendations from the good-rated movies of their smallest sufficient neighbourhood,
+    ranked by neighbour similarity and movie popularity (see app/recommendations/ranking.py).
+
+    Parameters:
+    - neighbourhoods (list[list[int]]): Growing, distance-ordered prefixes of similar user ids, one per KS_ATTEMPTS.
+    - rated_movies (list[tuple[int, int]]|None): (user_id, movie_id) pairs covering every user of the largest neighbourhood.
+                                                 Unused when `liked_movies` is given.
+    - favorite_ids (list[int]): The user's favorite movie ids, never recommended.
+    - liked_movies (LikedMoviesIndex|None): In-memory good-rated movies of every user, replacing `rated_movies`.
+    - similarities (np.ndarray|None): Similarity of each user of the largest neighbourhood. Default weighs every neighbour equally.
+    - popularity (MoviePopularity|None): Popularity prior of the ranking. Default ranks on neighbour similarity only.
+
+    Returns:
+    - tuple[int, list]: The number of neighbourhoods evaluated and the MAX_RECS best movie ids, best first, or an
+                        empty list if no neighbourhood liked MINIMUM_RECOMMENDATIONS movies.
+    """
+    if liked_movies is not None:
+        attempts, movies_ids_recommendations = liked_movies.smallest_sufficient_neighbourhood(neighbourhoods, MINIMUM_RECOMMENDATIONS)
+    else:
+        attempts, movies_ids_recommendations = smallest_sufficient_neighbourhood(neighbourhoods, rated_movies, MINIMUM_RECOMMENDATIONS)
+    if len(movies_ids_recommendations) < MINIMUM_RECOMMENDATIONS:
+        return attempts, []
+
+    # Every occurrence of a liked movie weighs the similarity of the neighbour who liked it
+    users = neighbourhoods[attempts - 1]
+    user_weights = np.ones(len(users), dtype=np.float32) if similarities is None else np.asarray(similarities[:len(users)], dtype=np.float32)
+    if liked_movies is not None:
+        movie_ids, bounds = liked_movies.liked_by(users)
+        weights = np.repeat(user_weights, np.diff(bounds, prepend=0))
+    else:
+        ranks = {user_id: rank for rank, user_id in enumerate(users)}
+        occurrences = [(movie_id, ranks[user_id]) for user_id, movie_id in rated_movies if user_id in ranks]
+        movie_ids = [movie_id for movie_id, _ in occurrences]
+        weights = user_weights[[rank for _, rank in occurrences]]
+
+    return attempts, rank_candidates(movie_ids, weights, favorite_ids, MAX_RECS, popularity)
+
+
+def validate_movies_model(model) -> None:
+    """
+    Rejects a model that fails the smoke query or needs features the feature store does not have.
+    """
+    smoke_query(model)
+    store = get_feature_store(load=False)
+    if store is not None and model.feature_columns:
+        missing = set(model.feature_columns) - set(store.columns)
+        if missing:
+            raise ValueError(f"The model needs unknown features: {sorted(missing)}")
+
+
+def on_movies_model_swap(model) -> None:
+    # Stored recommendations were computed by the previous model, so unchanged favorites must not skip a refresh
+    recommendation_cache.clear_materialised()
+    # The liked movies index and the similar movies table are rebuilt alongside the model
+    reload_liked_movies_index()
+    reload_similar_movies_table()
+
+
+# Model Loading: an artifact directory (see models/artifacts.py) or a legacy .pkl file
+movies_model_filename = os.getenv("MOVIES_MODEL_PATH", "models/movies_similar_users_recommender")
+# Loaded by the API at startup (see app/main.py), or on first use by scripts
+movies_model_registry = ModelRegistry(movies_model_filename, validate=validate_movies_model, on_swap=on_movies_model_swap)
+
+
+async def generate_movies_recommendations(user_id: int):
+    """
+    Generates and updates movie recommendations for a user based on their favorite movies.
+
+    Parameters:
+    - user_id (int): The id of the user, used to identify their list of favorite movies.
+
+    Raises:
+    - HTTPException: If there's an error in fetching the favorites, if the favorites list is too short,
+                     or if there's an error during the recommendation process. 503 while the model is not loaded.
+    """
+    # Requests keep the model they started with, even if a new version is swapped in meanwhile
+    movies_model = movies_model_registry.active
+    if movies_model is None:
+        raise HTTPException(status_code=503, detail="Recommendations are not available yet, please retry.", headers={"Retry-After": "1"})
+    # Stage being run, reported with unexpected errors
+    stage = "favorites"
+
+    try:
+        # Retrieve every favorite movie of the user, not a page of them: all of them are fingerprinted and excluded
+        with stage_seconds.time(stage=stage):
+            favorite_resources_ids = await get_favorite_movie_ids_by_user_async(user_id)
+
+        if favorite_resources_ids == None:
+            return []
+
+        # Skip the pipeline if the stored recommendations already reflect these favorites
+        fingerprint = favorites_fingerprint(favorite_resources_ids)
+        if recommendation_cache.is_materialised(user_id, fingerprint):
+            return
+
+        # Check if there are enough favorite movies to generate recommendations
+        if len(favorite_resources_ids) < 1:
+            stage = "write"
+            with stage_seconds.time(stage=stage):
+                await reset_movies_recommendations_async(user_id)
+            recommendation_cache.mark_materialised(user_id, fingerprint)
+            return []
+
+        # Summarize user interests as the mean feature vector of the favorite movies
+        stage = "features"
+        with stage_seconds.time(stage=stage):
+            store = await get_movie_features_async(movies_model)
+            user_interest = await asyncio.wrap_future(Database.submit(functools.partial(store.interest_vector, favorite_resources_ids)))
+        if user_interest is None:
+            stage = "write"
+            with stage_seconds.time(stage=stage):
+                await reset_movies_recommendations_async(user_id)
+            recommendation_cache.mark_materialised(user_id, fingerprint)
+            return []
+
+        # Use model to find similar users, with one search for the largest k; smaller neighbourhoods are prefixes of it
+        stage = "knn"
+        with stage_seconds.time(stage=stage):
+            similar_users, distances = movies_model.recommend_similar_users_with_distances(user_interest, max(KS_ATTEMPTS))
+        neighbourhoods = [similar_users[:k] for k in KS_ATTEMPTS]
+
+        # Get recommendations from similar users' good-rated movies, in memory or for all of them at once
+        stage = "ratings"
+        with stage_seconds.time(stage=stage):
+            liked_movies = get_liked_movies_index()
+            rated_movies = None if liked_movies is not None else await get_good_rated_movies_by_each_user_id_async(neighbourhoods[-1])
+
+        stage = "ranking"
+        with stage_seconds.time(stage=stage):
+            attempts, final_recommendation_ids = select_recommendations(neighbourhoods, rated_movies, favorite_resources_ids, liked_movies,
+                                                                        neighbour_similarities(distances), get_movie_popularity_nowait())
+        knn_rounds_saved.inc(attempts - 1)
+        rating_queries_saved.inc(attempts if liked_movies is not None else attempts - 1)
+
+        # Update user recommendations
+        stage = "write"
+        if not final_recommendation_ids:
+            with stage_seconds.time(stage=stage):
+                await reset_movies_recommendations_async(user_id)
+            recommendation_cache.mark_materialised(user_id, fingerprint)
+            return []
+
+        with stage_seconds.time(stage=stage):
+            written = await update_movies_recommendations_async(final_recommendation_ids, user_id)
+        if written:
+            recommendation_cache.mark_materialised(user_id, fingerprint)
+
+    except (HTTPException, PoolTimeout):
+        # Retryable 503s, not pipeline failures
+        raise
+    except Exception as e:
+        # Handle unexpected errors
+        pipeline_errors.inc(stage=stage)
+        print(f"Recommendation pipeline failed for user {user_id} during {stage}: {e!r}")
+        raise HTTPException(status_code=500, detail="An error occurred during the recommendation process.")
+
+
+async def refresh_movies_recommendations(user_id: int) -> list:
+    """
+    Regenerates a user's recommendations and caches the list served by the recommendation endpoint.
+
+    Parameters:
+    - user_id (int): The id of the user whose recommendations should be refreshed.
+
+    Returns:
+    - list: The freshly materialised recommendations, or None if they could not be read back.
+    """
+    await generate_movies_recommendations(user_id)
+
+    recs = await get_all_movies_recommendation_async(user_id)
+    if recs is not None:
+        recommendation_cache.set(user_id, recs)
+
+    return recs
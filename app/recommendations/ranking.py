@@ -0,0 +1,190 @@
+"""
+Scoring stage of the recommendation pipeline: ranks the movies liked by a user's neighbours instead of
+truncating them in arbitrary order.
+
+A candidate's score is the summed similarity of the neighbours who liked it, boosted by how widely rated and
+how popular the movie is:
+
+    score = sum(1 / (1 + distance of each neighbour who liked it)) * (1 + prior)
+    prior = RATING_COUNT_WEIGHT * log1p(rating_count) / log1p(max rating_count)
+          + POPULARITY_WEIGHT * popularity_score / max popularity_score
+"""
+import os
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATING_COUNT_WEIGHT = float(os.getenv("RECOMMENDATION_RATING_COUNT_WEIGHT", 0.5))
+POPULARITY_WEIGHT = float(os.getenv("RECOMMENDATION_POPULARITY_WEIGHT", 0.5))
+
+# Candidates are aggregated with a bincount over the id range only while that range is within this multiple of
+# the number of occurrences; sparser ids go through a sort, so one call never allocates for every movie id
+DENSE_ID_RANGE_FACTOR = 4
+
+# Seconds before a failed load of the popularity prior is retried by requests, which rank without it meanwhile
+POPULARITY_RETRY_INTERVAL = float(os.getenv("RECOMMENDATION_POPULARITY_RETRY_INTERVAL", 60))
+
+_movie_popularity = None
+_movie_popularity_lock = threading.Lock()
+# Background load started by `get_movie_popularity_nowait`, and when a failed one may be retried
+_movie_popularity_load = None
+_movie_popularity_retry_at = 0.0
+
+
+class MoviePopularity:
+    def __init__(self, movie_ids, rating_counts, popularity_scores,
+                 rating_count_weight: float = RATING_COUNT_WEIGHT, popularity_weight: float = POPULARITY_WEIGHT) -> None:
+        """
+        Per-movie popularity prior, precomputed once as a float32 array with a sorted movie_id lookup.
+
+        Parameters:
+        - movie_ids (array-like): The movie ids.
+        - rating_counts (array-like): Number of ratings of each movie, NaN when unknown.
+        - popularity_scores (array-like): Popularity score of each movie, NaN when unknown.
+        - rating_count_weight (float): Weight of the normalised log rating count. Default is RATING_COUNT_WEIGHT.
+        - popularity_weight (float): Weight of the normalised popularity score. Default is POPULARITY_WEIGHT.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        order = np.argsort(movie_ids, kind="stable")
+        counts = np.log1p(np.nan_to_num(np.asarray(rating_counts, dtype=np.float64)[order], nan=0.0).clip(min=0))
+        scores = np.nan_to_num(np.asarray(popularity_scores, dtype=np.float64)[order], nan=0.0).clip(min=0)
+
+        prior = np.zeros(len(movie_ids), dtype=np.float64)
+        if len(movie_ids) and counts.max() > 0:
+            prior += rating_count_weight * counts / counts.max()
+        if len(movie_ids) and scores.max() > 0:
+            prior += popularity_weight * scores / scores.max()
+
+        self._sorted_ids = movie_ids[order]
+        self._prior = prior.astype(np.float32)
+
+    @classmethod
+    def from_rows(cls, rows, **weights) -> "MoviePopularity":
+        """
+        Builds the prior from (movie_id, rating_count, popularity_score) rows, with None for unknown values.
+        """
+        table = np.array([(movie_id, np.nan if count is None else count, np.nan if score is None else score)
+                          for movie_id, count, score in rows], dtype=np.float64).reshape(-1, 3)
+        return cls(table[:, 0], table[:, 1], table[:, 2], **weights)
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def prior(self, movie_ids) -> np.ndarray:
+        """
+        Returns the popularity prior of each movie, 0 for unknown movies.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.zeros(len(movie_ids), dtype=np.float32)
+        positions = np.searchsorted(self._sorted_ids, movie_ids).clip(max=len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == movie_ids, self._prior[positions], np.float32(0))
+
+
+def load_movie_popularity() -> MoviePopularity:
+    """
+    Reads the rating counts and popularity scores of every movie from `movies_details`.
+
+    Raises:
+    - RuntimeError: If the table could not be read.
+    """
+    # Imported here so that the scoring stage can be used without a configured database
+    from app.data_access.queries import stream_query
+    try:
+        return MoviePopularity.from_rows(stream_query("SELECT movie_id, rating_count, popularity_score FROM movies_details;", as_dict=False, name="load_movie_popularity"))
+    except Exception as e:
+        raise RuntimeError(f"Could not load movie popularity: {e}") from e
+
+
+def get_movie_popularity() -> MoviePopularity:
+    """
+    Returns the process-wide popularity prior, loading it on first use.
+    """
+    global _movie_popularity
+    if _movie_popularity is None:
+        with _movie_popularity_lock:
+            if _movie_popularity is None:
+                _movie_popularity = load_movie_popularity()
+    return _movie_popularity
+
+
+def get_movie_popularity_nowait() -> MoviePopularity | None:
+    """
+    Returns the popularity prior if it is loaded. Otherwise starts loading it on the database executor and
+    returns None, so that callers on the event loop rank without the prior instead of blocking on the load.
+    A failed load is retried at most every POPULARITY_RETRY_INTERVAL seconds.
+    """
+    global _movie_popularity_load
+    if _movie_popularity is not None:
+        return _movie_popularity
+    load = _movie_popularity_load
+    if (load is None or load.done()) and time.monotonic() >= _movie_popularity_retry_at:
+        # Imported here so that the scoring stage can be used without a configured database
+        from app.data_access.db_connection import Database, PoolTimeout
+        try:
+            _movie_popularity_load = Database.submit(get_movie_popularity)
+        except PoolTimeout:
+            return None
+        _movie_popularity_load.add_done_callback(_on_movie_popularity_loaded)
+    return None
+
+
+def _on_movie_popularity_loaded(future) -> None:
+    global _movie_popularity_retry_at
+    error = None if future.cancelled() else future.exception()
+    if error is not None:
+        print(f"Ranking without the popularity prior, retrying in {POPULARITY_RETRY_INTERVAL:.0f}s: {error}")
+        _movie_popularity_retry_at = time.monotonic() + POPULARITY_RETRY_INTERVAL
+
+
+def neighbour_similarities(distances) -> np.ndarray:
+    """
+    Turns neighbour distances into similarities in (0, 1], the closest neighbours weighing the most.
+    """
+    return (1.0 / (1.0 + np.asarray(distances, dtype=np.float64))).astype(np.float32)
+
+
+def rank_candidates(movie_ids, weights, favorite_ids, n: int, popularity: MoviePopularity | None = None) -> list:
+    """
+    Aggregates candidate occurrences into scores and returns the n best movies, without sorting every candidate.
+
+    Parameters:
+    - movie_ids (array-like): One entry per (neighbour, liked movie) occurrence.
+    - weights (array-like): The similarity of the neighbour behind each occurrence.
+    - favorite_ids (list[int]): Movies never recommended.
+    - n (int): Number of movies to return.
+    - popularity (MoviePopularity|None): Popularity prior applied to the aggregated scores. Default is none.
+
+    Returns:
+    - list[int]: Up to n movie ids, best first. Ties go to the lowest movie id.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    if not len(movie_ids) or n <= 0:
+        return []
+
+    weights = np.asarray(weights, dtype=np.float64)
+    if movie_ids.min() >= 0 and movie_ids.max() < DENSE_ID_RANGE_FACTOR * len(movie_ids):
+        # Movie ids index the bincount directly: linear in the occurrences, no sort
+        candidates = np.flatnonzero(np.bincount(movie_ids))
+        scores = np.bincount(movie_ids, weights=weights)[candidates]
+    else:
+        candidates, positions = np.unique(movie_ids, return_inverse=True)
+        scores = np.bincount(positions, weights=weights, minlength=len(candidates))
+    if popularity is not None:
+        scores *= 1.0 + popularity.prior(candidates)
+
+    keep = ~np.isin(candidates, np.asarray(favorite_ids, dtype=np.int64))
+    candidates, scores = candidates[keep], scores[keep]
+    if len(candidates) > n:
+        # O(len) selection of the top n, then only those n are sorted. Candidates are in movie id order,
+        # so taking the first ones tied with the n-th score keeps the lowest ids
+        threshold = -np.partition(-scores, n - 1)[n - 1]
+        above = np.flatnonzero(scores > threshold)
+        top = np.concatenate([above, np.flatnonzero(scores == threshold)[:n - len(above)]])
+        candidates, scores = candidates[top], scores[top]
+    order = np.lexsort((candidates, -scores))
+    return candidates[order].tolist()
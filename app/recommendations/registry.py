@@ -0,0 +1,201 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.utils.metrics import Counter, Gauge
+from models.artifacts import check_version_name, load_recommender, resolve_version, set_latest_version
+
+load_dotenv()
+
+# Seconds between checks of the model root's LATEST file; 0 disables the watcher
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", 30))
+
+
+def smoke_query(model) -> None:
+    """
+    Checks that a freshly loaded recommender answers queries sensibly: a stored user's own vector must
+    return k finite neighbours, the user among them.
+
+    Raises:
+    - ValueError: If the model is empty or its answer is malformed.
+    """
+    index = model.index
+    if not len(index):
+        raise ValueError("The model has no users.")
+    if model.feature_columns and index.vectors.shape[1] != len(model.feature_columns):
+        raise ValueError("The model's vectors do not match its feature columns.")
+
+    k = min(5, len(index))
+    distances, neighbors = index.kneighbors(np.asarray(index.vectors[:1]), k)
+    if neighbors.shape != (1, k) or not np.isfinite(distances).all():
+        raise ValueError("The model returned a malformed neighbours list.")
+    if index.ids[0] not in neighbors[0]:
+        raise ValueError("The model does not find a stored user among its own neighbours.")
+
+
+class ModelRegistry:
+    def __init__(self, path, loader=load_recommender, validate=smoke_query, on_swap=None, poll_interval: float = MODEL_RELOAD_INTERVAL) -> None:
+        """
+        Holds the recommender served by this process and replaces it without a restart.
+
+        New versions are loaded and validated off the event loop, then swapped in with a single reference
+        assignment: requests that already read `active` finish on the model they started with.
+
+        Parameters:
+        - path (str|Path): A model root (see models/artifacts.py) or a legacy .pkl file.
+        - loader (Callable): Loads a model from a path. Default is `load_recommender`.
+        - validate (Callable): Raises if a loaded model must not be served. Default is `smoke_query`.
+        - on_swap (Callable|None): Called with the new model after each swap.
+        - poll_interval (float): Seconds between checks of the model root for a new LATEST version. 0 disables the watcher.
+        """
+        self.path = Path(path)
+        self.loader = loader
+        self.validate = validate
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+        self.active = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self._reload_lock = asyncio.Lock()
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._rejected_version = None
+        self.reloads = Counter("recommendation_model_reloads_total", "Recommender model versions loaded and swapped in.")
+        self.failed_reloads = Counter("recommendation_model_reload_failures_total", "Recommender model versions rejected because they failed to load or validate.")
+        self.load_latency = Gauge("recommendation_model_load_seconds", "Time taken to load and validate the active recommender model.")
+
+    @property
+    def version(self) -> str | None:
+        return getattr(self.active, "version", None)
+
+    def latest_version(self) -> str | None:
+        """
+        Returns the version the model root's LATEST file points to, or None for a pickle or an empty root.
+        """
+        try:
+            return resolve_version(self.path).name
+        except FileNotFoundError:
+            return None
+
+    def ensure_loaded(self):
+        """
+        Returns the active model, first loading the registry path if no model was loaded yet. Blocks the caller.
+
+        Raises:
+        - Exception: Whatever the loader or the validation raised.
+        """
+        if self.active is None:
+            with self._load_lock:
+                if self.active is None:
+                    self.load()
+        return self.active
+
+    def load(self, path=None) -> dict:
+        """
+        Loads, validates and swaps in a model, blocking the caller.
+
+        Parameters:
+        - path (str|Path|None): What to load. Default is the registry path.
+
+        Returns:
+        - dict: The registry status after the swap.
+
+        Raises:
+        - Exception: Whatever the loader or the validation raised. The active model is left untouched.
+        """
+        start = time.perf_counter()
+        try:
+            model = self.loader(path or self.path)
+            self.validate(model)
+        except Exception:
+            self.failed_reloads.inc()
+            raise
+        elapsed = time.perf_counter() - start
+
+        self.active = model
+        self.loaded_at = datetime.now(timezone.utc)
+        self.load_seconds = elapsed
+        self.load_latency.set(elapsed)
+        self.reloads.inc()
+        if self.on_swap is not None:
+            self.on_swap(model)
+        return self.status()
+
+    async def reload(self, version: str | None = None, force: bool = False) -> dict:
+        """
+        Loads a model version in the background and swaps it in once validated.
+
+        Parameters:
+        - version (str|None): Version to activate. Once it is swapped in, it becomes the model root's LATEST, so
+                              other workers follow through their watcher. LATEST is left alone if the version is
+                              rejected. Default is the current LATEST.
+        - force (bool): Reload even if the version is already active or was already rejected. Default is False.
+
+        Returns:
+        - dict: The registry status, with "reloaded" telling whether a model was swapped in.
+
+        Raises:
+        - FileNotFoundError: If the version does not exist.
+        - ValueError: If the version is not a plain directory name.
+        - Exception: Whatever the loader or the validation raised.
+        """
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            target = check_version_name(version) if version is not None else self.latest_version()
+            if not force and self.active is not None and target in (None, self.version, self._rejected_version):
+                if version is not None and target == self.version:
+                    await loop.run_in_executor(None, set_latest_version, self.path, version)
+                return {**self.status(), "reloaded": False}
+            try:
+                status = await loop.run_in_executor(None, self.load, self.path / target if target else None)
+            except Exception:
+                if version is None:
+                    # Not retried by the watcher until LATEST changes again
+                    self._rejected_version = target
+                raise
+            self._rejected_version = None
+            if version is not None:
+                await loop.run_in_executor(None, set_latest_version, self.path, version)
+                status = self.status()
+            return {**status, "reloaded": True}
+
+    async def start(self) -> None:
+        """
+        Starts watching the model root for new versions, if enabled.
+        """
+        if self.poll_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "latest_version": self.latest_version(),
+            "path": str(self.path),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "load_seconds": self.load_seconds,
+        }
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                result = await self.reload()
+                if result["reloaded"]:
+                    print(f"Recommender model {result['version']} loaded in {result['load_seconds']:.3f}s")
+            except Exception as e:
+                print(f"Could not reload the recommender model: {e}")
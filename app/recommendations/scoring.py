@@ -0,0 +1,51 @@
+"""
+Compute side of batch scoring: interest vectors and neighbour searches for many users at once.
+
+Kept free of database imports so that batch scoring worker processes can import it cheaply.
+"""
+import numpy as np
+
+from app.recommendations.features import FeatureStore
+from models.artifacts import load_recommender
+
+_worker_state = {}
+
+
+def nearest_users(model, store: FeatureStore, favorites: list, k: int) -> tuple:
+    """
+    Finds the k most similar users of many users with one vectorised neighbour search.
+
+    Parameters:
+    - model (SimilarUsersRecommenders): The recommender to search.
+    - store (FeatureStore): Movie features aligned with the model's feature columns.
+    - favorites (list[list[int]]): The favorite movie ids of each user.
+    - k (int): Number of similar users to return per user.
+
+    Returns:
+    - tuple[np.ndarray, np.ndarray, np.ndarray]: A boolean mask of the users with at least one known favorite,
+                                                 a (n_users, k) array of similar user ids, distance-ordered, -1 for
+                                                 masked users, and their distances, inf for masked users.
+    """
+    vectors, found = store.interest_vectors(favorites)
+    neighbors = np.full((len(favorites), min(k, len(model.index))), -1, dtype=np.int64)
+    distances = np.full(neighbors.shape, np.inf, dtype=np.float32)
+    if found.any():
+        distances[found], neighbors[found] = model.index.kneighbors(vectors[found], k)
+    return found, neighbors, distances
+
+
+def init_worker(model_path: str, features_path: str) -> None:
+    """
+    Process pool initializer: memory-maps the model and the feature store once per worker.
+    """
+    model = load_recommender(model_path)
+    store = FeatureStore.open(features_path)
+    _worker_state["model"] = model
+    _worker_state["store"] = store.select(model.feature_columns) if model.feature_columns else store
+
+
+def worker_nearest_users(favorites: list, k: int) -> tuple:
+    """
+    `nearest_users` with the model and store loaded by `init_worker`.
+    """
+    return nearest_users(_worker_state["model"], _worker_state["store"], favorites, k)
@@ -0,0 +1,92 @@
+"""
+Precomputed table of the most similar movies of every movie, by genre, served by /api/v1/movies/{movie_id}/similar.
+
+Usage:
+    python -m app.recommendations.similar_movies refresh --k 50
+    python -m app.recommendations.similar_movies report
+"""
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+from models.similar_movies_table import SimilarMoviesTable
+from models.versions import find_version
+
+load_dotenv()
+
+# Directory written by the refresh command; the similar movies endpoint returns 503 until it exists
+SIMILAR_MOVIES_TABLE_PATH = os.getenv("SIMILAR_MOVIES_TABLE_PATH", "models/similar_movies_table")
+SIMILAR_MOVIES_K = int(os.getenv("SIMILAR_MOVIES_K", 50))
+
+_similar_movies_table = None
+_similar_movies_table_lock = threading.Lock()
+
+
+def build_similar_movies_table(k: int = SIMILAR_MOVIES_K) -> SimilarMoviesTable:
+    """
+    Fits the genre model on the `movies_details` table and computes the k neighbours of every movie.
+
+    Parameters:
+    - k (int): Number of neighbours stored per movie. Default is SIMILAR_MOVIES_K.
+    """
+    # Imported here so that the table can be served without scikit-learn or a configured database
+    from app.data_access.queries import stream_query
+    from models.movies.KNNMoviesRecommender import KNNMovieRecommender
+
+    rows = list(stream_query("SELECT movie_id, title, COALESCE(genres, '') FROM movies_details ORDER BY movie_id;", as_dict=False, name="build_similar_movies_table"))
+    movie_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    titles = np.array([row[1] for row in rows], dtype=object)
+    genres = np.array([row[2] for row in rows], dtype=object)
+
+    recommender = KNNMovieRecommender()
+    recommender.fit(movie_ids, titles, genres)
+    return recommender.build_similar_movies_table(k)
+
+
+def refresh_similar_movies_table(path=SIMILAR_MOVIES_TABLE_PATH, k: int = SIMILAR_MOVIES_K) -> SimilarMoviesTable:
+    """
+    Rebuilds the table from the database and atomically replaces the one stored at `path`.
+    Running servers pick it up on their next model swap or restart.
+    """
+    table = build_similar_movies_table(k)
+    table.save(path)
+    return table
+
+
+def get_similar_movies_table() -> SimilarMoviesTable | None:
+    """
+    Returns the process-wide table, memory-mapping it on first use, or None if none was built.
+    """
+    global _similar_movies_table
+    if _similar_movies_table is None and find_version(SIMILAR_MOVIES_TABLE_PATH) is not None:
+        with _similar_movies_table_lock:
+            if _similar_movies_table is None:
+                _similar_movies_table = SimilarMoviesTable.open(SIMILAR_MOVIES_TABLE_PATH)
+    return _similar_movies_table
+
+
+def reload_similar_movies_table() -> SimilarMoviesTable | None:
+    """
+    Drops the loaded table so the next use maps the files currently on disk.
+    """
+    global _similar_movies_table
+    with _similar_movies_table_lock:
+        _similar_movies_table = None
+    return get_similar_movies_table()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("refresh", "report"))
+    parser.add_argument("--path", default=SIMILAR_MOVIES_TABLE_PATH)
+    parser.add_argument("--k", type=int, default=SIMILAR_MOVIES_K)
+    args = parser.parse_args()
+
+    table = refresh_similar_movies_table(args.path, args.k) if args.command == "refresh" else SimilarMoviesTable.open(args.path)
+    report = table.memory_report()
+    print(f"{report['movies']} movies, {report['k']} neighbours each: "
+          f"{report['bytes'] / 2**20:.1f} MiB as arrays, ~{report['python_bytes'] / 2**20:.1f} MiB as Python lists")
@@ -0,0 +1,87 @@
+"""
+Movie recommendations from the soundtrack-enriched features, served by /api/v1/movies/soundtrack_recommendation.
+
+The model trained by `models/save_movies_with_songs_model.py` is only loaded by the first request that needs
+it, so worker processes that never serve the endpoint do not hold it in memory.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+from app.recommendations.cache import favorites_fingerprint
+from app.recommendations.ranking import neighbour_similarities, rank_candidates
+from app.utils.metrics import Counter, Gauge
+
+load_dotenv()
+
+SOUNDTRACK_MODEL_PATH = os.getenv("SOUNDTRACK_MODEL_PATH", "models/similar_movies_recommender.pkl")
+# Neighbours looked up per favorite movie
+SOUNDTRACK_NEIGHBOURS = int(os.getenv("SOUNDTRACK_NEIGHBOURS", 20))
+SOUNDTRACK_CACHE_SIZE = int(os.getenv("SOUNDTRACK_CACHE_SIZE", 10000))
+SOUNDTRACK_CACHE_TTL = float(os.getenv("SOUNDTRACK_CACHE_TTL", 3600))
+
+_soundtrack_model = None
+_soundtrack_model_lock = threading.Lock()
+# Favorites fingerprint and number of recommendations -> recommended movie ids, shared by users with the same favorites
+_soundtrack_recommendations = TTLCache(maxsize=SOUNDTRACK_CACHE_SIZE, ttl=SOUNDTRACK_CACHE_TTL)
+_soundtrack_recommendations_lock = threading.Lock()
+
+cache_hits = Counter("soundtrack_recommendation_cache_hits_total", "Soundtrack recommendations served from the favorites fingerprint cache.")
+cache_misses = Counter("soundtrack_recommendation_cache_misses_total", "Soundtrack recommendations computed with the model.")
+model_load_seconds = Gauge("soundtrack_model_load_seconds", "Time spent loading the soundtrack recommendation model.")
+
+
+def get_soundtrack_model():
+    """
+    Returns the process-wide soundtrack model, loading it on first use, or None if it was not trained.
+    Blocks the caller while the model loads.
+    """
+    global _soundtrack_model
+    if _soundtrack_model is None and Path(SOUNDTRACK_MODEL_PATH).is_file():
+        with _soundtrack_model_lock:
+            if _soundtrack_model is None:
+                # Imported here: joblib and scikit-learn stay out of the import path of the API
+                import joblib
+
+                start = time.perf_counter()
+                _soundtrack_model = joblib.load(SOUNDTRACK_MODEL_PATH)
+                model_load_seconds.set(time.perf_counter() - start)
+    return _soundtrack_model
+
+
+def recommend_soundtrack_movies(favorite_ids: list, n: int) -> list | None:
+    """
+    Recommends movies whose soundtrack-enriched features are close to the user's favorites.
+
+    The neighbours of all the favorites are found in one batched search and ranked by their summed
+    similarity to the favorites. Results are cached by the fingerprint of the favorites.
+
+    Parameters:
+    - favorite_ids (list[int]): The user's favorite movie ids.
+    - n (int): Number of movies to return.
+
+    Returns:
+    - list[int]: Up to n movie ids, best first, or None if the model was not trained.
+    """
+    key = (favorites_fingerprint(favorite_ids), n)
+    with _soundtrack_recommendations_lock:
+        cached = _soundtrack_recommendations.get(key)
+    if cached is not None:
+        cache_hits.inc()
+        return cached
+
+    model = get_soundtrack_model()
+    if model is None:
+        return None
+
+    cache_misses.inc()
+    neighbour_ids, distances = model.similar_movies_for_favorites(favorite_ids, SOUNDTRACK_NEIGHBOURS)
+    recommendations = rank_candidates(neighbour_ids.ravel(), neighbour_similarities(distances).ravel(), favorite_ids, n)
+
+    with _soundtrack_recommendations_lock:
+        _soundtrack_recommendations[key] = recommendations
+    return recommendations
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from app.data_access.db_connection import DB_POOL_MAX_SIZE
+from app.utils.metrics import Counter
+from app.recommendations.pipeline import refresh_movies_recommendations
+
+load_dotenv()
+
+RECOMMENDATION_REFRESH_WORKERS = int(os.getenv("RECOMMENDATION_REFRESH_WORKERS", 2))
+RECOMMENDATION_REFRESH_DEBOUNCE = float(os.getenv("RECOMMENDATION_REFRESH_DEBOUNCE", 2))
+RECOMMENDATION_REFRESH_MAX_DELAY = float(os.getenv("RECOMMENDATION_REFRESH_MAX_DELAY", 10))
+
+
+class RecommendationRefresher:
+    def __init__(self, refresh, workers: int = RECOMMENDATION_REFRESH_WORKERS,
+                 debounce: float = RECOMMENDATION_REFRESH_DEBOUNCE, max_delay: float = RECOMMENDATION_REFRESH_MAX_DELAY) -> None:
+        """
+        In-process queue that recomputes recommendations in the background.
+
+        Refresh requests for a user that is already queued are coalesced into the pending one, and the refresh
+        only starts once the user has been quiet for `debounce` seconds (but never later than `max_delay` seconds
+        after the first request), so a burst of favorite toggles costs a single pipeline run. A refresh that
+        comes due while the same user is still being refreshed is deferred: the running refresh requests one
+        more once it ends.
+
+        Parameters:
+        - refresh (Callable[[int], Awaitable]): Coroutine function that refreshes one user.
+        - workers (int): Number of concurrent refreshes. Capped so that at least one pooled database
+                         connection is always left for request handlers.
+        - debounce (float): Quiet period, in seconds, before a queued refresh runs.
+        - max_delay (float): Upper bound, in seconds, on how long a refresh can be postponed by new requests.
+        """
+        self.refresh = refresh
+        self.workers = max(1, min(workers, DB_POOL_MAX_SIZE - 1))
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._queue = None
+        self._tasks = []
+        self._due = {}
+        self._deadline = {}
+        self._running = set()
+        self._dirty = set()
+        self.requested = Counter("recommendation_refresh_requested_total", "Background recommendation refreshes requested.")
+        self.coalesced = Counter("recommendation_refresh_coalesced_total", "Refresh requests merged into one already queued for the same user.")
+        self.completed = Counter("recommendation_refresh_completed_total", "Background recommendation refreshes that completed.")
+        self.failed = Counter("recommendation_refresh_failed_total", "Background recommendation refreshes that raised an error.")
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def request(self, user_id: int) -> bool:
+        """
+        Schedules a refresh for a user, merging it into any refresh already waiting for that user.
+
+        Returns:
+        - bool: False if the refresher is not running and the request was dropped, True otherwise.
+        """
+        if self._queue is None:
+            return False
+
+        self.requested.inc()
+        now = time.monotonic()
+
+        if user_id in self._due:
+            self.coalesced.inc()
+            self._due[user_id] = min(now + self.debounce, self._deadline[user_id])
+            return True
+
+        self._due[user_id] = now + self.debounce
+        self._deadline[user_id] = now + self.max_delay
+        self._queue.put_nowait(user_id)
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self._wait_until_due(user_id)
+
+                del self._due[user_id], self._deadline[user_id]
+                if user_id in self._running:
+                    # Another worker is refreshing this user from older favorites: it requests a new refresh once done
+                    self._dirty.add(user_id)
+                    continue
+
+                self._running.add(user_id)
+                try:
+                    await self.refresh(user_id)
+                    self.completed.inc()
+                except Exception as e:
+                    self.failed.inc()
+                    print(f"Recommendation refresh failed for user {user_id}: {e}")
+                finally:
+                    self._running.discard(user_id)
+                    if user_id in self._dirty:
+                        self._dirty.discard(user_id)
+                        self.request(user_id)
+            finally:
+                self._queue.task_done()
+
+    async def _wait_until_due(self, user_id: int) -> None:
+        while (delay := self._due[user_id] - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+
+recommendation_refresher = RecommendationRefresher(refresh_movies_recommendations)
@@ -6,7 +6,7 @@ from app.schemas.movie import *
 from app.data_access.queries import *
 from dotenv import load_dotenv
 import os
-from app.data_access.queries import *
+from app.data_access.async_queries import *
 from app.schemas.token import Token
 
 # Load environment variables from .env file
@@ -32,7 +32,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     Raises:
         HTTPException: If authentication fails due to incorrect username or password.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,7 +51,7 @@ async def login_as_guest():
     Genrate a guest token.
     """
 
-    guest_user  = create_guest_user()
+    guest_user  = await create_guest_user_async()
     if not guest_user:
         raise HTTPException(status_code=400, detail="User could not be created.")
 
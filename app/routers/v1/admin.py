@@ -0,0 +1,65 @@
+import asyncio
+from fastapi import Depends, APIRouter, HTTPException
+from app.auth.logic import require_admin_token
+from app.schemas.admin import *
+from app.recommendations.pipeline import movies_model_registry
+from app.recommendations.batch import run_batch
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/model", response_description="Active recommender model", response_model=ModelStatus)
+async def model_status_endpoint():
+    """
+    Returns the recommender model version served by this worker and how long it took to load.
+    """
+    return movies_model_registry.status()
+
+
+@router.post("/model/reload", response_description="Reload the recommender model", response_model=ModelStatus)
+async def reload_model_endpoint(request: ModelReload):
+    """
+    Loads the latest (or the given) model version in the background, validates it with a smoke query
+    and swaps it in. Requests in flight finish on the previous model.
+
+    Only the worker answering the request reloads immediately; the others pick the version up through
+    their watcher (MODEL_RELOAD_INTERVAL).
+
+    Parameters:
+    - request (ModelReload): The version to activate, if not the latest, and whether to force the reload.
+
+    Returns:
+    - ModelStatus: The model served after the reload.
+
+    Raises:
+    - HTTPException: 404 if the version does not exist, 422 if it is not a plain directory name or failed to load or validate.
+    """
+    try:
+        return await movies_model_registry.reload(request.version, force=request.force)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"The model was rejected: {e}")
+
+
+@router.post("/recommendations/batch", response_description="Recompute recommendations for many users", response_model=BatchReport)
+async def batch_recommendations_endpoint(request: BatchScoring):
+    """
+    Recomputes and stores the recommendations of up to 1000 users at once, with one neighbour search and
+    one good-rated movies query per chunk. Runs in this worker; use `python -m app.recommendations.batch`
+    for every user.
+
+    Parameters:
+    - request (BatchScoring): The users to score and the write mode.
+
+    Returns:
+    - BatchReport: The number of users scored and the throughput.
+
+    Raises:
+    - HTTPException: 500 if the recommendations could not be computed or written.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, lambda: run_batch(workers=0, mode=request.mode, user_ids=request.user_ids, update_cache=True))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
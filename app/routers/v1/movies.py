@@ -1,6 +1,6 @@
-from typing import Annotated
+from typing import Annotated, Literal
 from fastapi import BackgroundTasks, Depends, APIRouter, HTTPException, Query, status
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.logic import get_current_user
 from app.schemas.token import TokenData
@@ -8,10 +8,18 @@ from app.schemas.user import *
 from app.schemas.movie import *
 from app.data_access.queries import *
 from dotenv import load_dotenv
+import asyncio
 import os
-from app.data_access.queries import *
-from app.utils.utils import get_user_interest_df
-import joblib
+from app.data_access.async_queries import *
+from app.data_access.db_connection import PoolTimeout
+from app.recommendations.cache import recommendation_cache
+from app.recommendations.pipeline import refresh_movies_recommendations
+from app.recommendations.similar_movies import get_similar_movies_table
+from app.recommendations.soundtracks import recommend_soundtrack_movies
+from app.recommendations.worker import recommendation_refresher
+from app.utils.fast_json import trusted_rows_response
+from app.utils.pagination import decode_cursor, next_cursor, next_song_cursor
+from app.utils.streaming import NDJSON_MEDIA_TYPE, ndjson_response
 from jose import JWTError, jwt
 
 # Load environment variables from .env file
@@ -24,87 +32,26 @@ ALGORITHM = os.getenv("ALGORITHM")
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Model Loading
-movies_model_filename = 'models/movies_similar_users_recommender.pkl'
-
-try:
-    movies_model = joblib.load(movies_model_filename)
-except Exception as e:
-    print(f"Model file not found: {movies_model_filename}. Please check the file path.")
-    raise SystemExit
-
-
-def generate_movies_recommendations(user_id: int):
+def parse_page_position(cursor: str | None, page: int, page_size: int) -> tuple:
     """
-    Generates and updates movie recommendations for a user based on their favorite movies.
-
-    Parameters:
-    - user_id (int): The id of the user, used to identify their list of favorite movies.
+    Turns the pagination query parameters into a keyset position or, for clients still paging by number, an offset.
 
     Raises:
-    - HTTPException: If there's an error in fetching the favorites, if the favorites list is too short,
-                     or if there's an error during the recommendation process.
+    - HTTPException: If the cursor is malformed.
     """
+    if cursor is None:
+        return None, (page - 1) * page_size
     try:
-        # Retrieve favorite movies for the user
-        resources = get_all_favorites_movies_by_user(user_id)
-
-        if resources == None:
-            return []
-
-        favorite_resources_ids = [m['movie_id'] for m in resources]
-
-
-        # Check if there are enough favorite movies to generate recommendations
-        if len(favorite_resources_ids) < 1:
-            reset_movies_recommendations(user_id)
-            return []
-
-        # Preprocess favorite movies to summarize user interests
-        prep_fav_resources = get_preprocessed_movies_by_ids(favorite_resources_ids)
-        df = pd.DataFrame(prep_fav_resources)
-        user_interest = get_user_interest_df(df)
-
-        # Use model to find similar users
-        ks_attempts = [5,10,15,20,25,30,35,40,45,50]
-
-        good_rated_movies = []
-
-        MINIMUM_RECOMMENDATIONS = 20
-
-        for k in ks_attempts:
-            similar_users = movies_model.recommend_similar_users(user_interest, k)
-
-            # Get recommendations from similar users' good-rated movies
+        return decode_cursor(cursor), 0
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-            recs = get_good_rated_movies_by_user_ids(similar_users)
 
-            if(len(recs) >= MINIMUM_RECOMMENDATIONS):
-                good_rated_movies = recs
-                break
+def set_next_cursor(response: Response, rows: list, page_size: int) -> None:
+    cursor = next_cursor(rows, page_size)
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = cursor
 
-        if not good_rated_movies or len(good_rated_movies) < MINIMUM_RECOMMENDATIONS:
-            reset_movies_recommendations(user_id)
-            return []
-
-        movies_ids_recommendations = [m['movie_id'] for m in good_rated_movies]
-
-        # Filter out already favorite movies
-        favorites_ids_set = set(favorite_resources_ids)
-        recommendations_ids_set = set(movies_ids_recommendations)
-        final_recommendation_ids = list(recommendations_ids_set - favorites_ids_set)
-
-        # Limit the number of recommendations
-        MAX_RECS = 30
-        if len(final_recommendation_ids) > MAX_RECS:
-            final_recommendation_ids = final_recommendation_ids[:MAX_RECS]
-
-        # Update user recommendations
-        update_movies_recommendations(final_recommendation_ids, user_id)
-
-    except Exception as e:
-        # Handle unexpected errors
-        raise HTTPException(status_code=500, detail="An error occurred during the recommendation process.")
 
 @router.get("/recommendation", response_model=List[MovieDetails])
 async def recommend_resources(current_user: Annotated[UserInfo, Depends(get_current_user)]) -> list:
@@ -116,50 +63,75 @@ async def recommend_resources(current_user: Annotated[UserInfo, Depends(get_curr
 
     Returns:
     - A list of dictionaries, each representing a movie recommendation with details fetched from the database.
+      Served from the recommendation cache until the user's favorites change; after that, the last materialised
+      recommendations are returned right away while a background refresh computes new ones.
     """
     current_user = UserInfo(**current_user)
-    generate_movies_recommendations(current_user.user_id)
+
+    cached = recommendation_cache.get(current_user.user_id)
+    if cached is not None:
+        return trusted_rows_response(cached, MovieDetails)
 
     try:
-        recs = get_all_movies_recommendation(current_user.user_id)
-        return recs
+        recs = await get_all_movies_recommendation_async(current_user.user_id)
+    except PoolTimeout:
+        # Answered with a retryable 503 by the PoolTimeout handler
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if recs and recommendation_refresher.request(current_user.user_id):
+        return trusted_rows_response(recs, MovieDetails)
+
+    # Nothing materialised yet (or no refresher running): compute inline
+    recs = await refresh_movies_recommendations(current_user.user_id)
+    if recs is None:
+        raise HTTPException(status_code=500, detail="Failed to read the user's recommendations")
+    return trusted_rows_response(recs, MovieDetails)
+
 @router.get("/search", response_model=List[MovieDetails])
-async def search_resources(current_user: Annotated[UserInfo, Depends(get_current_user)], title: str = Query(default=""), page: int = Query(default=1, ge=1), page_size: int = Query(default=20, ge=1)) -> list:
+async def search_resources(current_user: Annotated[UserInfo, Depends(get_current_user)], response: Response, title: str = Query(default=""), page: int = Query(default=1, ge=1), page_size: int = Query(default=20, ge=1), cursor: str | None = Query(default=None)) -> list:
     """
     Searches for movies by their title with pagination support.
 
     Parameters:
     - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
+    - response (Response): Used to return the cursor of the next page in the `X-Next-Cursor` header.
     - title (str): The title of the movie to search for. Partial matches are supported.
-    - page (int): The page number of the search results to retrieve. Defaults to 1. Must be >= 1.
+    - page (int): The page number of the search results to retrieve. Defaults to 1. Must be >= 1. Ignored when `cursor` is given.
     - page_size (int): The number of search results to return per page. Defaults to 20. Must be >= 1.
+    - cursor (str | None): Opaque cursor from the `X-Next-Cursor` header of the previous page. Deep pages stay as fast as the first one.
 
     Returns:
-    - A list of movies that match the search criteria, with pagination applied. Each movie is represented as a dictionary of details.
+    - A list of movies that match the search criteria, most relevant first, with pagination applied. Each movie is represented as a dictionary of details.
     """
     current_user = UserInfo(**current_user)
-    offset = (page - 1) * page_size
+    after, offset = parse_page_position(cursor, page, page_size)
 
     try:
         title = title.strip() if title.isspace() else title
-        resources = search_movie_by_title(current_user.user_id, title, page_size, offset)
-        if not resources:
-            return []
-        return resources
+        resources = await search_movie_by_title_async(current_user.user_id, title, page_size, offset, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeout:
+        # Answered with a retryable 503 by the PoolTimeout handler
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not resources:
+        return []
+
+    set_next_cursor(response, resources, page_size)
+    return trusted_rows_response(resources, MovieDetails, response)
+
 @router.post("/favorite", response_model=bool)
-async def add_favorite_resource(current_user: Annotated[UserInfo, Depends(get_current_user)], background_tasks: BackgroundTasks, movie_id: int) -> NewFavorite:
+async def add_favorite_resource(current_user: Annotated[UserInfo, Depends(get_current_user)], movie_id: int) -> NewFavorite:
     """
-    Adds a new favorite movie for a user and triggers background generation of new movie recommendations.
+    Adds a new favorite movie for a user and schedules a background refresh of their movie recommendations.
 
     Parameters:
     - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
-    - background_tasks (BackgroundTasks): FastAPI's background tasks for asynchronous operations.
     - movie_id (int): The movie_id of the new favorite movie.
 
     Returns:
@@ -170,22 +142,21 @@ async def add_favorite_resource(current_user: Annotated[UserInfo, Depends(get_cu
     """
 
     current_user = UserInfo(**current_user)
-    success = add_favorite_movie(movie_id, current_user.user_id)
+    success = await add_favorite_movie_async(movie_id, current_user.user_id)
 
     if success:
-        # background_tasks.add_task(generate_movies_recommendations, current_user.user_id)
+        recommendation_refresher.request(current_user.user_id)
         return True
     else:
         raise HTTPException(status_code=400, detail="Failed to add the movies to favorites")
 
 @router.delete("/favorite", response_model=bool)
-async def delete_favorite_resource(current_user: Annotated[UserInfo, Depends(get_current_user)],  background_tasks: BackgroundTasks, movie_id: int = Query()):
+async def delete_favorite_resource(current_user: Annotated[UserInfo, Depends(get_current_user)], movie_id: int = Query()):
     """
     Removes a movie from a user's favorites based on the movie ID and updates their recommendations.
 
     Parameters:
     - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
-    - background_tasks (BackgroundTasks): FastAPI's mechanism for executing functions in the background.
     - movie_id (int): The unique identifier of the movie to be removed from favorites.
 
     Returns:
@@ -196,10 +167,10 @@ async def delete_favorite_resource(current_user: Annotated[UserInfo, Depends(get
     """
 
     current_user = UserInfo(**current_user)
-    success = delete_favorite_movie(movie_id, current_user.user_id)
+    success = await delete_favorite_movie_async(movie_id, current_user.user_id)
 
     if success:
-        # background_tasks.add_task(generate_movies_recommendations, current_user.user_id)
+        recommendation_refresher.request(current_user.user_id)
         return True
     else:
         raise HTTPException(status_code=400, detail="Failed to delete the movie from favorites")
@@ -220,10 +191,10 @@ async def reset_user_favorites_and_recommendations(current_user: Annotated[UserI
     """
 
     current_user = UserInfo(**current_user)
-    success_favorites = delete_all_favorite_movies(current_user.user_id)
+    success_favorites = await delete_all_favorite_movies_async(current_user.user_id)
 
     if success_favorites:
-        success_recommendations = delete_all_movies_recommendations(current_user.user_id)
+        success_recommendations = await delete_all_movies_recommendations_async(current_user.user_id)
         if success_recommendations:
             return True
         else:
@@ -232,13 +203,17 @@ async def reset_user_favorites_and_recommendations(current_user: Annotated[UserI
         raise HTTPException(status_code=400, detail="Failed to delete the user's favorites")
 
 @router.get("/favorite", response_model=List[MovieDetails])
-async def read_favorite_movies(current_user: Annotated[UserInfo, Depends(get_current_user)], title: str = Query(default=""), page_size: int = Query(default=20, ge=1),  page: int = Query(default=1, ge=1)):
+async def read_favorite_movies(current_user: Annotated[UserInfo, Depends(get_current_user)], response: Response, title: str = Query(default=""), page_size: int = Query(default=20, ge=1),  page: int = Query(default=1, ge=1), cursor: str | None = Query(default=None)):
     """
     Retrieves all favorite movies for a user based on their id.
 
     Parameters:
     - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
-
+    - response (Response): Used to return the cursor of the next page in the `X-Next-Cursor` header.
+    - title (str): Only favorites whose title contains this term are returned.
+    - page_size (int): The number of movies to return per page. Defaults to 20. Must be >= 1.
+    - page (int): The page number to retrieve. Defaults to 1. Must be >= 1. Ignored when `cursor` is given.
+    - cursor (str | None): Opaque cursor from the `X-Next-Cursor` header of the previous page.
 
     Returns:
     - A list of Movie models representing the user's favorite movies.
@@ -248,32 +223,127 @@ async def read_favorite_movies(current_user: Annotated[UserInfo, Depends(get_cur
     """
     current_user = UserInfo(**current_user)
 
-    offset = (page - 1) * page_size
+    after, offset = parse_page_position(cursor, page, page_size)
 
     title = title.strip() if title.isspace() else title
 
-    movies = get_all_favorites_movies_by_user(current_user.user_id, title, page_size, offset)
+    try:
+        movies = await get_all_favorites_movies_by_user_async(current_user.user_id, title, page_size, offset, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if movies:
+        set_next_cursor(response, movies, page_size)
 
-    return movies
+    return trusted_rows_response(movies, MovieDetails, response)
 
 
 # Get movies soundtracks from table movies_soundtracks based on movie id
-@router.get("/favorite_movies_soundtracks/", response_model=List[SongFromMovie])
-async def get_movie_soundtracks(current_user: Annotated[UserInfo, Depends(get_current_user)]):
+@router.get("/favorite_movies_soundtracks/", response_model=List[SongFromMovie], responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def get_movie_soundtracks(current_user: Annotated[UserInfo, Depends(get_current_user)], response: Response, page_size: int | None = Query(default=None, ge=1), cursor: str | None = Query(default=None), response_format: Literal["json", "ndjson"] = Query(default="json", alias="format")):
     """
-    Retrieves all soundtracks songs from the user favorite movies
+    Retrieves all soundtracks songs from the user favorite movies, ordered by movie and song.
 
     Parameters:
     - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
+    - response (Response): Used to return the cursor of the next page in the `X-Next-Cursor` header.
+    - page_size (int | None): The number of songs to return per page. Defaults to all of them. Must be >= 1.
+    - cursor (str | None): Opaque cursor from the `X-Next-Cursor` header of the previous page.
+    - format (str): "json" for a JSON array, or "ndjson" to stream one song per line as the rows are read
+      from the database, with flat memory use however many songs there are. Defaults to "json".
 
     Returns:
-    - A list of SongFromMovie models representing the soundtracks for the movies.
+    - A list of SongFromMovie models representing the soundtracks for the movies, or their NDJSON stream.
 
     Raises:
-    - HTTPException: If the operation fails.
+    - HTTPException: If the cursor is malformed or the operation fails, 503 if too many songs are already streaming.
     """
 
     current_user = UserInfo(**current_user)
-    soundtracks = get_songs_from_favorite_movies(current_user.user_id)
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+        if response_format == "ndjson":
+            songs = stream_songs_from_favorite_movies(current_user.user_id, after, page_size)
+            return await ndjson_response(songs, list(SongFromMovie.model_fields))
+        soundtracks = await get_songs_from_favorite_movies_async(current_user.user_id, page_size, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (HTTPException, PoolTimeout):
+        # Busy streams or pool: retryable 503s rather than server errors
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if page_size is not None and soundtracks:
+        cursor = next_song_cursor(soundtracks, page_size)
+        if cursor is not None:
+            response.headers["X-Next-Cursor"] = cursor
+
+    return trusted_rows_response(soundtracks, SongFromMovie, response)
+
+
+@router.get("/{movie_id}/similar", response_model=List[MovieDetails])
+async def get_similar_movies(current_user: Annotated[UserInfo, Depends(get_current_user)], movie_id: int, n: int = Query(default=10, ge=1, le=100)):
+    """
+    Retrieves the movies most similar to a movie by genre, from the precomputed similar movies table.
+
+    Parameters:
+    - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
+    - movie_id (int): The movie to find similar movies for.
+    - n (int): The number of similar movies to return. Defaults to 10. Must be between 1 and 100.
+
+    Returns:
+    - A list of MovieDetails models, most similar first.
+
+    Raises:
+    - HTTPException: 404 if the movie is not in the table, 503 if the table was not built yet.
+    """
+    table = get_similar_movies_table()
+    if table is None:
+        raise HTTPException(status_code=503, detail="Similar movies are not available yet")
+
+    try:
+        similar_ids, _ = table.similar_to(movie_id, n)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    movies = await get_movies_details_by_ids_async(similar_ids.tolist())
+    if movies is None:
+        raise HTTPException(status_code=500, detail="Failed to read the similar movies")
+    return trusted_rows_response(movies, MovieDetails)
+
+
+@router.get("/soundtrack_recommendation", response_model=List[MovieDetails])
+async def recommend_movies_by_soundtracks(current_user: Annotated[UserInfo, Depends(get_current_user)], n: int = Query(default=20, ge=1, le=100)):
+    """
+    Recommends movies similar to the user's favorites, using features that include their soundtracks.
+
+    Parameters:
+    - current_user (Annotated[str, Depends(get_current_user)]): The current user extracted from the request JWT.
+    - n (int): The number of movies to return. Defaults to 20. Must be between 1 and 100.
+
+    Returns:
+    - A list of MovieDetails models, best first. Empty if the user has no favorites.
+      Served from a cache shared by users with the same favorites.
+
+    Raises:
+    - HTTPException: 503 if the soundtrack model was not trained, 500 if the favorites or the movies cannot be read.
+    """
+    current_user = UserInfo(**current_user)
 
-    return soundtracks
+    favorite_ids = await get_favorite_movie_ids_by_user_async(current_user.user_id)
+    if favorite_ids is None:
+        raise HTTPException(status_code=500, detail="Failed to read the user's favorites")
+    if not favorite_ids:
+        return []
+
+    # The first call loads the model, and every miss runs a neighbour search: both block, so they run off the event loop
+    loop = asyncio.get_running_loop()
+    recommendation_ids = await loop.run_in_executor(None, recommend_soundtrack_movies, favorite_ids, n)
+    if recommendation_ids is None:
+        raise HTTPException(status_code=503, detail="Soundtrack recommendations are not available")
+
+    movies = await get_movies_details_by_ids_async(recommendation_ids)
+    if movies is None:
+        raise HTTPException(status_code=500, detail="Failed to read the recommended movies")
+    return trusted_rows_response(movies, MovieDetails)
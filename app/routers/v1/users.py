@@ -7,7 +7,7 @@ from app.schemas.movie import *
 from app.data_access.queries import *
 from dotenv import load_dotenv
 import os
-from app.data_access.queries import *
+from app.data_access.async_queries import *
 from app.schemas.token import Token
 
 # Load environment variables from .env file
@@ -25,7 +25,7 @@ async def create_user_endpoint(user: UserCreate):
     """
     Create a new user with email, username, full name, and hashed password.
     """
-    result = create_user(user.email, user.username, user.password)
+    result = await create_user_async(user.email, user.username, user.password)
     if not result:
         raise HTTPException(status_code=400, detail="User could not be created.")
     return result
@@ -35,7 +35,7 @@ async def read_all_users_endpoint():
     """
     Read and return all users.
     """
-    users = read_all_users()
+    users = await read_all_users_async()
     if users is None:
         raise HTTPException(status_code=404, detail="No users found.")
     return users
@@ -55,7 +55,7 @@ async def read_user_by_id_endpoint(token: Annotated[str, Depends(oauth2_scheme)]
     Raises:
     - HTTPException: If the operation fails.
     """
-    user = read_user_by_id(user_id)
+    user = await read_user_by_id_async(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
     return user
@@ -77,7 +77,7 @@ async def update_user_info_endpoint(current_user: Annotated[UserInfo, Depends(ge
     - HTTPException: If the operation fails.
     """
     current_user = UserInfo(**current_user)
-    updated_token = update_user(current_user.user_id, user.email or current_user.email, user.username or current_user.username, user.password, current_user.is_guest)
+    updated_token = await update_user(current_user.user_id, user.email or current_user.email, user.username or current_user.username, user.password, current_user.is_guest)
 
     if not updated_token:
         raise HTTPException(status_code=400, detail="User update failed.")
@@ -99,7 +99,7 @@ async def delete_user_endpoint(token: Annotated[str, Depends(oauth2_scheme)], us
     Raises:
     - HTTPException: If the operation fails.
     """
-    success = delete_user(user_id)
+    success = await delete_user_async(user_id)
     if not success:
         raise HTTPException(status_code=400, detail="User deletion failed.")
 
@@ -0,0 +1,68 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+
+class ModelStatus(BaseModel):
+    """
+    Schema describing the recommender model served by the answering worker.
+
+    Attributes:
+        version (str | None): The version of the active model.
+        latest_version (str | None): The version the model root's LATEST file points to. Workers converge to it through their watcher.
+        path (str): The model root or pickle the model is loaded from.
+        loaded_at (str | None): When the active model was swapped in, in ISO 8601.
+        load_seconds (float | None): Time taken to load and validate the active model.
+        reloaded (bool | None): For reload requests, whether a new model was swapped in.
+    """
+    version: str | None
+    latest_version: str | None
+    path: str
+    loaded_at: str | None
+    load_seconds: float | None
+    reloaded: bool | None = None
+
+
+class ModelReload(BaseModel):
+    """
+    Schema for a model reload request.
+
+    Attributes:
+        version (str | None): The version to activate, e.g. to roll back. Defaults to the model root's LATEST version.
+        force (bool): Reload even if the version is already active. Defaults to False.
+    """
+    version: str | None = None
+    force: bool = False
+
+
+class BatchScoring(BaseModel):
+    """
+    Schema for a batch recommendation request.
+
+    Attributes:
+        user_ids (List[int]): The users to recompute recommendations for. Users without favorites are skipped.
+        mode (str): How the recommendations are written, "diff" or "replace". Defaults to "diff".
+    """
+    user_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    mode: Literal["diff", "replace"] = "diff"
+
+
+class BatchReport(BaseModel):
+    """
+    Schema summarising a batch recommendation run.
+
+    Attributes:
+        users (int): The number of users scored.
+        with_recommendations (int): The number of users who got at least one recommendation.
+        seconds (float): The duration of the run.
+        users_per_second (float): The scoring throughput.
+        neighbors (float): Seconds spent in neighbour searches.
+        ratings (float): Seconds spent reading similar users' good-rated movies and selecting recommendations.
+        writes (float): Seconds spent writing recommendations.
+    """
+    users: int
+    with_recommendations: int
+    seconds: float
+    users_per_second: float
+    neighbors: float
+    ratings: float
+    writes: float
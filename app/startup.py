@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Attempts per startup phase, and the delay in seconds after the first failure (doubled after each one)
+STARTUP_RETRIES = int(os.getenv("STARTUP_RETRIES", 5))
+STARTUP_RETRY_DELAY = float(os.getenv("STARTUP_RETRY_DELAY", 1))
+
+
+class Startup:
+    def __init__(self, retries: int = STARTUP_RETRIES, retry_delay: float = STARTUP_RETRY_DELAY, started_at: float | None = None) -> None:
+        """
+        Runs the initialisation of the API in the background of the FastAPI lifespan, so the process can
+        answer liveness probes while the database pool and the model are still being set up, and keeps a
+        report of how long each phase took.
+
+        Parameters:
+        - retries (int): Attempts per phase. Default is STARTUP_RETRIES.
+        - retry_delay (float): Seconds to wait after a phase's first failure, doubled after each one. Default is STARTUP_RETRY_DELAY.
+        - started_at (float|None): `time.perf_counter()` when the process started loading the app. Default is now.
+        """
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.phases = {}
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.finished_at = None
+        self._task = None
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Adds a phase that already completed, e.g. the import of the application modules.
+        """
+        self.phases[name] = {"status": "ready", "seconds": seconds, "attempts": 1, "error": None}
+
+    def skip(self, name: str, reason: str) -> None:
+        self.phases[name] = {"status": "skipped", "seconds": 0.0, "attempts": 0, "error": reason}
+
+    async def run_phase(self, name: str, func, retries: int | None = None) -> bool:
+        """
+        Runs a blocking initialisation function off the event loop, retrying it with exponential backoff.
+
+        Parameters:
+        - name (str): The phase name shown in the report.
+        - func (Callable): The blocking function to run.
+        - retries (int|None): Attempts. Default is the startup's.
+
+        Returns:
+        - bool: True if the phase eventually succeeded.
+        """
+        retries = self.retries if retries is None else retries
+        phase = self.phases[name] = {"status": "running", "seconds": None, "attempts": 0, "error": None}
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        for attempt in range(1, max(retries, 1) + 1):
+            phase["attempts"] = attempt
+            try:
+                await loop.run_in_executor(None, func)
+                phase.update(status="ready", error=None)
+                break
+            except Exception as e:
+                phase["error"] = str(e)
+                if attempt >= retries:
+                    phase["status"] = "failed"
+                    print(f"Startup phase {name} failed after {attempt} attempt(s): {e}")
+                    break
+                print(f"Startup phase {name} failed (attempt {attempt}/{retries}), retrying: {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        phase["seconds"] = time.perf_counter() - start
+        return phase["status"] == "ready"
+
+    def start(self, initialise) -> None:
+        """
+        Runs the `initialise` coroutine function in the background.
+        """
+        async def run() -> None:
+            try:
+                await initialise(self)
+            finally:
+                self.finished_at = time.perf_counter()
+
+        self._task = asyncio.create_task(run())
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> dict:
+        """
+        Returns the startup status ("starting" or "finished"), the seconds taken so far, and every phase with
+        its "status" ("running", "ready", "failed" or "skipped"), "seconds", "attempts" and last "error".
+        """
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return {
+            "status": "finished" if self.finished_at is not None else "starting",
+            "seconds": end - self.started_at,
+            "phases": {name: dict(phase) for name, phase in self.phases.items()},
+        }
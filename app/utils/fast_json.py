@@ -0,0 +1,60 @@
+import os
+from decimal import Decimal
+
+import orjson
+from dotenv import load_dotenv
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+load_dotenv()
+
+# Set to false to send every response back through response_model validation, e.g. while debugging a schema mismatch
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() == "true"
+
+
+def encode_default(value):
+    # NUMERIC columns arrive as Decimal, which the response models declare as float
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_rows(rows: list, model: type[BaseModel]) -> bytes:
+    """
+    Serialises database rows as a JSON array of `model` objects with orjson, without validating them.
+
+    Only the fields of the model are written, in its field order, like a response_model would. Missing
+    columns are written as null. The rows of a list must all have the same columns, as rows of one query do.
+
+    Parameters:
+    - rows (list[dict]): Rows from `execute_query`.
+    - model (type[BaseModel]): The response model the rows follow, e.g. MovieDetails.
+
+    Returns:
+    - bytes: The JSON payload.
+    """
+    fields = tuple(model.model_fields)
+    # Rows of one query share their columns: when they are exactly the model's fields, no copy is needed
+    if not rows or tuple(rows[0]) == fields:
+        return orjson.dumps(rows, default=encode_default)
+    return orjson.dumps([{field: row.get(field) for field in fields} for row in rows], default=encode_default)
+
+
+def trusted_rows_response(rows, model: type[BaseModel], response: Response | None = None):
+    """
+    Opt-in fast path for routes that return rows read from our own tables: the rows are serialised straight
+    to JSON instead of being validated into `model` instances and encoded again by FastAPI. The route keeps
+    its `response_model`, so the OpenAPI schema is unchanged.
+
+    Parameters:
+    - rows (list[dict]|None): Rows from `execute_query`. None is returned as is.
+    - model (type[BaseModel]): The model of each row, as in the route's `response_model=List[model]`.
+    - response (Response|None): The route's injected response, whose headers (e.g. X-Next-Cursor) are kept. Default is None.
+
+    Returns:
+    - Response|list: The JSON response, or the rows unchanged when FAST_JSON_RESPONSES is off.
+    """
+    if not FAST_JSON_RESPONSES or rows is None:
+        return rows
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=encode_rows(rows, model), media_type="application/json", headers=headers)
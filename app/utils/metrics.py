@@ -0,0 +1,162 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; suits everything from in-memory lookups to slow queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    """
+    Renders a label set as `{name="value",...}`, escaping the values as the text format requires.
+    """
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()) -> None:
+        """
+        Monotonically increasing, thread-safe counter rendered in the Prometheus text format.
+
+        Parameters:
+        - name (str): Metric name, e.g. "recommendation_knn_rounds_saved_total".
+        - documentation (str): Help text shown next to the metric.
+        - labelnames (tuple): Label names; every `inc` then passes one value per name. Default is no labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    @property
+    def value(self) -> float:
+        return sum(self._values.values())
+
+    def render(self) -> str:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{format_labels(self.labelnames, key)} {value}" for key, value in values]
+        return "\n".join(lines) + "\n"
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str) -> None:
+        """
+        Thread-safe value that can go up and down, rendered in the Prometheus text format.
+
+        Parameters:
+        - name (str): Metric name, e.g. "recommendation_model_load_seconds".
+        - documentation (str): Help text shown next to the metric.
+        """
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} gauge\n{self.name} {self._value}\n"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> None:
+        """
+        Thread-safe distribution of observed values, e.g. latencies, rendered in the Prometheus text format.
+
+        Observations only increment one bucket counter, the sum and the count of their label set; the
+        cumulative bucket counts are computed when the metrics are rendered.
+
+        Parameters:
+        - name (str): Metric name, e.g. "http_request_duration_seconds".
+        - documentation (str): Help text shown next to the metric.
+        - labelnames (tuple): Label names; every observation then passes one value per name. Default is no labels.
+        - buckets (tuple): Increasing upper bounds of the buckets, without +Inf. Default is DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Label values -> [per-bucket counts (the last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the `with` block in seconds, including when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels[name] for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> str:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [*(repr(float(bound)) for bound in self.buckets), "+Inf"]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labelnames, key, 'le="' + bound + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = []
+
+
+def render_metrics() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+
+    Returns:
+    - str: The metrics payload served by the /metrics endpoint.
+    """
+    return "".join(metric.render() for metric in REGISTRY)
@@ -0,0 +1,73 @@
+import base64
+import json
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encodes a keyset position as an opaque, URL-safe cursor string.
+
+    Parameters:
+    - position (dict): JSON-serialisable keyset values, e.g. {"rank": 0.42, "movie_id": 1234}.
+
+    Returns:
+    - str: The cursor to hand to clients.
+    """
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Parameters:
+    - cursor (str): The cursor sent back by a client.
+
+    Returns:
+    - dict: The keyset position.
+
+    Raises:
+    - ValueError: If the cursor is malformed.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+    if not isinstance(position, dict) or not isinstance(position.get("movie_id"), int):
+        raise ValueError("Invalid cursor.")
+    return position
+
+
+def next_cursor(rows: list, page_size: int) -> str | None:
+    """
+    Builds the cursor pointing after the last row of a page of title search results.
+
+    Parameters:
+    - rows (list): The page just returned, as dictionaries with "movie_id" and "search_rank".
+    - page_size (int): The requested page size.
+
+    Returns:
+    - str|None: The cursor of the next page, or None if this page is the last one.
+    """
+    if not rows or len(rows) < page_size:
+        return None
+    last = rows[-1]
+    return encode_cursor({"rank": last.get("search_rank"), "movie_id": last["movie_id"]})
+
+
+def next_song_cursor(rows: list, page_size: int) -> str | None:
+    """
+    Builds the cursor pointing after the last row of a page of soundtrack songs.
+
+    Parameters:
+    - rows (list): The page just returned, as dictionaries with "movie_id" and "song_id".
+    - page_size (int): The requested page size.
+
+    Returns:
+    - str|None: The cursor of the next page, or None if this page is the last one.
+    """
+    if not rows or len(rows) < page_size:
+        return None
+    last = rows[-1]
+    return encode_cursor({"movie_id": last["movie_id"], "song_id": last["song_id"]})
@@ -0,0 +1,39 @@
+import time
+
+from app.utils.metrics import Histogram
+
+request_seconds = Histogram("http_request_duration_seconds", "Time spent handling HTTP requests, by route template.", ("method", "route", "status"))
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app) -> None:
+        """
+        ASGI middleware recording the latency of every HTTP request in `http_request_duration_seconds`.
+
+        Requests are labelled with the route template (e.g. "/api/v1/movies/{movie_id}") rather than the raw
+        path, so the number of series stays bounded. Unmatched paths share the "unmatched" label.
+        Plain ASGI rather than BaseHTTPMiddleware, so the response is not re-streamed through a task.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope it was given
+            route = scope.get("route")
+            route = getattr(route, "path", None) or ("unmatched" if "endpoint" not in scope else scope["path"])
+            request_seconds.observe(time.perf_counter() - start, method=scope["method"], route=route, status=str(status))
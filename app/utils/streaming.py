@@ -0,0 +1,117 @@
+import asyncio
+import itertools
+import os
+import threading
+
+import orjson
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.data_access.db_connection import DB_POOL_MAX_SIZE, Database
+from app.utils.fast_json import encode_default
+
+load_dotenv()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Streams hold a database connection for as long as the client reads, so only part of the pool may be streaming
+NDJSON_MAX_STREAMS = int(os.getenv("NDJSON_MAX_STREAMS", max(DB_POOL_MAX_SIZE // 2, 1)))
+
+_streams = threading.BoundedSemaphore(NDJSON_MAX_STREAMS)
+
+
+class _ReleasingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that calls `release` once it is done, however it ends: fully sent, client
+    disconnected, failed, or before its body ever started.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+    def __del__(self):
+        # Never sent at all, e.g. dropped by a middleware: do not leak the stream slot and its connection
+        release = getattr(self, "release", None)
+        if release is not None:
+            release()
+
+
+async def ndjson_response(rows, fields: list, batch_size: int = 200) -> StreamingResponse:
+    """
+    Streams rows to the client as newline-delimited JSON, one object per line, while they are still being
+    read, so neither the rows nor the response body are ever held in memory at once.
+
+    At most NDJSON_MAX_STREAMS responses stream at once. The blocking iterator is advanced on the database
+    executor, `batch_size` rows at a time: the first batch, which checks out the connection, goes through
+    `Database.submit`, so it is subject to the executor queue limit and the acquire timeout. The first batch
+    is read before the response starts, so a failing query still raises here instead of truncating a 200
+    response. The stream slot and the connection are released when the response ends, whether or not its
+    body was ever read.
+
+    Parameters:
+    - rows (Iterator[dict]): The rows, e.g. from `stream_query`. Closed once the response ends.
+    - fields (list[str]): The keys written for each row, in order; missing keys are written as null.
+    - batch_size (int): Rows read and written per chunk. Default is 200.
+
+    Returns:
+    - StreamingResponse: The NDJSON response.
+
+    Raises:
+    - HTTPException: 503 if NDJSON_MAX_STREAMS responses are already streaming.
+    - PoolTimeout: If the first batch could not get a database connection in time.
+    """
+    if not _streams.acquire(blocking=False):
+        rows.close()
+        raise HTTPException(status_code=503, detail="Too many streams in progress, please retry.", headers={"Retry-After": "1"})
+
+    def next_batch() -> list:
+        return list(itertools.islice(rows, batch_size))
+
+    released = threading.Lock()
+
+    def release(future=None) -> None:
+        if future is not None and not future.done():
+            # Cancelled while a batch is still being read on its worker: the rows are closed once it ends
+            future.add_done_callback(lambda _: release())
+            return
+        if not released.acquire(blocking=False):
+            return
+        # Returns the connection held by a server-side cursor, also when the client disconnects early
+        try:
+            rows.close()
+        finally:
+            _streams.release()
+
+    try:
+        future = Database.submit(next_batch)
+    except BaseException:
+        release()
+        raise
+    try:
+        first = await asyncio.wrap_future(future)
+    except BaseException:
+        release(future)
+        raise
+
+    pending = None
+
+    async def body():
+        nonlocal pending
+        batch = first
+        while batch:
+            yield b"".join(orjson.dumps({field: row.get(field) for field in fields}, default=encode_default) + b"\n" for row in batch)
+            if len(batch) < batch_size:
+                break
+            # The stream already holds its connection, so later batches skip the admission of `Database.submit`
+            pending = Database.executor().submit(next_batch)
+            batch = await asyncio.wrap_future(pending)
+
+    return _ReleasingStreamingResponse(body(), release=lambda: release(pending), media_type=NDJSON_MEDIA_TYPE)
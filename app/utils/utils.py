@@ -1,4 +1,4 @@
-import pandas as pd
+from collections import defaultdict
 
 def get_user_interest_df(prep_resources):
     """
@@ -12,7 +12,9 @@ def get_user_interest_df(prep_resources):
     - pd.DataFrame: A single-row DataFrame summarizing the average value of each feature/metric column,
                     excluding 'movie_id' and 'title', with columns sorted alphabetically.
     """
-    
+    # Imported here so that importing this module does not load pandas
+    import pandas as pd
+
     preproc_favorite_resources = prep_resources.drop(columns=["movie_id","title"])
     preproc_favorite_resources = preproc_favorite_resources[sorted(preproc_favorite_resources.columns)]
     user_summary = preproc_favorite_resources.mean().reset_index(drop=True)
@@ -22,3 +24,38 @@ def get_user_interest_df(prep_resources):
     return df
 
 
+def smallest_sufficient_neighbourhood(neighbourhoods, rated_movies, minimum):
+    """
+    Finds the smallest neighbourhood whose good-rated movies reach a minimum count, entirely in memory.
+
+    Parameters:
+    - neighbourhoods (list[list[int]]): Growing, distance-ordered prefixes of similar user ids.
+    - rated_movies (list[tuple[int, int]]): (user_id, movie_id) pairs covering every user of the largest neighbourhood.
+    - minimum (int): Number of distinct movies required.
+
+    Returns:
+    - tuple[int, list]: The number of neighbourhoods evaluated and the distinct movie ids of the first one that
+                        reaches `minimum`, ordered by the rank of the neighbour that liked them. The list is empty
+                        if no neighbourhood is large enough.
+    """
+    movies_by_user = defaultdict(list)
+    for user_id, movie_id in rated_movies:
+        movies_by_user[user_id].append(movie_id)
+
+    seen = set()
+    movie_ids = []
+    position = 0
+
+    for attempt, users in enumerate(neighbourhoods, start=1):
+        for user_id in users[position:]:
+            for movie_id in movies_by_user.get(user_id, ()):
+                if movie_id not in seen:
+                    seen.add(movie_id)
+                    movie_ids.append(movie_id)
+        position = len(users)
+
+        if len(movie_ids) >= minimum:
+            return attempt, movie_ids
+
+    return len(neighbourhoods), []
+
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of the candidate scoring stage.
+
+Compares the former set truncation (arbitrary order), a full sort of every scored candidate, and
+`rank_candidates` (bincount + argpartition) as the neighbourhood grows. No database is needed: the liked
+movies and popularity figures are random.
+
+Usage:
+    python -m benchmarks.candidate_ranking --movies 60000 --liked 200 --neighbours 50 200 1000 --repeat 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.recommendations.ranking import MoviePopularity, neighbour_similarities, rank_candidates
+from benchmarks.utils import print_table
+
+
+def set_truncation(movie_ids, favorite_ids, n):
+    return list(set(movie_ids.tolist()) - set(favorite_ids))[:n]
+
+
+def full_sort(movie_ids, weights, favorite_ids, n, popularity):
+    candidates, positions = np.unique(movie_ids, return_inverse=True)
+    scores = np.bincount(positions, weights=weights) * (1.0 + popularity.prior(candidates))
+    keep = ~np.isin(candidates, favorite_ids)
+    candidates, scores = candidates[keep], scores[keep]
+    return candidates[np.lexsort((candidates, -scores))][:n].tolist()
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=60_000)
+    parser.add_argument("--liked", type=int, default=200, help="Liked movies per neighbour.")
+    parser.add_argument("--neighbours", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    movie_ids = np.arange(1, args.movies + 1)
+    popularity = MoviePopularity(movie_ids, rng.integers(1, 10_000, args.movies), rng.uniform(0, 100, args.movies))
+    # Popular movies are liked more often, as in real ratings
+    like_probability = rng.zipf(1.5, args.movies).astype(np.float64)
+    like_probability /= like_probability.sum()
+    favorite_ids = rng.choice(movie_ids, 20, replace=False)
+
+    rows = []
+    for neighbours in args.neighbours:
+        liked = rng.choice(movie_ids, (neighbours, args.liked), p=like_probability).ravel()
+        weights = np.repeat(neighbour_similarities(np.sort(rng.uniform(0, 2, neighbours))), args.liked)
+
+        truncation_s, _ = timed(lambda: set_truncation(liked, favorite_ids, args.top), args.repeat)
+        sort_s, expected = timed(lambda: full_sort(liked, weights, favorite_ids, args.top, popularity), args.repeat)
+        rank_s, ranked = timed(lambda: rank_candidates(liked, weights, favorite_ids, args.top, popularity), args.repeat)
+        assert ranked == expected
+
+        rows.append((neighbours, len(liked), len(np.unique(liked)), f"{truncation_s * 1e6:.0f}", f"{sort_s * 1e6:.0f}", f"{rank_s * 1e6:.0f}"))
+
+    print_table(("neighbours", "occurrences", "candidates", "set truncation (us)", "full sort (us)", "rank_candidates (us)"), rows)
@@ -0,0 +1,47 @@
+"""
+Micro-benchmark of the per-call cost of turning cursor results into rows.
+
+Compares the former pandas round-trip used by `execute_query` (DataFrame + to_dict('records'))
+with the current `rows_to_dicts` path and with plain tuples. No database is needed: a fake cursor
+replays a result set shaped like `movies_details`.
+
+Usage:
+    python -m benchmarks.execute_query_materialisation
+"""
+import timeit
+
+import pandas as pd
+
+from benchmarks.utils import fake_movie_rows, FakeCursor, print_table
+
+
+def legacy_pandas_rows(cursor, rows):
+    col_names = [desc[0] for desc in cursor.description]
+    df = pd.DataFrame(rows, columns=col_names)
+    return df.to_dict('records')
+
+
+def rows_to_dicts(cursor, rows):
+    # Same implementation as app.data_access.queries.rows_to_dicts, copied so the benchmark
+    # runs without a configured database connection pool.
+    col_names = [desc[0] for desc in cursor.description]
+    return [dict(zip(col_names, row)) for row in rows]
+
+
+def measure(func, cursor, rows, repeat: int = 5) -> float:
+    number = max(1, 20000 // max(len(rows), 1))
+    best = min(timeit.repeat(lambda: func(cursor, cursor.fetchall()), number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+if __name__ == "__main__":
+    results = []
+    for n_rows in (1, 50, 10_000):
+        rows = fake_movie_rows(n_rows)
+        cursor = FakeCursor(rows)
+        pandas_us = measure(legacy_pandas_rows, cursor, rows)
+        dicts_us = measure(rows_to_dicts, cursor, rows)
+        tuples_us = measure(lambda c, r: r, cursor, rows)
+        results.append((n_rows, f"{pandas_us:,.1f}", f"{dicts_us:,.1f}", f"{tuples_us:,.1f}", f"{pandas_us / dicts_us:,.1f}x"))
+
+    print_table(("rows", "pandas (us)", "dicts (us)", "tuples (us)", "speedup"), results)
@@ -0,0 +1,167 @@
+"""
+Load test of the main API routes at increasing concurrency.
+
+Each scenario is run against a live server (`--base-url`) or in-process through the ASGI app (`--in-process`,
+which needs the database configured in the environment, e.g. a seeded local Postgres). For every scenario
+and concurrency level, `--requests` requests are sent by that many concurrent clients, after `--warmup`
+unmeasured ones, and the latency percentiles, throughput and error count are reported.
+
+Scenarios:
+- token: POST /token/ with the credentials of a user created for the run (bcrypt bound).
+- guest: POST /token/guest, which creates a guest user per request.
+- search: GET /api/v1/movies/search with a rotating set of title terms.
+- favorite: POST /api/v1/movies/favorite with random movies from the first search page.
+- recommendation: GET /api/v1/movies/recommendation for guests that already have favorites.
+
+Usage:
+    python -m benchmarks.load_test --base-url http://localhost:8080 --concurrency 1 8 32 --requests 500
+    python -m benchmarks.load_test --in-process --scenarios search recommendation --output load.json
+    python -m benchmarks.load_test --base-url http://localhost:8080 --baseline load.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+from benchmarks.utils import find_regressions, latency_summary, print_table, save_results
+
+SCENARIOS = ("token", "guest", "search", "favorite", "recommendation")
+SEARCH_TERMS = ("", "star", "love", "the", "man", "war", "night", "day")
+
+
+async def prepare(client: httpx.AsyncClient, clients: int, favorites: int) -> dict:
+    """
+    Creates what the scenarios need: a registered user, one guest per concurrent client, their favorites,
+    and the movie ids used by the favorite scenario.
+    """
+    username, password = f"loadtest_{uuid.uuid4().hex[:12]}", uuid.uuid4().hex
+    response = await client.post("/api/v1/users/", json={"username": username, "password": password, "email": f"{username}@example.com"})
+    response.raise_for_status()
+
+    headers = []
+    for _ in range(clients):
+        response = await client.post("/token/guest")
+        response.raise_for_status()
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+    response = await client.get("/api/v1/movies/search", params={"page_size": 100}, headers=headers[0])
+    response.raise_for_status()
+    movie_ids = [movie["movie_id"] for movie in response.json()]
+    if not movie_ids:
+        raise SystemExit("The search returned no movies; seed the database first.")
+
+    # Recommendations need favorites; the first request of each guest also builds their list
+    rng = random.Random(0)
+    for guest_headers in headers:
+        for movie_id in rng.sample(movie_ids, min(favorites, len(movie_ids))):
+            await client.post("/api/v1/movies/favorite", params={"movie_id": movie_id}, headers=guest_headers)
+        await client.get("/api/v1/movies/recommendation", headers=guest_headers)
+
+    return {"username": username, "password": password, "headers": headers, "movie_ids": movie_ids}
+
+
+def build_request(scenario: str, context: dict, worker: int, rng: random.Random) -> tuple:
+    headers = context["headers"][worker % len(context["headers"])]
+    if scenario == "token":
+        return "POST", "/token/", {"data": {"username": context["username"], "password": context["password"]}}
+    if scenario == "guest":
+        return "POST", "/token/guest", {}
+    if scenario == "search":
+        return "GET", "/api/v1/movies/search", {"params": {"title": rng.choice(SEARCH_TERMS)}, "headers": headers}
+    if scenario == "favorite":
+        return "POST", "/api/v1/movies/favorite", {"params": {"movie_id": rng.choice(context["movie_ids"])}, "headers": headers}
+    return "GET", "/api/v1/movies/recommendation", {"headers": headers}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, context: dict, concurrency: int, requests: int, warmup: int) -> dict:
+    """
+    Sends `warmup` then `requests` requests of a scenario from `concurrency` concurrent clients.
+
+    Returns:
+    - dict: The latency summary in milliseconds, with "rps" and "errors" (non-2xx responses and transport errors).
+    """
+    latencies, errors = [], 0
+    remaining = {"warmup": warmup, "measured": requests}
+
+    async def worker(index: int) -> None:
+        nonlocal errors
+        rng = random.Random(index)
+        while True:
+            phase = "warmup" if remaining["warmup"] > 0 else "measured"
+            if remaining[phase] <= 0:
+                return
+            remaining[phase] -= 1
+
+            method, path, kwargs = build_request(scenario, context, index, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if phase == "measured":
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {**latency_summary(latencies), "rps": len(latencies) / elapsed if elapsed else 0.0, "errors": errors}
+
+
+async def run(args, transport=None, base_url: str = "") -> dict:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        context = await prepare(client, max(args.concurrency), args.favorites)
+        results = {}
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                results[f"{scenario}@{concurrency}"] = await run_scenario(client, scenario, context, concurrency, args.requests, args.warmup)
+    return results
+
+
+async def main(args) -> dict:
+    if not args.in_process:
+        return await run(args, base_url=args.base_url)
+
+    from app.main import app
+    # ASGITransport does not send lifespan events, so run the app's startup and shutdown around the test
+    async with app.router.lifespan_context(app):
+        return await run(args, httpx.ASGITransport(app=app), "http://loadtest")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8080")
+    target.add_argument("--in-process", action="store_true", help="Serve the app in this process instead of calling a server.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario and concurrency level.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--favorites", type=int, default=10, help="Favorites added to each guest before the run.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the results as JSON, e.g. to use as a baseline later.")
+    parser.add_argument("--baseline", help="JSON results of a previous run; exits with status 1 if p95 regressed.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 increase over the baseline.")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    print_table(
+        ("scenario", "concurrency", "requests", "errors", "rps", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)"),
+        [(*case.split("@"), r["count"], r["errors"], f"{r['rps']:.1f}", f"{r['p50']:.1f}", f"{r['p95']:.1f}", f"{r['p99']:.1f}", f"{r['max']:.1f}")
+         for case, r in results.items()],
+    )
+    if args.output:
+        save_results(args.output, results)
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, "p95", args.tolerance)
+        for case, previous, current in regressions:
+            print(f"Regression: {case} p95 {previous:.1f} ms -> {current:.1f} ms")
+        if regressions:
+            raise SystemExit(1)
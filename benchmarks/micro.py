@@ -0,0 +1,108 @@
+"""
+Micro-benchmarks of the building blocks behind the API, run in isolation.
+
+- execute_query: a trivial query and reads of 1 and 50 `movies_details` rows, through the connection pool
+  (needs the database configured in the environment; skipped with --skip-db).
+- get_user_interest_df: the DataFrame interest summary of --favorites random feature rows.
+- recommend_similar_users: one neighbour search on a recommender fitted on random interests, or on the
+  model given with --model (an artifact root or a .pkl file).
+
+Each case reports per-call latency percentiles; --output and --baseline catch regressions between runs.
+
+Usage:
+    python -m benchmarks.micro --users 100000 --features 40 --iterations 500
+    python -m benchmarks.micro --skip-db --output micro.json
+    python -m benchmarks.micro --skip-db --baseline micro.json --tolerance 0.2
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.utils import get_user_interest_df
+from benchmarks.utils import find_regressions, latency_summary, print_table, save_results
+from models.artifacts import load_recommender
+from models.similar_users_recommender import SimilarUsersRecommenders
+
+
+def sample(function, iterations: int, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        function()
+    seconds = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def execute_query_cases() -> dict:
+    # Imported here: only the database cases need the connection pool
+    from app.data_access.queries import execute_query
+
+    return {
+        "execute_query SELECT 1": lambda: execute_query("SELECT 1;", as_dict=False),
+        "execute_query 1 row": lambda: execute_query("SELECT * FROM movies_details ORDER BY movie_id LIMIT 1;"),
+        "execute_query 50 rows": lambda: execute_query("SELECT * FROM movies_details ORDER BY movie_id LIMIT 50;"),
+    }
+
+
+def user_interest_cases(rng, n_features: int, n_favorites: int) -> dict:
+    columns = [f"feature_{i:03d}" for i in range(n_features)]
+    rows = pd.DataFrame(rng.random((n_favorites, n_features), dtype=np.float32), columns=columns)
+    rows.insert(0, "title", [f"Movie {i}" for i in range(n_favorites)])
+    rows.insert(0, "movie_id", np.arange(n_favorites))
+    return {f"get_user_interest_df {n_favorites} favorites": lambda: get_user_interest_df(rows)}
+
+
+def recommender_cases(rng, model_path: str | None, n_users: int, n_features: int, k: int) -> dict:
+    if model_path:
+        model = load_recommender(model_path)
+        n_features = model.index.vectors.shape[1]
+    else:
+        interests = pd.DataFrame(rng.random((n_users, n_features), dtype=np.float32), columns=[f"feature_{i:03d}" for i in range(n_features)])
+        interests.insert(0, "userId", np.arange(1, n_users + 1))
+        model = SimilarUsersRecommenders()
+        model.fit(interests)
+
+    query = rng.random((1, n_features), dtype=np.float32)
+    return {f"recommend_similar_users k={k} ({len(model.index)} users)": lambda: model.recommend_similar_users(query, k)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--skip-db", action="store_true", help="Skip the execute_query cases.")
+    parser.add_argument("--model", default=None, help="Benchmark this recommender instead of a random one.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--favorites", type=int, default=20)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON, e.g. to use as a baseline later.")
+    parser.add_argument("--baseline", help="JSON results of a previous run; exits with status 1 if p95 regressed.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 increase over the baseline.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cases = {}
+    if not args.skip_db:
+        cases.update(execute_query_cases())
+    cases.update(user_interest_cases(rng, args.features, args.favorites))
+    cases.update(recommender_cases(rng, args.model, args.users, args.features, args.k))
+
+    results = {name: sample(function, args.iterations) for name, function in cases.items()}
+
+    print_table(
+        ("case", "calls", "mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)"),
+        [(name, r["count"], f"{r['mean']:.3f}", f"{r['p50']:.3f}", f"{r['p95']:.3f}", f"{r['p99']:.3f}") for name, r in results.items()],
+    )
+    if args.output:
+        save_results(args.output, results)
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, "p95", args.tolerance)
+        for case, previous, current in regressions:
+            print(f"Regression: {case} p95 {previous:.3f} ms -> {current:.3f} ms")
+        if regressions:
+            raise SystemExit(1)
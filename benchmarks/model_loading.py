@@ -0,0 +1,81 @@
+"""
+Benchmark of loading the similar users recommender: joblib pickle versus the memory-mapped artifact format.
+
+Fits a recommender on random interests, saves it both ways to a temporary directory, then loads it in a
+fresh process per format (like a newly started worker) and reports the load time, the latency of the
+first query, and the anonymous (private, unshareable) memory the process gained. Memory-mapped arrays
+count as file-backed pages shared through the page cache instead.
+
+Usage:
+    python -m benchmarks.model_loading --users 100000 --features 40
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import print_table
+from models.artifacts import load_artifact, save_artifact
+from models.similar_users_recommender import SimilarUsersRecommenders
+
+
+def rss_anon_kib() -> int:
+    # Linux only; 0 elsewhere
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def measure(mode: str, path: str, n_features: int) -> tuple:
+    before = rss_anon_kib()
+    start = time.perf_counter()
+    if mode == "pickle":
+        recommender = joblib.load(path)
+    else:
+        recommender = load_artifact(path, mmap=mode == "artifact (mmap)")
+    load_ms = (time.perf_counter() - start) * 1e3
+
+    query = np.random.default_rng(1).random((1, n_features), dtype=np.float32)
+    start = time.perf_counter()
+    recommender.recommend_similar_users(query, 50)
+    query_ms = (time.perf_counter() - start) * 1e3
+
+    return load_ms, query_ms, (rss_anon_kib() - before) / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    interests = pd.DataFrame(rng.random((args.users, args.features), dtype=np.float32),
+                             columns=[f"feature_{i:03d}" for i in range(args.features)])
+    interests.insert(0, "userId", np.arange(1, args.users + 1))
+    recommender = SimilarUsersRecommenders()
+    recommender.fit(interests)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = str(Path(tmp, "recommender.pkl"))
+        joblib.dump(recommender, pickle_path)
+        artifact_path = str(save_artifact(recommender, Path(tmp, "recommender")))
+
+        rows = []
+        context = multiprocessing.get_context("spawn")
+        for mode, path in (("pickle", pickle_path), ("artifact (mmap)", artifact_path), ("artifact (read)", artifact_path)):
+            with context.Pool(1) as pool:
+                load_ms, query_ms, anon_mib = pool.apply(measure, (mode, path, args.features))
+            rows.append((mode, f"{load_ms:.2f}", f"{query_ms:.2f}", f"{anon_mib:.1f}"))
+
+    print_table(("format", "load (ms)", "first query (ms)", "private memory (MiB)"), rows)
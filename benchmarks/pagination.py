@@ -0,0 +1,56 @@
+"""
+Benchmark of deep pagination on title search: OFFSET paging versus keyset cursors.
+
+Walks the search results with cursors up to the requested page, then times fetching page 1 and
+that page with both strategies. Needs the database configured in the environment.
+
+Usage:
+    python -m benchmarks.pagination --title "" --page 500 --page-size 20
+"""
+import argparse
+import time
+
+from app.data_access.queries import search_movie_by_title
+from app.utils.pagination import decode_cursor, next_cursor
+from benchmarks.utils import print_table
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e3
+
+
+def cursor_for_page(title: str, page: int, page_size: int, user_id: int | None):
+    after = None
+    for _ in range(page - 1):
+        rows = search_movie_by_title(user_id, title, page_size, 0, after)
+        cursor = next_cursor(rows, page_size)
+        if cursor is None:
+            raise SystemExit(f"The search has fewer than {page} pages of {page_size} results.")
+        after = decode_cursor(cursor)
+    return after
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--title", default="")
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    deep_after = cursor_for_page(args.title, args.page, args.page_size, args.user_id)
+
+    rows = []
+    for page, after in ((1, None), (args.page, deep_after)):
+        offset = (page - 1) * args.page_size
+        offset_ms = best_of(lambda: search_movie_by_title(args.user_id, args.title, args.page_size, offset), args.repeat)
+        keyset_ms = best_of(lambda: search_movie_by_title(args.user_id, args.title, args.page_size, 0, after), args.repeat)
+        rows.append((page, f"{offset_ms:.2f}", f"{keyset_ms:.2f}"))
+
+    print_table(("page", "offset (ms)", "cursor (ms)"), rows)
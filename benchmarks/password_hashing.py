@@ -0,0 +1,67 @@
+"""
+Benchmark of login password verification under concurrent load.
+
+Simulates `--logins` login requests issued `--concurrency` at a time on one event loop, once verifying
+bcrypt inline (the previous behaviour) and once through the password hashing pool. Reports login
+throughput and the worst event loop stall, measured by a heartbeat task that should tick every 10ms.
+
+Usage:
+    python -m benchmarks.password_hashing --logins 32 --concurrency 8 --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+from app.auth.password import PasswordHasher, get_password_hash, verify_password
+from benchmarks.utils import print_table
+
+HEARTBEAT_INTERVAL = 0.01
+
+
+async def heartbeat(stalls: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        stalls.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+
+async def run(verify, logins: int, concurrency: int) -> tuple:
+    stalls, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(stalls, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            await verify()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    return logins / elapsed, max(stalls, default=0) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    hashed = get_password_hash("secret")
+    hasher = PasswordHasher(workers=args.workers, queue_limit=args.logins)
+
+    async def inline():
+        verify_password("secret", hashed)
+
+    async def pooled():
+        await hasher.run(verify_password, "secret", hashed)
+
+    rows = []
+    for name, verify in (("inline", inline), (f"pool ({args.workers} workers)", pooled)):
+        throughput, worst_stall = asyncio.run(run(verify, args.logins, args.concurrency))
+        rows.append((name, f"{throughput:.1f}", f"{worst_stall:.1f}"))
+
+    print_table(("mode", "logins/s", "worst loop stall (ms)"), rows)
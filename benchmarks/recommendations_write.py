@@ -0,0 +1,96 @@
+"""
+Benchmark of writing recommendation lists: the former per-user reset + INSERT versus the bulk
+`write_movies_recommendations` in "replace" and "diff" modes.
+
+Writes lists of each `--sizes` length for `--users` synthetic user ids starting at `--first-user-id`,
+`--batch-users` users per transaction, and deletes them afterwards. The per-user path is only timed on
+the first `--legacy-users` users. The "diff" mode is timed rewriting identical lists and lists with
+`--changed` of their movies replaced. Needs the database configured in the environment; movie ids are
+sampled from `movies_details`.
+
+Usage:
+    python -m benchmarks.recommendations_write --users 10000 --sizes 30 1000
+"""
+import argparse
+import random
+import time
+
+from app.data_access.queries import execute_query, reset_movies_recommendations, write_movies_recommendations
+from benchmarks.utils import print_table
+
+
+def legacy_update(ids: list, user_id: int):
+    # The implementation of update_movies_recommendations before the bulk writer
+    reset_movies_recommendations(user_id)
+    values_placeholders = ", ".join(["(%s, %s, CURRENT_TIMESTAMP)"] * len(ids))
+    add_query = f"INSERT INTO movies_recommendations (movie_id, user_id, created_at) VALUES {values_placeholders};"
+    params = tuple(val for pair in zip(ids, [user_id] * len(ids)) for val in pair)
+    return execute_query(add_query, params=params, commit=True)
+
+
+def timed_batches(recommendations: dict, batch_users: int, mode: str) -> float:
+    user_ids = list(recommendations)
+    start = time.perf_counter()
+    for i in range(0, len(user_ids), batch_users):
+        batch = {user_id: recommendations[user_id] for user_id in user_ids[i:i + batch_users]}
+        if write_movies_recommendations(batch, mode=mode) is None:
+            raise SystemExit(f"Writing recommendations in {mode} mode failed.")
+    return time.perf_counter() - start
+
+
+def changed_lists(recommendations: dict, movie_ids: list, fraction: float, rng: random.Random) -> dict:
+    changed = {}
+    for user_id, ids in recommendations.items():
+        kept = ids[:len(ids) - int(len(ids) * fraction)]
+        kept_set = set(kept)
+        fresh = [movie_id for movie_id in rng.sample(movie_ids, min(len(movie_ids), 2 * len(ids))) if movie_id not in kept_set]
+        changed[user_id] = kept + fresh[:len(ids) - len(kept)]
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 1000])
+    parser.add_argument("--batch-users", type=int, default=200)
+    parser.add_argument("--legacy-users", type=int, default=200)
+    parser.add_argument("--first-user-id", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    movie_ids = [row[0] for row in execute_query("SELECT movie_id FROM movies_details;", as_dict=False) or []]
+    user_ids = range(args.first_user_id, args.first_user_id + args.users)
+    cleanup = ("DELETE FROM movies_recommendations WHERE user_id >= %s AND user_id < %s;",
+               (args.first_user_id, args.first_user_id + args.users))
+
+    rows = []
+    try:
+        for size in args.sizes:
+            if size > len(movie_ids):
+                raise SystemExit(f"movies_details has fewer than {size} movies.")
+            recommendations = {user_id: rng.sample(movie_ids, size) for user_id in user_ids}
+            n_rows = args.users * size
+
+            legacy_users = list(user_ids)[:args.legacy_users]
+            start = time.perf_counter()
+            for user_id in legacy_users:
+                legacy_update(recommendations[user_id], user_id)
+            elapsed = time.perf_counter() - start
+            rows.append((size, f"per-user ({len(legacy_users)} users)", f"{len(legacy_users) / elapsed:.0f}",
+                         f"{len(legacy_users) * size / elapsed:.0f}"))
+            execute_query(*cleanup, commit=True)
+
+            for label, mode, lists in (
+                ("replace", "replace", recommendations),
+                ("diff, unchanged", "diff", recommendations),
+                (f"diff, {args.changed:.0%} changed", "diff", changed_lists(recommendations, movie_ids, args.changed, rng)),
+            ):
+                elapsed = timed_batches(lists, args.batch_users, mode)
+                rows.append((size, label, f"{args.users / elapsed:.0f}", f"{n_rows / elapsed:.0f}"))
+            execute_query(*cleanup, commit=True)
+    finally:
+        execute_query(*cleanup, commit=True)
+
+    print_table(("recs/user", "writer", "users/s", "rows/s"), rows)
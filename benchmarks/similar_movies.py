@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of genre-based similar movies.
+
+Compares the brute-force cosine `kneighbors` of `KNNMovieRecommender.recommend_for_favorites_by_id` over the
+whole TF-IDF matrix with reads of the precomputed neighbour table: one movie's list (the /similar endpoint)
+and the vectorised merge of the lists of several favorites. No database is needed: the genres are random.
+
+Usage:
+    python -m benchmarks.similar_movies --movies 60000 --k 50 --favorites 1 5 20 --repeat 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.utils import print_table
+from models.movies.KNNMoviesRecommender import KNNMovieRecommender
+
+GENRES = ("Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama", "Fantasy",
+          "Film-Noir", "Horror", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western")
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=60_000)
+    parser.add_argument("--k", type=int, default=50, help="Neighbours stored per movie.")
+    parser.add_argument("--favorites", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    movie_ids = np.arange(1, args.movies + 1)
+    genres = np.array(["|".join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) for _ in range(args.movies)], dtype=object)
+
+    recommender = KNNMovieRecommender()
+    recommender.fit(movie_ids, movie_ids, genres)
+    start = time.perf_counter()
+    table = recommender.build_similar_movies_table(args.k)
+    build_seconds = time.perf_counter() - start
+    report = table.memory_report()
+    print(f"Built the table of {report['movies']} movies x {report['k']} neighbours in {build_seconds:.1f}s: "
+          f"{report['bytes'] / 2**20:.1f} MiB as arrays, ~{report['python_bytes'] / 2**20:.1f} MiB as Python lists")
+
+    rows = []
+    for n_favorites in args.favorites:
+        favorite_ids = rng.choice(movie_ids, n_favorites, replace=False)
+
+        recommender.similar_movies = None
+        brute_seconds, _ = timed(lambda: recommender.recommend_for_favorites_by_id(favorite_ids, args.top), max(args.repeat // 20, 1))
+        recommender.similar_movies = table
+        combine_seconds, _ = timed(lambda: table.combine(favorite_ids, args.top), args.repeat)
+        rows.append((n_favorites, "brute-force kneighbors", f"{brute_seconds * 1e3:.3f}", "1.0x"))
+        rows.append((n_favorites, "table combine", f"{combine_seconds * 1e3:.3f}", f"{brute_seconds / combine_seconds:.0f}x"))
+        if n_favorites == 1:
+            lookup_seconds, _ = timed(lambda: table.similar_to(favorite_ids[0], args.top), args.repeat)
+            rows.append((n_favorites, "table lookup", f"{lookup_seconds * 1e3:.3f}", f"{brute_seconds / lookup_seconds:.0f}x"))
+
+    print_table(("favorites", "method", "ms per call", "speedup"), rows)
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of user interest summarisation.
+
+Compares the former per-request path (DataFrame from the `movies_preprocessed` rows + `get_user_interest_df`)
+with `FeatureStore.interest_vector` and with the batch `FeatureStore.interest_vectors`. No database is
+needed: the feature matrix is random.
+
+Usage:
+    python -m benchmarks.user_interest --movies 60000 --features 40 --favorites 20 --users 1000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.recommendations.features import FeatureStore
+from app.utils.utils import get_user_interest_df
+from benchmarks.utils import print_table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=60_000)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--favorites", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    columns = [f"feature_{i:03d}" for i in range(args.features)]
+    movie_ids = np.arange(1, args.movies + 1)
+    features = rng.random((args.movies, args.features), dtype=np.float32)
+    store = FeatureStore(movie_ids, features, columns)
+    favorites = [rng.choice(movie_ids, args.favorites, replace=False).tolist() for _ in range(args.users)]
+
+    # The rows the former path fetched from the database for each user, built outside the timed region
+    fetched = [
+        [{"movie_id": movie_id, "title": f"Movie {movie_id}", **dict(zip(columns, features[movie_id - 1].tolist()))}
+         for movie_id in user_favorites]
+        for user_favorites in favorites
+    ]
+
+    start = time.perf_counter()
+    legacy = [get_user_interest_df(pd.DataFrame(rows)).to_numpy(dtype=np.float32) for rows in fetched]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [store.interest_vector(user_favorites) for user_favorites in favorites]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch, _ = store.interest_vectors(favorites)
+    batch_s = time.perf_counter() - start
+
+    assert np.allclose(np.vstack(legacy), np.vstack(single), atol=1e-5)
+    assert np.allclose(np.vstack(single), batch, atol=1e-5)
+
+    print_table(
+        ("path", "total (ms)", "per user (us)"),
+        [(name, f"{seconds * 1e3:.1f}", f"{seconds / args.users * 1e6:.1f}")
+         for name, seconds in (("DataFrame", legacy_s), ("interest_vector", single_s), ("interest_vectors", batch_s))],
+    )
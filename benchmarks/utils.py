@@ -0,0 +1,104 @@
+import json
+import math
+import random
+from pathlib import Path
+
+
+MOVIE_DETAILS_COLUMNS = ("movie_id", "title", "image_path", "year", "avg_rating", "rating_count", "genres",
+                         "summary", "duration", "popularity_score", "tmdb_id", "imdb_id")
+
+
+def fake_movie_rows(n_rows: int, seed: int = 0) -> list:
+    """
+    Generates tuples shaped like rows of the `movies_details` table.
+
+    Parameters:
+    - n_rows (int): Number of rows to generate.
+    - seed (int): Seed for the random generator, so runs are comparable. Default is 0.
+
+    Returns:
+    - list: A list of tuples, one per movie.
+    """
+    rng = random.Random(seed)
+    return [
+        (i, f"Movie {i}", f"/img/{i}.jpg", rng.randint(1950, 2024), round(rng.uniform(1, 5), 2),
+         rng.randint(1, 10_000), "Drama|Comedy", "A short summary.", rng.randint(80, 180),
+         round(rng.uniform(0, 100), 3), rng.randint(1, 10**6), rng.randint(1, 10**7))
+        for i in range(1, n_rows + 1)
+    ]
+
+
+class FakeCursor:
+    """
+    Minimal stand-in for a psycopg2 cursor that replays a fixed result set.
+    """
+
+    def __init__(self, rows: list, columns: tuple = MOVIE_DETAILS_COLUMNS) -> None:
+        self.rows = rows
+        self.description = [(name,) for name in columns]
+
+    def fetchall(self) -> list:
+        return self.rows
+
+
+def print_table(headers: tuple, rows: list) -> None:
+    """
+    Prints rows as a left-aligned plain text table.
+    """
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    line = "  ".join(f"{{:<{w}}}" for w in widths)
+    print(line.format(*headers))
+    print(line.format(*("-" * w for w in widths)))
+    for row in rows:
+        print(line.format(*row))
+
+
+def latency_summary(seconds: list) -> dict:
+    """
+    Summarises latency samples.
+
+    Parameters:
+    - seconds (list[float]): One duration per call, in seconds.
+
+    Returns:
+    - dict: "count", and "mean", "p50", "p95", "p99" and "max" in milliseconds.
+    """
+    if not seconds:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    samples = sorted(seconds)
+
+    def percentile(q: float) -> float:
+        # Nearest-rank percentile, so small samples report an observed value
+        return samples[min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))] * 1e3
+
+    return {"count": len(samples), "mean": sum(samples) / len(samples) * 1e3, "p50": percentile(50),
+            "p95": percentile(95), "p99": percentile(99), "max": samples[-1] * 1e3}
+
+
+def save_results(path: str, results: dict) -> None:
+    """
+    Writes benchmark results as JSON, to be passed back as a baseline on a later run.
+    """
+    Path(path).write_text(json.dumps(results, indent=2, sort_keys=True))
+
+
+def find_regressions(results: dict, baseline_path: str, metric: str, tolerance: float) -> list:
+    """
+    Compares results with a baseline written by `save_results`.
+
+    Parameters:
+    - results (dict): Maps a case name to its summary, e.g. the output of `latency_summary`.
+    - baseline_path (str): JSON file of a previous run.
+    - metric (str): The summary entry to compare, lower being better, e.g. "p95".
+    - tolerance (float): Allowed relative increase, e.g. 0.2 for 20%.
+
+    Returns:
+    - list[tuple]: (case, baseline value, current value) for every case slower than allowed.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    regressions = []
+    for case, summary in results.items():
+        previous = baseline.get(case, {}).get(metric)
+        if previous and summary[metric] > previous * (1 + tolerance):
+            regressions.append((case, previous, summary[metric]))
+    return regressions
@@ -0,0 +1,7 @@
+-- Trigram index backing the "trigram" title search mode (MOVIES_SEARCH_MODE=trigram).
+-- Lets `title ILIKE '%term%'` use an index scan and provides similarity() for relevance ordering.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_details_title_trgm_idx
+    ON movies_details USING gin (title gin_trgm_ops);
@@ -0,0 +1,20 @@
+-- Unique index backing the bulk recommendation writer (write_movies_recommendations).
+-- Serves the per-user DELETE and the ON CONFLICT (user_id, movie_id) inserts, and keeps concurrent writes
+-- for the same user (refreshers of several workers, an overlapping batch run) from duplicating rows.
+
+-- Earlier concurrent writes may have left duplicates, which would fail the unique index. The dedupe and the
+-- index build share one transaction holding a lock that blocks writers (reads go on), so no duplicate can be
+-- written in between: recommendation writes wait for the build, so run it in a maintenance window on a
+-- large table. The build cannot be CONCURRENTLY, which is not allowed in a transaction.
+BEGIN;
+
+LOCK TABLE movies_recommendations IN SHARE ROW EXCLUSIVE MODE;
+
+DELETE FROM movies_recommendations AS a
+    USING movies_recommendations AS b
+    WHERE a.user_id = b.user_id AND a.movie_id = b.movie_id AND a.ctid > b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS movies_recommendations_user_movie_idx
+    ON movies_recommendations (user_id, movie_id);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Precomputed shuffle key of each recommendation row, replacing ORDER BY RANDOM() on reads
+-- (see recommendations_sample in app/data_access/queries.py).
+
+-- Reads no longer use DISTINCT: rows are unique per (user_id, movie_id), enforced by the unique index of
+-- 002_movies_recommendations_user_movie_idx.sql, which runs first
+
+-- Added without a default, so the table is not rewritten; existing rows are backfilled instead
+ALTER TABLE movies_recommendations ADD COLUMN IF NOT EXISTS shuffle_key REAL;
+
+UPDATE movies_recommendations SET shuffle_key = RANDOM() WHERE shuffle_key IS NULL;
+
+ALTER TABLE movies_recommendations ALTER COLUMN shuffle_key SET DEFAULT RANDOM();
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_recommendations_user_shuffle_key_idx
+    ON movies_recommendations (user_id, shuffle_key);
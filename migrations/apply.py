@@ -0,0 +1,111 @@
+"""
+Applies the SQL migrations of this folder, in file name order, to the database configured in the environment.
+
+Each file runs in autocommit mode, one statement at a time, so that statements such as
+`CREATE INDEX CONCURRENTLY` are allowed; a file groups statements that must not interleave with
+concurrent writers between its own BEGIN and COMMIT. Applied files are recorded in `schema_migrations`
+and skipped on later runs.
+
+A failed `CREATE INDEX CONCURRENTLY` leaves an INVALID index behind, which `IF NOT EXISTS` would then
+skip forever. The file is not recorded as applied, and before it is run again every invalid index it
+creates is dropped, so that it is rebuilt.
+
+Usage:
+    python -m migrations.apply
+"""
+import os
+import re
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_DIR = Path(__file__).parent
+
+CREATE_INDEX_PATTERN = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def split_statements(sql: str) -> list:
+    """
+    Splits a migration file into statements, ignoring comment lines.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def drop_invalid_indexes(cursor, statements: list) -> list:
+    """
+    Drops the invalid indexes, left by failed concurrent builds, among those created by `statements`.
+
+    Parameters:
+    - cursor: A cursor of a connection in autocommit mode.
+    - statements (list[str]): The statements of a migration.
+
+    Returns:
+    - list: The names of the indexes dropped.
+    """
+    names = [match.group(1) for statement in statements for match in CREATE_INDEX_PATTERN.finditer(statement)]
+    if not names:
+        return []
+    cursor.execute("""
+        SELECT index_class.relname
+        FROM pg_index
+        INNER JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+        WHERE index_class.relname = ANY(%s) AND NOT pg_index.indisvalid AND pg_table_is_visible(index_class.oid);
+    """, (names,))
+    invalid = [row[0] for row in cursor.fetchall()]
+    for name in invalid:
+        print(f"Dropping invalid index {name}")
+        cursor.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {};").format(sql.Identifier(name)))
+    return invalid
+
+
+def apply_migrations(connection) -> list:
+    """
+    Applies every pending migration.
+
+    Parameters:
+    - connection: An open psycopg2 connection.
+
+    Returns:
+    - list: The names of the migrations applied by this run.
+    """
+    connection.autocommit = True
+    applied = []
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cursor.execute("SELECT name FROM schema_migrations;")
+        done = {row[0] for row in cursor.fetchall()}
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if path.name in done:
+                continue
+            print(f"Applying {path.name}")
+            statements = split_statements(path.read_text())
+            drop_invalid_indexes(cursor, statements)
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (path.name,))
+            applied.append(path.name)
+
+    return applied
+
+
+if __name__ == "__main__":
+    connection = psycopg2.connect(database=os.getenv('DB_NAME'), user=os.getenv('DB_USER'),
+                                  password=os.getenv('DB_PASSWORD'), host=os.getenv('DB_HOST'),
+                                  port=os.getenv('DB_PORT'))
+    try:
+        applied = apply_migrations(connection)
+        print(f"{len(applied)} migration(s) applied.")
+    finally:
+        connection.close()
@@ -0,0 +1,133 @@
+"""
+Versioned on-disk format for SimilarUsersRecommenders.
+
+An artifact is a directory holding one `.npy` file per index array and a `manifest.json` describing the
+model: backend and parameters, feature columns, and the dtype and shape of every array. Arrays are
+opened with `mmap_mode='r'`, so loading is a handful of `open()` calls and every worker process that
+loads the same artifact shares its pages through the OS page cache.
+
+Artifacts live in versioned subdirectories of a model root, next to a `LATEST` file naming the version
+to serve (see models/versions.py):
+
+    models/movies_similar_users_recommender/
+        LATEST
+        20240501120000/
+            manifest.json
+            ids.npy
+            vectors.npy
+            sq_norms.npy
+
+Usage:
+    python -m models.artifacts convert models/movies_similar_users_recommender.pkl models/movies_similar_users_recommender
+"""
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from models.neighbors_index import INDEX_BACKENDS
+from models.similar_users_recommender import SimilarUsersRecommenders
+from models.versions import MANIFEST_FILENAME, check_version_name, load_arrays, resolve_version, save_arrays, set_latest_version
+
+ARTIFACT_FORMAT = 1
+
+
+def save_artifact(recommender: SimilarUsersRecommenders, root, version: str | None = None) -> Path:
+    """
+    Writes a recommender as a new version under `root` and points `LATEST` to it. Earlier versions are
+    kept, so that they can be activated again.
+
+    Parameters:
+    - recommender (SimilarUsersRecommenders): A fitted recommender.
+    - root (str|Path): The model root directory, created if needed.
+    - version (str|None): Name of the version. Default is the current UTC time as YYYYMMDDHHMMSS.
+
+    Returns:
+    - Path: The directory of the new version.
+
+    Raises:
+    - FileExistsError: If the version already exists.
+    - ValueError: If the version is not a plain directory name.
+    """
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "backend": recommender.backend,
+        "index_params": recommender.index.get_params(),
+        "feature_columns": list(recommender.feature_columns),
+    }
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    return save_arrays(root, recommender.index.get_arrays(), manifest, version, prune=False)
+
+
+def read_manifest(path) -> dict:
+    """
+    Reads the manifest of an artifact version (or of the latest version of a model root).
+    """
+    return json.loads((resolve_version(path) / MANIFEST_FILENAME).read_text())
+
+
+def load_artifact(path, mmap: bool = True) -> SimilarUsersRecommenders:
+    """
+    Loads a recommender written by `save_artifact`.
+
+    Parameters:
+    - path (str|Path): A version directory, or a model root to load its `LATEST` version.
+    - mmap (bool): If True the arrays are memory-mapped read-only instead of read into memory. Default is True.
+
+    Returns:
+    - SimilarUsersRecommenders: The recommender, with a `version` attribute set from the manifest.
+
+    Raises:
+    - FileNotFoundError: If no artifact is found.
+    - ValueError: If the artifact has an unsupported format or its arrays do not match the manifest.
+    """
+    manifest, arrays = load_arrays(path, mmap=mmap)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported model artifact format {manifest.get('format')} in {resolve_version(path)}")
+
+    recommender = SimilarUsersRecommenders.__new__(SimilarUsersRecommenders)
+    recommender.backend = manifest["backend"]
+    recommender.index = INDEX_BACKENDS[manifest["backend"]].from_arrays(arrays, **manifest["index_params"])
+    recommender.feature_columns = manifest["feature_columns"]
+    recommender.version = manifest["version"]
+    return recommender
+
+
+def load_recommender(path, mmap: bool = True) -> SimilarUsersRecommenders:
+    """
+    Loads a recommender from an artifact directory, or from a legacy joblib pickle if `path` is a file
+    or only `path` + ".pkl" exists.
+
+    Parameters:
+    - path (str|Path): A model root, a version directory or a `.pkl` file.
+    - mmap (bool): Forwarded to `load_artifact`. Default is True.
+    """
+    path = Path(path)
+    if not path.exists() and path.with_name(f"{path.name}.pkl").is_file():
+        path = path.with_name(f"{path.name}.pkl")
+    if path.is_file():
+        # joblib is only needed for legacy pickles, so it stays out of the serving import path
+        import joblib
+        recommender = joblib.load(path)
+        recommender.version = f"pickle:{path.name}"
+        return recommender
+    return load_artifact(path, mmap=mmap)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="Converts a joblib pickle into a new artifact version.")
+    convert.add_argument("pickle")
+    convert.add_argument("root")
+    convert.add_argument("--version", default=None)
+    show = subparsers.add_parser("show", help="Prints the manifest of an artifact.")
+    show.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        import joblib
+        print(f"Saved {save_artifact(joblib.load(args.pickle), args.root, args.version)}")
+    else:
+        print(json.dumps(read_manifest(args.path), indent=2))
@@ -0,0 +1,154 @@
+import numpy as np
+
+from models.versions import find_version, load_arrays, save_arrays
+
+INDEX_FORMAT = 1
+ARRAY_NAMES = ("user_ids", "offsets", "movie_ids")
+
+
+class LikedMoviesIndex:
+    def __init__(self, user_ids, offsets, movie_ids, min_rating: float = 4.0) -> None:
+        """
+        Inverted index from user id to the movies the user rated well, in CSR layout: the movies of the
+        user at row `i` are `movie_ids[offsets[i]:offsets[i + 1]]`.
+
+        Parameters:
+        - user_ids (np.ndarray): Sorted int64 array of the indexed user ids.
+        - offsets (np.ndarray): int64 array of len(user_ids) + 1 row boundaries into `movie_ids`.
+        - movie_ids (np.ndarray): int32 array of liked movie ids, grouped by user and sorted within each user.
+        - min_rating (float): The rating threshold the index was built with. Default is 4.0.
+        """
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.movie_ids = movie_ids
+        self.min_rating = min_rating
+
+    @classmethod
+    def from_pairs(cls, user_ids, movie_ids, min_rating: float = 4.0) -> "LikedMoviesIndex":
+        """
+        Builds the index from (user_id, movie_id) pairs in any order. Duplicate pairs are dropped.
+
+        Parameters:
+        - user_ids (array-like): The user of each pair.
+        - movie_ids (array-like): The liked movie of each pair.
+        - min_rating (float): The rating threshold the pairs were selected with. Default is 4.0.
+        """
+        pairs = np.unique(np.column_stack([np.asarray(user_ids, dtype=np.int64), np.asarray(movie_ids, dtype=np.int64)]).reshape(-1, 2), axis=0)
+        users, counts = np.unique(pairs[:, 0], return_counts=True)
+        offsets = np.zeros(len(users) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(users, offsets, pairs[:, 1].astype(np.int32), min_rating)
+
+    @classmethod
+    def open(cls, path, mmap: bool = True) -> "LikedMoviesIndex":
+        """
+        Opens the latest index written by `save`.
+
+        Parameters:
+        - path (str|Path): The index directory.
+        - mmap (bool): If True the arrays are memory-mapped read-only instead of read into memory. Default is True.
+
+        Raises:
+        - FileNotFoundError: If no index was saved at `path`.
+        - ValueError: If the index has an unsupported format.
+        """
+        manifest, arrays = load_arrays(path, ARRAY_NAMES, mmap)
+        if manifest.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported liked movies index format {manifest.get('format')} in {find_version(path)}")
+        return cls(*(arrays[name] for name in ARRAY_NAMES), min_rating=manifest["min_rating"])
+
+    def save(self, path) -> None:
+        """
+        Writes the index as a new version of `path` (see models/versions.py). Readers see either the old or the
+        new index, and memory maps of the old one are left untouched.
+
+        Parameters:
+        - path (str|Path): The index directory.
+        """
+        manifest = {"format": INDEX_FORMAT, "min_rating": self.min_rating, "users": len(self.user_ids), "pairs": len(self.movie_ids)}
+        save_arrays(path, {name: getattr(self, name) for name in ARRAY_NAMES}, manifest)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def movies_of(self, user_id: int) -> np.ndarray:
+        """
+        Returns the movies a user liked, or an empty array for an unknown user.
+        """
+        row = np.searchsorted(self.user_ids, user_id)
+        if row == len(self.user_ids) or self.user_ids[row] != user_id:
+            return self.movie_ids[:0]
+        return self.movie_ids[self.offsets[row]:self.offsets[row + 1]]
+
+    def liked_by(self, user_ids) -> tuple:
+        """
+        Gathers the liked movies of several users with array operations only.
+
+        Parameters:
+        - user_ids (array-like): The users, e.g. distance-ordered neighbours.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: The concatenated liked movies of the users, in the order given, and
+                                         the end position of each user's movies in that array.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).ravel()
+        if not len(self.user_ids):
+            return self.movie_ids[:0].copy(), np.zeros(len(user_ids), dtype=np.int64)
+        rows = np.searchsorted(self.user_ids, user_ids)
+        rows[rows == len(self.user_ids)] = 0
+        known = self.user_ids[rows] == user_ids
+
+        starts, ends = self.offsets[rows], self.offsets[rows + 1]
+        lengths = np.where(known, ends - starts, 0)
+        bounds = np.cumsum(lengths)
+        if not bounds.size or not bounds[-1]:
+            return self.movie_ids[:0].copy(), bounds
+        # Position of every gathered movie in `movie_ids`: each user's run starts at its offset
+        run_starts = np.repeat(starts - (bounds - lengths), lengths)
+        return self.movie_ids[run_starts + np.arange(bounds[-1])], bounds
+
+    def union(self, user_ids) -> np.ndarray:
+        """
+        Returns the distinct movies liked by any of the users, sorted by movie id.
+        """
+        movies, _ = self.liked_by(user_ids)
+        return np.unique(movies)
+
+    def smallest_sufficient_neighbourhood(self, neighbourhoods: list, minimum: int) -> tuple:
+        """
+        Array version of `app.utils.utils.smallest_sufficient_neighbourhood`, with the same result.
+
+        Parameters:
+        - neighbourhoods (list[list[int]]): Growing, distance-ordered prefixes of similar user ids.
+        - minimum (int): Number of distinct movies required.
+
+        Returns:
+        - tuple[int, list]: The number of neighbourhoods evaluated and the distinct movie ids of the first one that
+                            reaches `minimum`, ordered by the rank of the neighbour that liked them. The list is empty
+                            if no neighbourhood is large enough.
+        """
+        movies, bounds = self.liked_by(neighbourhoods[-1])
+        # Distinct movies in the order they are first seen, and how many are seen within each prefix of users
+        distinct, first_seen = np.unique(movies, return_index=True)
+        order = np.argsort(first_seen, kind="stable")
+        first_seen = first_seen[order]
+
+        for attempt, users in enumerate(neighbourhoods, start=1):
+            seen = np.searchsorted(first_seen, bounds[len(users) - 1], side="left") if len(users) else 0
+            if seen >= minimum:
+                return attempt, distinct[order[:seen]].tolist()
+
+        return len(neighbourhoods), []
+
+    def memory_report(self) -> dict:
+        """
+        Sizes of the index arrays, with a comparison to the same data held as a dict of Python lists.
+
+        Returns:
+        - dict: "users", "pairs", "bytes" held by the arrays, and "python_bytes", an estimate for {user_id: [movie_id, ...]}.
+        """
+        n_users, n_pairs = len(self.user_ids), len(self.movie_ids)
+        array_bytes = self.user_ids.nbytes + self.offsets.nbytes + self.movie_ids.nbytes
+        # dict slot + int key + list header per user, list slot + small int per pair (CPython 64-bit)
+        python_bytes = n_users * (100 + 28 + 56) + n_pairs * (8 + 28)
+        return {"users": n_users, "pairs": n_pairs, "bytes": array_bytes, "python_bytes": python_bytes}
@@ -2,6 +2,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.neighbors import NearestNeighbors
 from scipy.sparse import csr_matrix
 import numpy as np
+from models.similar_movies_table import SimilarMoviesTable
 
 class KNNMovieRecommender:
     def __init__(self, n_neighbors: int = 5, algorithm: str = 'brute', metric: str = 'cosine') -> None:
@@ -18,6 +19,7 @@ class KNNMovieRecommender:
         - tfidf_vectorizer (TfidfVectorizer): The TF-IDF vectorizer for text processing.
         - movie_ids (np.ndarray): Array of movie IDs.
         - tfidf_matrix (csr_matrix): Sparse matrix from TF-IDF vectorization.
+        - similar_movies (SimilarMoviesTable): Precomputed neighbours of every movie, once `build_similar_movies_table` ran.
         """
         self.n_neighbors = n_neighbors
         self.algorithm = algorithm
@@ -28,6 +30,7 @@ class KNNMovieRecommender:
         self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
         self.movie_ids = None
         self.tfidf_matrix = None
+        self.similar_movies = None
 
     def fit(self, movie_ids: np.ndarray, titles: np.ndarray, genres: np.ndarray) -> None:
         """
@@ -44,10 +47,42 @@ class KNNMovieRecommender:
         self.movie_ids = movie_ids
         self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(genres)
         self.model.fit(self.tfidf_matrix)
+        self.similar_movies = None
+
+    def build_similar_movies_table(self, k: int = 50, batch_size: int = 2048) -> SimilarMoviesTable:
+        """
+        Computes the k most similar movies of every movie offline, so that requests read a precomputed table
+        instead of running a brute-force search over the whole TF-IDF matrix.
+
+        Parameters:
+        - k (int): Number of neighbours stored per movie. Default is 50.
+        - batch_size (int): Movies searched per kneighbors call, which bounds the memory of the distance matrix. Default is 2048.
+
+        Returns:
+        - SimilarMoviesTable: The table, also kept in `similar_movies` and used by `recommend_for_favorites_by_id`.
+        """
+        n_movies = self.tfidf_matrix.shape[0]
+        k = min(k, n_movies - 1)
+        neighbours = np.full((n_movies, k), -1, dtype=np.int64)
+        similarities = np.zeros((n_movies, k), dtype=np.float32)
+
+        for start in range(0, n_movies, batch_size):
+            stop = min(start + batch_size, n_movies)
+            distances, indices = self.model.kneighbors(self.tfidf_matrix[start:stop], n_neighbors=k + 1)
+            # Drop each movie from its own list; it is not always first when other movies have the same genres
+            not_self = indices != np.arange(start, stop)[:, None]
+            not_self[not_self.all(axis=1), -1] = False
+            neighbours[start:stop] = indices[not_self].reshape(stop - start, k)
+            similarities[start:stop] = 1 - distances[not_self].reshape(stop - start, k)
+
+        self.similar_movies = SimilarMoviesTable.from_neighbours(self.movie_ids, neighbours, similarities)
+        return self.similar_movies
 
     def recommend_for_favorites_by_id(self, favorite_movie_ids: np.ndarray, n_recommendations: int = 5) -> np.ndarray:
         """
         Recommends movies based on a list of favorite movie IDs, using the genres to find similar movies.
+        Once `build_similar_movies_table` ran, the neighbour lists of the favorites are merged instead,
+        which ranks movies by their summed similarity to each favorite rather than to the mean favorite.
 
         Parameters:
         - favorite_movie_ids (np.ndarray): Array of favorite movie IDs for which recommendations are to be generated.
@@ -59,15 +94,22 @@ class KNNMovieRecommender:
         Raises:
         - ValueError: If none of the favorite movie IDs are found in the dataset.
         """
-        favorite_indices = np.where(np.isin(self.movie_ids, favorite_movie_ids))[0]
+        favorite_mask = np.isin(self.movie_ids, favorite_movie_ids)
+        favorite_indices = np.flatnonzero(favorite_mask)
 
         if favorite_indices.size == 0:
             raise ValueError("None of the favorite movie IDs were found in the dataset.")
 
+        if self.similar_movies is not None:
+            recommendations, _ = self.similar_movies.combine(favorite_movie_ids, n_recommendations)
+            return recommendations
+
         favorite_tfidf = csr_matrix(self.tfidf_matrix[favorite_indices].mean(axis=0))
-        distances, indices = self.model.kneighbors(favorite_tfidf, n_neighbors=n_recommendations + len(favorite_indices))
+        n_neighbors = min(n_recommendations + len(favorite_indices), len(self.movie_ids))
+        distances, indices = self.model.kneighbors(favorite_tfidf, n_neighbors=n_neighbors)
 
-        recommendations_indices = [i for i in indices[0] if i not in favorite_indices][:n_recommendations]
+        # Boolean lookup instead of a membership test against the favorites per candidate
+        recommendations_indices = indices[0][~favorite_mask[indices[0]]][:n_recommendations]
         recommendations = self.movie_ids[recommendations_indices]
-        
+
         return recommendations
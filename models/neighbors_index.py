@@ -0,0 +1,274 @@
+import numpy as np
+
+
+class ExactNeighborsIndex:
+    query_block_size = 64
+
+    def __init__(self) -> None:
+        """
+        Brute-force Euclidean nearest neighbours over a contiguous float32 matrix.
+
+        Attributes:
+        - ids (np.ndarray): int64 array of item ids, parallel to the rows of `vectors`.
+        - vectors (np.ndarray): C-contiguous float32 matrix with one row per item.
+        """
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def fit(self, ids, vectors) -> None:
+        """
+        Replaces the content of the index.
+
+        Parameters:
+        - ids (array-like): One id per row of `vectors`.
+        - vectors (array-like): Matrix of shape (n_items, n_features).
+        """
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._sq_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self._positions = None
+
+    def get_params(self) -> dict:
+        """
+        Constructor parameters, used to recreate the index from its arrays.
+        """
+        return {}
+
+    def get_arrays(self) -> dict:
+        """
+        The arrays that fully describe the fitted index, by name.
+        """
+        return {"ids": self.ids, "vectors": self.vectors, "sq_norms": self._sq_norms}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, **params):
+        """
+        Recreates a fitted index from `get_arrays()` without recomputing anything. The arrays are used as
+        given, so read-only memory maps stay shared until the index is updated.
+
+        Parameters:
+        - arrays (dict): Arrays returned by `get_arrays()`.
+        - params: Constructor parameters returned by `get_params()`.
+        """
+        index = cls(**params)
+        index.ids = arrays["ids"]
+        index.vectors = arrays["vectors"]
+        index._sq_norms = arrays["sq_norms"]
+        return index
+
+    def add(self, ids, vectors) -> None:
+        """
+        Inserts new items or overwrites the vectors of ids already present, without refitting.
+
+        Parameters:
+        - ids (array-like): Ids of the items to insert or update.
+        - vectors (array-like): Matrix of shape (len(ids), n_features).
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if not len(self):
+            self.fit(ids, vectors)
+            return
+
+        positions = self._position_map()
+        existing = np.array([item_id in positions for item_id in ids.tolist()], dtype=bool)
+        if existing.any():
+            self._update_rows(ids[existing], vectors[existing])
+        if (~existing).any():
+            self._append_rows(ids[~existing], vectors[~existing])
+
+    def kneighbors(self, queries, k: int):
+        """
+        Finds the k nearest items for each query vector.
+
+        Parameters:
+        - queries (array-like): Matrix of shape (n_queries, n_features).
+        - k (int): Number of neighbours to return per query.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: Distances and ids, both of shape (n_queries, k), ordered by increasing distance.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        k = min(k, len(self.ids))
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        neighbors = np.empty((len(queries), k), dtype=np.int64)
+
+        # Blocks bound the size of the (queries x items) distance matrix for batch lookups
+        for start in range(0, len(queries), self.query_block_size):
+            block = queries[start:start + self.query_block_size]
+            sq_distances = self._sq_norms[None, :] - 2 * (block @ self.vectors.T) + np.einsum("ij,ij->i", block, block)[:, None]
+            np.maximum(sq_distances, 0, out=sq_distances)
+
+            nearest = np.argpartition(sq_distances, k - 1, axis=1)[:, :k] if k < len(self.ids) else np.tile(np.arange(k), (len(block), 1))
+            nearest_distances = np.take_along_axis(sq_distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1, kind="stable")
+
+            distances[start:start + len(block)] = np.sqrt(np.take_along_axis(nearest_distances, order, axis=1))
+            neighbors[start:start + len(block)] = self.ids[np.take_along_axis(nearest, order, axis=1)]
+
+        return distances, neighbors
+
+    def _search(self, query, rows, k: int):
+        k = min(k, len(rows))
+        sq_distances = self._sq_norms[rows] - 2 * (self.vectors[rows] @ query) + query @ query
+        np.maximum(sq_distances, 0, out=sq_distances)
+
+        nearest = np.argpartition(sq_distances, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        nearest = nearest[np.argsort(sq_distances[nearest], kind="stable")]
+        return np.sqrt(sq_distances[nearest]), self.ids[rows[nearest]]
+
+    def _position_map(self) -> dict:
+        # Built on first update only, so loading an index does not pay for it
+        if self._positions is None:
+            self._positions = {item_id: row for row, item_id in enumerate(self.ids.tolist())}
+        return self._positions
+
+    def _ensure_writeable(self) -> None:
+        # Arrays loaded from read-only memory maps are copied on the first in-place update
+        if not self.vectors.flags.writeable:
+            self.vectors = self.vectors.copy()
+        if not self._sq_norms.flags.writeable:
+            self._sq_norms = self._sq_norms.copy()
+
+    def _update_rows(self, ids, vectors) -> np.ndarray:
+        self._ensure_writeable()
+        positions = self._position_map()
+        rows = np.array([positions[item_id] for item_id in ids.tolist()], dtype=np.int64)
+        self.vectors[rows] = vectors
+        self._sq_norms[rows] = np.einsum("ij,ij->i", vectors, vectors)
+        return rows
+
+    def _append_rows(self, ids, vectors) -> np.ndarray:
+        start = len(self.ids)
+        positions = self._position_map()
+        self.ids = np.concatenate([self.ids, ids])
+        self.vectors = np.ascontiguousarray(np.vstack([self.vectors, vectors]) if start else vectors)
+        self._sq_norms = np.concatenate([self._sq_norms, np.einsum("ij,ij->i", vectors, vectors)])
+        positions.update({item_id: start + i for i, item_id in enumerate(ids.tolist())})
+        return np.arange(start, len(self.ids))
+
+
+class IVFNeighborsIndex(ExactNeighborsIndex):
+    def __init__(self, n_lists: int = 64, n_probe: int = 8, n_iter: int = 10, random_state: int = 0) -> None:
+        """
+        Approximate nearest neighbours with an inverted file: items are bucketed by their closest k-means
+        centroid and a query only scans the `n_probe` buckets whose centroids are closest to it.
+
+        Parameters:
+        - n_lists (int): Number of k-means centroids / buckets. Default is 64.
+        - n_probe (int): Number of buckets scanned per query. Higher is more accurate and slower. Default is 8.
+        - n_iter (int): Lloyd iterations used to train the centroids. Default is 10.
+        - random_state (int): Seed for centroid initialisation. Default is 0.
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists = []
+
+    def fit(self, ids, vectors) -> None:
+        super().fit(ids, vectors)
+        self.centroids = self._train_centroids(self.vectors)
+        self.assignments = self._assign(self.vectors)
+        self._rebuild_lists()
+
+    def get_params(self) -> dict:
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe, "n_iter": self.n_iter, "random_state": self.random_state}
+
+    def get_arrays(self) -> dict:
+        return {**super().get_arrays(), "centroids": self.centroids, "assignments": self.assignments}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, **params):
+        index = super().from_arrays(arrays, **params)
+        index.centroids = arrays["centroids"]
+        index.assignments = arrays["assignments"]
+        index._rebuild_lists()
+        return index
+
+    def kneighbors(self, queries, k: int):
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        n_probe = min(self.n_probe, len(self.centroids))
+
+        results = []
+        for query in queries:
+            centroid_distances = np.einsum("ij,ij->i", self.centroids, self.centroids) - 2 * (self.centroids @ query)
+            probes = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+            rows = np.concatenate([self._lists[probe] for probe in probes])
+            if len(rows) < k:
+                # Too few candidates in the probed buckets, fall back to a full scan for this query
+                rows = np.arange(len(self.ids))
+            results.append(self._search(query, rows, k))
+
+        return np.array([r[0] for r in results]), np.array([r[1] for r in results])
+
+    def _update_rows(self, ids, vectors) -> np.ndarray:
+        rows = super()._update_rows(ids, vectors)
+        if not self.assignments.flags.writeable:
+            self.assignments = self.assignments.copy()
+        self.assignments[rows] = self._assign(vectors)
+        self._rebuild_lists()
+        return rows
+
+    def _append_rows(self, ids, vectors) -> np.ndarray:
+        rows = super()._append_rows(ids, vectors)
+        new_assignments = self._assign(vectors)
+        self.assignments = np.concatenate([self.assignments, new_assignments])
+        for row, bucket in zip(rows, new_assignments):
+            self._lists[bucket] = np.append(self._lists[bucket], row)
+        return rows
+
+    def _train_centroids(self, vectors) -> np.ndarray:
+        rng = np.random.default_rng(self.random_state)
+        n_lists = min(self.n_lists, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = self._assign(vectors, centroids)
+            counts = np.bincount(assignments, minlength=n_lists).astype(np.float32)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            non_empty = counts > 0
+            centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        return centroids
+
+    def _assign(self, vectors, centroids=None) -> np.ndarray:
+        centroids = self.centroids if centroids is None else centroids
+        distances = np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2 * (vectors @ centroids.T)
+        return distances.argmin(axis=1).astype(np.int32)
+
+    def _rebuild_lists(self) -> None:
+        order = np.argsort(self.assignments, kind="stable")
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+
+INDEX_BACKENDS = {
+    "exact": ExactNeighborsIndex,
+    "ivf": IVFNeighborsIndex,
+}
+
+
+def make_index(backend: str = "exact", **params):
+    """
+    Instantiates a neighbours index by backend name.
+
+    Parameters:
+    - backend (str): One of the keys of INDEX_BACKENDS. Default is "exact".
+    - params: Keyword arguments forwarded to the index constructor.
+
+    Raises:
+    - ValueError: If the backend is unknown.
+    """
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown neighbours index backend '{backend}'. Expected one of {sorted(INDEX_BACKENDS)}.")
+    return INDEX_BACKENDS[backend](**params)
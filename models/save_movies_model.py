@@ -1,9 +1,12 @@
 from dotenv import load_dotenv
+import argparse
 import os
 from utils.utils import *
 from models.similar_users_recommender import SimilarUsersRecommenders
+from models.artifacts import load_recommender, save_artifact
+from app.recommendations.liked_movies import refresh_liked_movies_index
+import numpy as np
 import pandas as pd
-import joblib
 
 # Loading environment variables
 load_dotenv()
@@ -14,8 +17,42 @@ GCP_MOVIES_DATASET =  os.getenv('GCP_MOVIES_DATASET')
 GCP_MOVIES_PREPROCESSED_TABLE =  os.getenv('GCP_MOVIES_PREPROCESSED_TABLE')
 GCP_MOVIES_USERS_INTERESTS_TABLE =  os.getenv('GCP_MOVIES_USERS_INTERESTS_TABLE')
 
+# Neighbours index backend: "exact" or "ivf"
+MOVIES_INDEX_BACKEND = os.getenv('MOVIES_INDEX_BACKEND', 'exact')
+
+
+def update_recommender(recommender: SimilarUsersRecommenders, all_users_interests_df) -> int:
+    """
+    Adds the users of `all_users_interests_df` that the recommender does not know, and updates those whose
+    interests changed, without refitting its index: the "ivf" centroids are kept and only the changed users
+    are bucketed. Users missing from the DataFrame stay in the index.
+
+    Parameters:
+    - recommender (SimilarUsersRecommenders): A fitted recommender, e.g. the latest saved version.
+    - all_users_interests_df (pd.DataFrame): The users' interests, with a `userId` column.
+
+    Returns:
+    - int: The number of users added or updated.
+    """
+    user_ids = all_users_interests_df.userId.to_numpy(dtype=np.int64)
+    interests = all_users_interests_df[recommender.feature_columns].to_numpy(dtype=np.float32)
+
+    rows = pd.Index(recommender.index.ids).get_indexer(user_ids)
+    changed = rows < 0
+    known = ~changed
+    changed[known] = (recommender.index.vectors[rows[known]] != interests[known]).any(axis=1)
+
+    if changed.any():
+        recommender.add_users(user_ids[changed], interests[changed])
+    return int(changed.sum())
+
+
 if __name__ == "__main__":
-    
+    parser = argparse.ArgumentParser(description="Fits the similar users recommender and saves it as a new version.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="add new and changed users to the latest saved version instead of refitting it")
+    args = parser.parse_args()
+
     # Getting data
     favorite_movies_ids = [1, 2]
     
@@ -27,12 +64,24 @@ if __name__ == "__main__":
     # Getting training data
     all_users_interests = get_users_interests(GCP_PROJECT,GCP_MOVIES_DATASET,GCP_MOVIES_USERS_INTERESTS_TABLE)
     
+    # Assuming `knn_model` is your fitted KNN model
+    recommender_filename = 'models/movies_similar_users_recommender'
+
     # Getting similar users
-    recommender = SimilarUsersRecommenders()
-    recommender.fit(all_users_interests)
+    recommender = None
+    if args.incremental:
+        try:
+            recommender = load_recommender(recommender_filename)
+        except FileNotFoundError:
+            print(f"No saved recommender in {recommender_filename}, fitting a new one")
+    if recommender is not None and set(recommender.feature_columns) <= set(all_users_interests.columns):
+        print(f"Added or updated {update_recommender(recommender, all_users_interests)} users")
+    else:
+        recommender = SimilarUsersRecommenders(backend=MOVIES_INDEX_BACKEND)
+        recommender.fit(all_users_interests)
 
-    # Assuming `knn_model` is your fitted KNN model
-    recommender_filename = 'models/movies_similar_users_recommender.pkl'
+    # Save the model as a new memory-mappable artifact version
+    save_artifact(recommender, recommender_filename)
 
-    # Save the model
-    joblib.dump(recommender, recommender_filename)     
\ No newline at end of file
+    # Rebuild the users' liked movies index served alongside the model
+    refresh_liked_movies_index()     
\ No newline at end of file
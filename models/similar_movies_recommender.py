@@ -1,3 +1,4 @@
+import numpy as np
 from sklearn.neighbors import NearestNeighbors
 
 class SimilarMoviesRecommenders:
@@ -8,6 +9,7 @@ class SimilarMoviesRecommenders:
         self.movies_prep = movies_prep
         X = self.movies_prep.drop(columns=["id_","title"])
         self.model.fit(X)
+        self._id_order = None
 
     def recommend_similar_movies(self, user_interests_df, k = 5):
         
@@ -15,3 +17,42 @@ class SimilarMoviesRecommenders:
         similar_movies = self.movies_prep.loc[indices[0]].id_.tolist()
         
         return similar_movies
+
+    def rows_of(self, movie_ids) -> np.ndarray:
+        """
+        Returns the positions in `movies_prep` of the given movies that the model was fitted on, in the given order.
+        """
+        # Built on first use, as pickles of fitted models do not have it
+        if getattr(self, "_id_order", None) is None:
+            self._ids = self.movies_prep["id_"].to_numpy()
+            self._id_order = np.argsort(self._ids, kind="stable")
+        movie_ids = np.asarray(movie_ids).ravel()
+        if not len(self._ids) or not len(movie_ids):
+            return np.zeros(0, dtype=np.int64)
+        sorted_ids = self._ids[self._id_order]
+        positions = np.minimum(np.searchsorted(sorted_ids, movie_ids), len(sorted_ids) - 1)
+        found = sorted_ids[positions] == movie_ids
+        return self._id_order[positions[found]]
+
+    def similar_movies_for_favorites(self, favorite_ids, k: int = 5) -> tuple:
+        """
+        Finds the neighbours of every favorite movie with a single `kneighbors` call, using the feature rows
+        the model was fitted on, so no feature query is needed.
+
+        Parameters:
+        - favorite_ids (array-like): The favorite movie ids. Movies unknown to the model are ignored.
+        - k (int): Number of neighbours wanted per favorite, besides the favorites themselves. Default is 5.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: The neighbour movie ids and their distances, one row per known favorite,
+                                         nearest first. Both are empty if no favorite is known.
+        """
+        rows = self.rows_of(favorite_ids)
+        if not len(rows):
+            return np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0))
+
+        # Each list can contain the favorites themselves, which the caller drops
+        n_neighbors = min(k + len(rows), len(self._ids))
+        features = self.movies_prep.iloc[rows].drop(columns=["id_", "title"])
+        distances, indices = self.model.kneighbors(features, n_neighbors=n_neighbors)
+        return self._ids[indices], distances
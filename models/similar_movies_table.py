@@ -0,0 +1,162 @@
+import numpy as np
+
+from models.versions import find_version, load_arrays, save_arrays
+
+TABLE_FORMAT = 1
+ARRAY_NAMES = ("movie_ids", "neighbours", "similarities")
+
+
+class SimilarMoviesTable:
+    def __init__(self, movie_ids, neighbours, similarities) -> None:
+        """
+        Precomputed item-item neighbours: row `i` holds the most similar movies to `movie_ids[i]`, most similar first.
+
+        Parameters:
+        - movie_ids (np.ndarray): Sorted int64 array of the movie ids in the table.
+        - neighbours (np.ndarray): int32 array of shape (len(movie_ids), k) with the row of each neighbour, -1 for padding.
+        - similarities (np.ndarray): float16 array of the same shape with the similarity of each neighbour, 0 for padding.
+        """
+        self.movie_ids = movie_ids
+        self.neighbours = neighbours
+        self.similarities = similarities
+
+    @classmethod
+    def from_neighbours(cls, movie_ids, neighbours, similarities) -> "SimilarMoviesTable":
+        """
+        Builds the table from neighbour lists in any movie order, e.g. the output of `kneighbors`.
+
+        Parameters:
+        - movie_ids (array-like): The movie of each row.
+        - neighbours (array-like): The row of each neighbour in `movie_ids`, most similar first, -1 for padding.
+        - similarities (array-like): The similarity of each neighbour.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        neighbours = np.asarray(neighbours, dtype=np.int64).reshape(len(movie_ids), -1)
+        similarities = np.asarray(similarities, dtype=np.float32).reshape(neighbours.shape)
+
+        # Rows are stored in movie id order so that lookups are a binary search
+        order = np.argsort(movie_ids, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        neighbours = neighbours[order]
+        padding = neighbours < 0
+        neighbours = np.where(padding, -1, rank[np.where(padding, 0, neighbours)])
+        # Rounded before sorting, so that ties are broken on the stored similarities
+        similarities = np.where(padding, 0, similarities[order]).astype(np.float16).astype(np.float32)
+        # Most similar first within each row, ties by movie id, padding last
+        within = np.lexsort((np.where(padding, len(order), neighbours), np.where(padding, np.inf, -similarities)), axis=-1)
+        neighbours = np.take_along_axis(neighbours, within, axis=-1)
+        similarities = np.take_along_axis(similarities, within, axis=-1)
+        return cls(movie_ids[order], neighbours.astype(np.int32), similarities.astype(np.float16))
+
+    @classmethod
+    def open(cls, path, mmap: bool = True) -> "SimilarMoviesTable":
+        """
+        Opens the latest table written by `save`.
+
+        Parameters:
+        - path (str|Path): The table directory.
+        - mmap (bool): If True the arrays are memory-mapped read-only instead of read into memory. Default is True.
+
+        Raises:
+        - FileNotFoundError: If no table was saved at `path`.
+        - ValueError: If the table has an unsupported format.
+        """
+        manifest, arrays = load_arrays(path, ARRAY_NAMES, mmap)
+        if manifest.get("format") != TABLE_FORMAT:
+            raise ValueError(f"Unsupported similar movies table format {manifest.get('format')} in {find_version(path)}")
+        return cls(*(arrays[name] for name in ARRAY_NAMES))
+
+    def save(self, path) -> None:
+        """
+        Writes the table as a new version of `path` (see models/versions.py).
+
+        Parameters:
+        - path (str|Path): The table directory.
+        """
+        save_arrays(path, {name: getattr(self, name) for name in ARRAY_NAMES}, {"format": TABLE_FORMAT, "movies": len(self.movie_ids), "k": self.k})
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1] if self.neighbours.ndim == 2 else 0
+
+    def rows_of(self, movie_ids) -> np.ndarray:
+        """
+        Returns the row of each movie, -1 for movies missing from the table.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).ravel()
+        if not len(self.movie_ids):
+            return np.full(len(movie_ids), -1, dtype=np.int64)
+        rows = np.searchsorted(self.movie_ids, movie_ids)
+        rows[rows == len(self.movie_ids)] = 0
+        return np.where(self.movie_ids[rows] == movie_ids, rows, -1)
+
+    def similar_to(self, movie_id: int, n: int | None = None) -> tuple:
+        """
+        Returns the stored neighbours of one movie.
+
+        Parameters:
+        - movie_id (int): The movie.
+        - n (int|None): Maximum number of neighbours. Default is all of them.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: The neighbour movie ids, most similar first, and their similarities.
+
+        Raises:
+        - KeyError: If the movie is not in the table.
+        """
+        row = self.rows_of([movie_id])[0]
+        if row < 0:
+            raise KeyError(movie_id)
+        neighbours = self.neighbours[row, :n]
+        valid = neighbours >= 0
+        return self.movie_ids[neighbours[valid]], self.similarities[row, :n][valid].astype(np.float32)
+
+    def combine(self, favorite_ids, n: int) -> tuple:
+        """
+        Merges the neighbour lists of several movies: every neighbour scores the sum of its similarities to
+        the favourites, and the favourites themselves are excluded. Array operations only, no Python loop.
+
+        Parameters:
+        - favorite_ids (array-like): The movies to combine. Ids missing from the table are ignored.
+        - n (int): Number of movies to return.
+
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: Up to n movie ids, best first, and their scores. Ties go to the lowest movie id.
+        """
+        rows = self.rows_of(favorite_ids)
+        rows = rows[rows >= 0]
+        if not len(rows) or n <= 0:
+            return self.movie_ids[:0].copy(), np.zeros(0, dtype=np.float32)
+
+        neighbours = np.asarray(self.neighbours[rows]).ravel()
+        similarities = np.asarray(self.similarities[rows], dtype=np.float32).ravel()
+        keep = (neighbours >= 0) & ~np.isin(neighbours, rows)
+        # Rows are in movie id order, so ranking rows ranks movie ids
+        candidates, positions = np.unique(neighbours[keep], return_inverse=True)
+        scores = np.bincount(positions, weights=similarities[keep], minlength=len(candidates)).astype(np.float32)
+
+        if len(candidates) > n:
+            # O(len) selection of the top n, keeping the lowest rows among those tied with the n-th score
+            threshold = -np.partition(-scores, n - 1)[n - 1]
+            above = np.flatnonzero(scores > threshold)
+            top = np.concatenate([above, np.flatnonzero(scores == threshold)[:n - len(above)]])
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        return self.movie_ids[candidates[order]], scores[order]
+
+    def memory_report(self) -> dict:
+        """
+        Sizes of the table arrays, with a comparison to the same data held as a dict of Python lists of pairs.
+
+        Returns:
+        - dict: "movies", "k", "bytes" held by the arrays, and "python_bytes", an estimate for {movie_id: [(movie_id, similarity), ...]}.
+        """
+        n_movies, k = len(self.movie_ids), self.k
+        array_bytes = self.movie_ids.nbytes + self.neighbours.nbytes + self.similarities.nbytes
+        # dict slot + int key + list header per movie, list slot + tuple + int + float per neighbour (CPython 64-bit)
+        python_bytes = n_movies * (100 + 28 + 56) + n_movies * k * (8 + 56 + 28 + 24)
+        return {"movies": n_movies, "k": k, "bytes": array_bytes, "python_bytes": python_bytes}
@@ -1,17 +1,69 @@
-from sklearn.neighbors import NearestNeighbors
+import sys
+
+import numpy as np
+
+from models.neighbors_index import ExactNeighborsIndex, make_index
+
 
 class SimilarUsersRecommenders:
-    def __init__(self) -> None:
-        self.model = NearestNeighbors()
+    def __init__(self, backend: str = "exact", **index_params) -> None:
+        """
+        Finds users with similar interests through a pluggable nearest neighbours index.
+
+        Parameters:
+        - backend (str): "exact" for a brute-force search or "ivf" for an approximate inverted-file search. Default is "exact".
+        - index_params: Keyword arguments forwarded to the index, e.g. `n_lists` and `n_probe` for "ivf".
+        """
+        self.backend = backend
+        self.index = make_index(backend, **index_params)
+        self.feature_columns = []
+        self.version = None
 
     def fit(self, all_users_interests_df) -> None:
-        self.all_users_interests_df = all_users_interests_df
-        X = self.all_users_interests_df.drop(columns=["userId"])
-        self.model.fit(X)
+        X = all_users_interests_df.drop(columns=["userId"])
+        self.feature_columns = list(X.columns)
+        self.index.fit(all_users_interests_df.userId.to_numpy(), X.to_numpy(dtype=np.float32))
+
+    def add_users(self, user_ids, users_interests) -> None:
+        """
+        Inserts new users, or replaces the interests of known ones, without refitting the index.
+
+        Parameters:
+        - user_ids (array-like): Ids of the users to insert or update.
+        - users_interests (pd.DataFrame|np.ndarray): One interest vector per user, in the same order as `user_ids`.
+        """
+        self.index.add(user_ids, self._as_matrix(users_interests))
 
     def recommend_similar_users(self, user_interests_df, k = 5):
 
-        distances, indices = self.model.kneighbors(user_interests_df, n_neighbors=k)
-        similar_users = self.all_users_interests_df.loc[indices[0]].userId.tolist()
+        distances, similar_users = self.index.kneighbors(self._as_matrix(user_interests_df), k)
+
+        return similar_users[0].tolist()
+
+    def recommend_similar_users_with_distances(self, user_interests_df, k: int = 5) -> tuple:
+        """
+        Finds the k most similar users of a single user, with their distances.
+
+        Returns:
+        - tuple[list, np.ndarray]: Similar user ids and their distances, ordered by increasing distance.
+        """
+        distances, similar_users = self.index.kneighbors(self._as_matrix(user_interests_df), k)
+
+        return similar_users[0].tolist(), distances[0]
+
+    def _as_matrix(self, interests) -> np.ndarray:
+        # pandas is not imported here; if it is not loaded, `interests` cannot be a DataFrame
+        pd = sys.modules.get("pandas")
+        if pd is not None and isinstance(interests, pd.DataFrame):
+            interests = interests[self.feature_columns] if self.feature_columns else interests
+            return interests.to_numpy(dtype=np.float32)
+        return np.asarray(interests, dtype=np.float32)
 
-        return similar_users
+    def __setstate__(self, state) -> None:
+        # Pickles created before the index backends held the sklearn model and the full training DataFrame
+        if "index" not in state:
+            all_users_interests_df = state["all_users_interests_df"]
+            X = all_users_interests_df.drop(columns=["userId"])
+            state = {"backend": "exact", "index": ExactNeighborsIndex(), "feature_columns": list(X.columns), "version": None}
+            state["index"].fit(all_users_interests_df.userId.to_numpy(), X.to_numpy(dtype=np.float32))
+        self.__dict__.update(state)
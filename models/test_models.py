@@ -2,7 +2,7 @@ from dotenv import load_dotenv
 import os
 from utils.utils import *
 import pandas as pd
-import joblib
+from models.artifacts import load_recommender
 
 # Loading environment variables
 load_dotenv()
@@ -14,10 +14,10 @@ GCP_MOVIES_PREPROCESSED_TABLE =  os.getenv('GCP_MOVIES_PREPROCESSED_TABLE')
 GCP_MOVIES_RATINGS_TABLE = os.getenv('GCP_MOVIES_RATINGS_TABLE')
 GCP_MOVIES_DETAILS_TABLE = os.getenv('GCP_MOVIES_DETAILS_TABLE')
 # Load the model at startup
-model_filename = 'models/movies_similar_users_recommender.pkl'
+model_filename = 'models/movies_similar_users_recommender'
 
 try:
-    model = joblib.load(model_filename)
+    model = load_recommender(model_filename)
 except FileNotFoundError:
     print(f"Model file not found: {model_filename}. Please check the file path.")
     raise SystemExit
@@ -32,8 +32,8 @@ if __name__ == "__main__":
     prep_fav_movies = get_preprocessed_resources_by_id(GCP_PROJECT, GCP_MOVIES_DATASET, GCP_MOVIES_PREPROCESSED_TABLE, favorite_movies_ids)
     user_interest = get_user_interest_df(prep_fav_movies)
 
-    movies_model_filename = 'models/movies_similar_users_recommender.pkl'
-    model = joblib.load(movies_model_filename)
+    movies_model_filename = 'models/movies_similar_users_recommender'
+    model = load_recommender(movies_model_filename)
 
     similar_users = model.recommend_similar_users(user_interest)
         
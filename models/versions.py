@@ -0,0 +1,175 @@
+"""
+Versioned directories of memory-mappable arrays, shared by the model artifacts, the liked movies index, the
+similar movies table and the feature store.
+
+A root holds one subdirectory per version, each with one `.npy` file per array and a `manifest.json`, next to
+a `LATEST` file naming the version to read:
+
+    models/liked_movies_index/
+        LATEST
+        20240501120000123456/
+            manifest.json
+            user_ids.npy
+            ...
+
+A version is written to a hidden staging directory, renamed into place and only then published by an
+`os.replace` of `LATEST`, so a reader resolves either the old or the new version, never a partial one, and
+files that are already memory-mapped are never truncated or overwritten.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+MANIFEST_FILENAME = "manifest.json"
+LATEST_FILENAME = "LATEST"
+
+
+def check_version_name(version: str) -> str:
+    """
+    Returns `version` if it is a plain directory name, so that `root / version` stays inside the root.
+
+    Raises:
+    - ValueError: If the version is empty, hidden (staging directories start with a dot) or holds a path separator.
+    """
+    separators = {"/", os.sep, os.altsep} - {None}
+    if not version or version.startswith(".") or any(separator in version for separator in separators):
+        raise ValueError(f"Invalid version {version!r}: expected a plain directory name")
+    return version
+
+
+def set_latest_version(root, version: str) -> None:
+    """
+    Atomically points the `LATEST` file of a root to `version`.
+
+    Raises:
+    - FileNotFoundError: If the version has no manifest.
+    - ValueError: If the version is not a plain directory name.
+    """
+    root = Path(root)
+    check_version_name(version)
+    if not (root / version / MANIFEST_FILENAME).exists():
+        raise FileNotFoundError(f"Version {version} not found in {root}")
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{LATEST_FILENAME}-", dir=root)
+    with os.fdopen(fd, "w") as tmp:
+        tmp.write(version)
+    os.replace(tmp_path, root / LATEST_FILENAME)
+
+
+def find_version(path) -> Path | None:
+    """
+    Returns the version directory to read: the one named by `path/LATEST`, else `path` itself if it holds a
+    manifest (a version directory, or an unversioned directory written before versioning), else None.
+    """
+    path = Path(path)
+    latest = path / LATEST_FILENAME
+    if latest.exists():
+        return path / latest.read_text().strip()
+    if (path / MANIFEST_FILENAME).exists():
+        return path
+    return None
+
+
+def resolve_version(path) -> Path:
+    """
+    `find_version` for a path that must hold a version.
+
+    Raises:
+    - FileNotFoundError: If it holds none.
+    """
+    version_dir = find_version(path)
+    if version_dir is None:
+        raise FileNotFoundError(f"No versioned arrays found in {path}")
+    return version_dir
+
+
+def save_arrays(root, arrays: dict, manifest: dict, version: str | None = None, prune: bool = True) -> Path:
+    """
+    Writes arrays and their manifest as a new version of `root` and points `LATEST` to it.
+
+    Parameters:
+    - root (str|Path): The root directory, created if needed.
+    - arrays (dict[str, np.ndarray]): The arrays, by name.
+    - manifest (dict): Fields written to the manifest, besides "version", "created_at" and the "arrays" specs.
+    - version (str|None): Name of the version. Default is the current UTC time as YYYYMMDDHHMMSSffffff.
+    - prune (bool): If True, removes the versions named before the one `LATEST` pointed to until now, so the
+                    new and the previous versions are kept. Memory maps of removed files stay valid until they
+                    are closed. Default is True.
+
+    Returns:
+    - Path: The directory of the new version.
+
+    Raises:
+    - FileExistsError: If the version already exists.
+    - ValueError: If the version is not a plain directory name.
+    """
+    root = Path(root)
+    version = check_version_name(version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f"))
+    target = root / version
+    if target.exists():
+        raise FileExistsError(f"Version {version} already exists in {root}")
+    root.mkdir(parents=True, exist_ok=True)
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=root))
+    try:
+        specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            np.save(staging / f"{name}.npy", array)
+            specs[name] = {"file": f"{name}.npy", "dtype": array.dtype.str, "shape": list(array.shape)}
+        manifest = {**manifest, "version": version, "created_at": datetime.now(timezone.utc).isoformat(), "arrays": specs}
+        (staging / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2))
+        staging.rename(target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = find_version(root)
+    set_latest_version(root, version)
+    if prune and previous is not None and previous.parent == root:
+        for old in root.iterdir():
+            # Versions written concurrently are named after `previous`, so they are never removed here
+            if old.name < previous.name and not old.name.startswith(".") and (old / MANIFEST_FILENAME).exists():
+                shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+def load_arrays(path, names: tuple = (), mmap: bool = True) -> tuple:
+    """
+    Loads the arrays written by `save_arrays`.
+
+    Parameters:
+    - path (str|Path): A version directory, or a root to load its `LATEST` version.
+    - names (tuple[str]): Arrays to load from `<name>.npy` when the manifest does not list them, as in
+                          manifests written before versioning. Default is none.
+    - mmap (bool): If True the arrays are memory-mapped read-only instead of read into memory. Default is True.
+
+    Returns:
+    - tuple[dict, dict]: The manifest and the arrays by name.
+
+    Raises:
+    - FileNotFoundError: If no version is found.
+    - ValueError: If an array does not match the manifest.
+    """
+    version_dir = resolve_version(path)
+    while True:
+        try:
+            manifest = json.loads((version_dir / MANIFEST_FILENAME).read_text())
+            specs = manifest.get("arrays") or {name: {"file": f"{name}.npy", "dtype": None, "shape": None} for name in names}
+            arrays = {}
+            for name, spec in specs.items():
+                array = np.load(version_dir / spec["file"], mmap_mode="r" if mmap else None, allow_pickle=False)
+                if spec["dtype"] is not None and (array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]):
+                    raise ValueError(f"Array {name} of {version_dir} does not match its manifest")
+                arrays[name] = array
+            return manifest, arrays
+        except FileNotFoundError:
+            # Pruned by newer saves between reading LATEST and opening its files: read the version now published
+            latest = resolve_version(path)
+            if latest == version_dir:
+                raise
+            version_dir = latest
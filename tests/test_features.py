@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.recommendations.features import FeatureStore
+
+
+def make_store(rng, n_movies: int = 200, n_features: int = 6) -> FeatureStore:
+    # Unsorted, sparse movie ids, so that rows and ids differ
+    movie_ids = rng.permutation(n_movies) * 7 + 3
+    return FeatureStore(movie_ids, rng.random((n_movies, n_features), dtype=np.float32), [f"f{i}" for i in range(n_features)])
+
+
+def test_interest_vectors_match_interest_vector():
+    rng = np.random.default_rng(0)
+    store = make_store(rng)
+    known = store.movie_ids
+    favorites = [rng.choice(known, size=rng.integers(1, 15)).tolist() for _ in range(50)]
+
+    vectors, found = store.interest_vectors(favorites)
+
+    assert vectors.shape == (50, 6) and vectors.dtype == np.float32
+    assert found.all()
+    for user, movie_ids in enumerate(favorites):
+        np.testing.assert_allclose(vectors[user], store.interest_vector(movie_ids)[0], rtol=1e-6)
+
+
+def test_interest_vectors_skip_unknown_and_duplicate_movies():
+    rng = np.random.default_rng(1)
+    store = make_store(rng)
+    first, second = store.movie_ids[:2].tolist()
+    favorites = [[first, first, second, -1], [-1, 4], [], [second]]
+
+    vectors, found = store.interest_vectors(favorites)
+
+    assert found.tolist() == [True, False, False, True]
+    np.testing.assert_allclose(vectors[0], store.features[:2].mean(axis=0), rtol=1e-6)
+    np.testing.assert_array_equal(vectors[1], 0)
+    np.testing.assert_array_equal(vectors[2], 0)
+    np.testing.assert_allclose(vectors[3], store.features[1], rtol=1e-6)
+    assert store.interest_vector(favorites[1]) is None
+
+
+def test_interest_vectors_without_users():
+    store = make_store(np.random.default_rng(2))
+    vectors, found = store.interest_vectors([])
+    assert vectors.shape == (0, 6) and not found.any()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from models.neighbors_index import ExactNeighborsIndex, IVFNeighborsIndex
+
+
+def clustered_vectors(rng, n_items: int = 2000, n_features: int = 16, n_clusters: int = 20) -> np.ndarray:
+    centers = rng.normal(scale=5.0, size=(n_clusters, n_features))
+    return (centers[rng.integers(0, n_clusters, size=n_items)] + rng.normal(size=(n_items, n_features))).astype(np.float32)
+
+
+def brute_force(ids, vectors, queries, k: int) -> np.ndarray:
+    distances = ((queries[:, None, :].astype(np.float64) - vectors[None, :, :]) ** 2).sum(axis=2)
+    return ids[np.argsort(distances, axis=1, kind="stable")[:, :k]]
+
+
+def recall(found, expected) -> float:
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found.tolist(), expected.tolist())])
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng)
+    ids = rng.permutation(len(vectors)).astype(np.int64) + 1000
+    queries = clustered_vectors(rng, n_items=100)
+    return ids, vectors, queries
+
+
+def test_exact_matches_brute_force(data):
+    ids, vectors, queries = data
+    index = ExactNeighborsIndex()
+    index.fit(ids, vectors)
+
+    distances, neighbors = index.kneighbors(queries, 10)
+
+    assert recall(neighbors, brute_force(ids, vectors, queries, 10)) == 1.0
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_ivf_recall(data):
+    ids, vectors, queries = data
+    exact = ExactNeighborsIndex()
+    exact.fit(ids, vectors)
+    ivf = IVFNeighborsIndex(n_lists=32, n_probe=8)
+    ivf.fit(ids, vectors)
+
+    expected = exact.kneighbors(queries, 10)[1]
+
+    assert recall(ivf.kneighbors(queries, 10)[1], expected) >= 0.9
+
+
+def test_ivf_probing_every_list_is_exact(data):
+    ids, vectors, queries = data
+    exact = ExactNeighborsIndex()
+    exact.fit(ids, vectors)
+    ivf = IVFNeighborsIndex(n_lists=16, n_probe=16)
+    ivf.fit(ids, vectors)
+
+    exact_distances, exact_neighbors = exact.kneighbors(queries, 10)
+    ivf_distances, ivf_neighbors = ivf.kneighbors(queries, 10)
+
+    assert recall(ivf_neighbors, exact_neighbors) == 1.0
+    np.testing.assert_allclose(ivf_distances, exact_distances, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize("index_class", [ExactNeighborsIndex, IVFNeighborsIndex])
+def test_add_inserts_and_updates_without_refit(data, index_class):
+    ids, vectors, queries = data
+    index = index_class()
+    index.fit(ids[:1500], vectors[:1500])
+    # Read-only arrays, as when the index is loaded from memory maps
+    index = index_class.from_arrays({name: _read_only(array) for name, array in index.get_arrays().items()}, **index.get_params())
+
+    index.add(ids[1500:], vectors[1500:])
+    moved = ids[0]
+    index.add([moved], queries[:1])
+
+    distances, neighbors = index.kneighbors(queries[:1], 1)
+    assert len(index) == len(ids)
+    assert neighbors[0, 0] == moved and distances[0, 0] == pytest.approx(0, abs=1e-2)
+    assert recall(index.kneighbors(vectors[1500:1510], 1)[1], ids[1500:1510, None]) == 1.0
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array = array.copy()
+    array.flags.writeable = False
+    return array
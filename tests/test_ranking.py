@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.recommendations.ranking import DENSE_ID_RANGE_FACTOR, MoviePopularity, rank_candidates
+
+
+def reference_ranking(movie_ids, weights, favorite_ids, n, popularity=None) -> list:
+    scores = {}
+    for movie_id, weight in zip(movie_ids, weights):
+        scores[movie_id] = scores.get(movie_id, 0.0) + weight
+    if popularity is not None:
+        scores = {movie_id: score * (1.0 + float(popularity.prior([movie_id])[0])) for movie_id, score in scores.items()}
+    ranked = sorted((movie_id for movie_id in scores if movie_id not in favorite_ids), key=lambda movie_id: (-scores[movie_id], movie_id))
+    return ranked[:n]
+
+
+def random_occurrences(rng, n_occurrences: int, id_range: int) -> tuple:
+    movie_ids = rng.integers(0, id_range, size=n_occurrences)
+    # Few distinct weights, so that ties are frequent
+    weights = rng.choice([0.25, 0.5, 1.0], size=n_occurrences)
+    return movie_ids, weights
+
+
+@pytest.mark.parametrize("id_range", [50, DENSE_ID_RANGE_FACTOR * 400, 10**9], ids=["dense", "dense_bound", "sparse"])
+def test_matches_reference(id_range):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        movie_ids, weights = random_occurrences(rng, 400, id_range)
+        favorite_ids = rng.choice(movie_ids, size=5).tolist()
+        assert rank_candidates(movie_ids, weights, favorite_ids, 30) == reference_ranking(movie_ids, weights, favorite_ids, 30)
+
+
+@pytest.mark.parametrize("offset", [0, 10**9], ids=["dense", "sparse"])
+def test_ties_go_to_lowest_id(offset):
+    movie_ids = np.array([5, 3, 9, 1, 7]) + offset
+    assert rank_candidates(movie_ids, np.ones(5), [], 3) == (np.array([1, 3, 5]) + offset).tolist()
+
+
+@pytest.mark.parametrize("offset", [0, 10**9], ids=["dense", "sparse"])
+def test_excludes_favorites(offset):
+    movie_ids = np.array([1, 1, 1, 2, 2, 3]) + offset
+    assert rank_candidates(movie_ids, np.ones(6), [1 + offset], 5) == [2 + offset, 3 + offset]
+
+
+@pytest.mark.parametrize("offset", [0, 10**9], ids=["dense", "sparse"])
+def test_popularity_prior(offset):
+    movie_ids = np.array([1, 2, 3]) + offset
+    popularity = MoviePopularity(movie_ids, [1, 10, 1000], [np.nan, np.nan, np.nan], rating_count_weight=1.0, popularity_weight=0.0)
+    weights = [1.0, 1.0, 1.0]
+    assert rank_candidates(movie_ids, weights, [], 3, popularity) == (np.array([3, 2, 1]) + offset).tolist()
+    assert rank_candidates(movie_ids, weights, [], 3, popularity) == reference_ranking(movie_ids.tolist(), weights, [], 3, popularity)
+
+
+def test_empty_and_zero_n():
+    assert rank_candidates([], [], [], 10) == []
+    assert rank_candidates([1, 2], [1.0, 1.0], [], 0) == []
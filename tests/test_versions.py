@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from models import versions
+from models.versions import LATEST_FILENAME, check_version_name, find_version, load_arrays, save_arrays, set_latest_version
+
+
+def saved_versions(root) -> list:
+    return sorted(path.name for path in root.iterdir() if path.is_dir() and not path.name.startswith("."))
+
+
+def test_save_and_load(tmp_path):
+    arrays = {"ids": np.arange(5, dtype=np.int64), "vectors": np.ones((5, 3), dtype=np.float32)}
+    target = save_arrays(tmp_path, arrays, {"format": 1}, version="v1")
+
+    manifest, loaded = load_arrays(tmp_path)
+
+    assert target == tmp_path / "v1"
+    assert manifest["version"] == "v1" and manifest["format"] == 1
+    assert (tmp_path / LATEST_FILENAME).read_text() == "v1"
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert not loaded[name].flags.writeable
+
+
+def test_new_version_swaps_latest_and_prunes_older(tmp_path):
+    for value, version in enumerate(["v1", "v2", "v3"]):
+        save_arrays(tmp_path, {"a": np.full(2, value)}, {}, version=version)
+
+    # The new and the previous versions are kept, so readers of the previous one keep intact files
+    assert saved_versions(tmp_path) == ["v2", "v3"]
+    assert find_version(tmp_path) == tmp_path / "v3"
+    np.testing.assert_array_equal(load_arrays(tmp_path)[1]["a"], [2, 2])
+
+
+def test_prune_disabled_keeps_every_version(tmp_path):
+    for version in ["v1", "v2", "v3"]:
+        save_arrays(tmp_path, {"a": np.zeros(1)}, {}, version=version, prune=False)
+
+    assert saved_versions(tmp_path) == ["v1", "v2", "v3"]
+    set_latest_version(tmp_path, "v1")
+    assert find_version(tmp_path) == tmp_path / "v1"
+
+
+def test_load_retries_when_version_is_pruned(tmp_path, monkeypatch):
+    save_arrays(tmp_path, {"a": np.zeros(1)}, {}, version="v1")
+    stale = find_version(tmp_path)
+    save_arrays(tmp_path, {"a": np.ones(1)}, {}, version="v2")
+    save_arrays(tmp_path, {"a": np.full(1, 2.0)}, {}, version="v3")
+    assert not stale.exists()
+
+    # The reader resolved LATEST before v1 was pruned, and only opens its files afterwards
+    resolved = [stale]
+    monkeypatch.setattr(versions, "resolve_version", lambda path: resolved.pop() if resolved else find_version(path))
+    manifest, arrays = load_arrays(tmp_path)
+
+    assert manifest["version"] == "v3"
+    np.testing.assert_array_equal(arrays["a"], [2.0])
+
+
+def test_existing_version_is_not_overwritten(tmp_path):
+    save_arrays(tmp_path, {"a": np.zeros(1)}, {}, version="v1")
+    with pytest.raises(FileExistsError):
+        save_arrays(tmp_path, {"a": np.ones(1)}, {}, version="v1")
+    np.testing.assert_array_equal(load_arrays(tmp_path)[1]["a"], [0])
+
+
+def test_set_latest_version_requires_a_saved_version(tmp_path):
+    save_arrays(tmp_path, {"a": np.zeros(1)}, {}, version="v1")
+    with pytest.raises(FileNotFoundError):
+        set_latest_version(tmp_path, "v2")
+
+
+@pytest.mark.parametrize("version", ["", ".staging", "../v1", "a/b"])
+def test_invalid_version_names(version):
+    with pytest.raises(ValueError):
+        check_version_name(version)